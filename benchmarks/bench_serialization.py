@@ -0,0 +1,123 @@
+"""
+Serialization benchmark: measures how long it takes to save and load many motor design files,
+with jsonpickle, as earlier versions of OpenBurn did, and with the json and binary forms of openburn.schema.
+
+usage: python benchmarks/bench_serialization.py [--designs N] [--formats FORMAT [FORMAT ...]]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from os import path
+from typing import Callable, Dict, List, Tuple
+
+ROOT_PATH = path.dirname(path.dirname(path.realpath(__file__)))
+sys.path.insert(0, ROOT_PATH)
+
+from openburn import schema  # noqa: E402
+from openburn.core.grain import CylindricalCoreGrain, PortGeometryGrain  # noqa: E402
+from openburn.core.motor import OpenBurnMotor  # noqa: E402
+from openburn.core.nozzle import ConicalNozzle  # noqa: E402
+from openburn.core.portgeometry import star_port  # noqa: E402
+from openburn.core.propellant import SimplePropellant  # noqa: E402
+
+DEFAULT_DESIGNS = 20000
+
+
+def _dumps_jsonpickle(motor: OpenBurnMotor) -> str:
+    import jsonpickle
+    jsonpickle.set_encoder_options('json', sort_keys=True, indent=4)
+    return jsonpickle.encode(motor)
+
+
+def _loads_jsonpickle(data: str) -> OpenBurnMotor:
+    import jsonpickle
+    return jsonpickle.decode(data)
+
+
+# format name : (file extension, dumps, loads, binary)
+FORMATS: Dict[str, Tuple[str, Callable, Callable, bool]] = {
+    'jsonpickle': ('.json', _dumps_jsonpickle, _loads_jsonpickle, False),
+    'schema-json': ('.json', schema.dumps, schema.loads, False),
+    'schema-binary': ('.obz', schema.dumps_binary, schema.loads, True),
+}
+
+
+def make_designs(count: int, seed: int = 0) -> List[OpenBurnMotor]:
+    """
+    :return: count motors of two to six grains, with varied dimensions and propellants
+    """
+    rng = random.Random(seed)
+    designs = []
+    for _ in range(count):
+        propellant = SimplePropellant(f"prop{rng.randrange(100)}", rng.uniform(0.02, 0.05), rng.uniform(0.2, 0.4),
+                                      rng.uniform(4500, 5000), rng.uniform(0.05, 0.065), rng.uniform(1.13, 1.25))
+        diameter = rng.uniform(1.5, 4)
+        grains = []
+        for _ in range(rng.randint(2, 6)):
+            if rng.random() < 0.2:
+                grains.append(PortGeometryGrain(diameter, rng.uniform(2, 6), star_port(5, 0.2, diameter * 0.4),
+                                                burning_faces=2, propellant=propellant))
+            else:
+                grains.append(CylindricalCoreGrain(diameter, rng.uniform(2, 6), burning_faces=2,
+                                                   core_diameter=diameter * rng.uniform(0.25, 0.5),
+                                                   propellant=propellant))
+        motor = OpenBurnMotor()
+        motor.set_grains(grains)
+        motor.set_nozzle(ConicalNozzle(throat=diameter * 0.2, exit=diameter * 0.6, half_angle=15, throat_len=0.25))
+        designs.append(motor)
+    return designs
+
+
+def measure(name: str, designs: List[OpenBurnMotor], directory: str) -> Dict[str, float]:
+    """
+    Saves every design to its own file, then loads them all
+    :return: dict of 'save', 'load' times in seconds and the total 'size' of the files in bytes
+    """
+    extension, dumps, loads, binary = FORMATS[name]
+    mode = 'b' if binary else ''
+    filenames = [path.join(directory, f"{name}-{i}{extension}") for i in range(len(designs))]
+
+    start = time.perf_counter()
+    for motor, filename in zip(designs, filenames):
+        with open(filename, 'w' + mode) as f:
+            f.write(dumps(motor))
+    save_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for filename in filenames:
+        with open(filename, 'r' + mode) as f:
+            loads(f.read())
+    load_time = time.perf_counter() - start
+
+    size = sum(os.path.getsize(filename) for filename in filenames)
+    return {'save': save_time, 'load': load_time, 'size': size}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--designs', type=int, default=DEFAULT_DESIGNS, help="number of design files")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    args = parser.parse_args(argv)
+
+    designs = make_designs(args.designs)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.formats:
+            results[name] = measure(name, designs, directory)
+
+    reference = results.get('jsonpickle')
+    for name, result in results.items():
+        line = (f"{name:16s} save {result['save']:7.2f} s  load {result['load']:7.2f} s  "
+                f"size {result['size'] / 2 ** 20:7.1f} MiB")
+        if reference is not None and name != 'jsonpickle':
+            line += (f"  ({reference['save'] / result['save']:.1f}x save, "
+                     f"{reference['load'] / result['load']:.1f}x load vs jsonpickle)")
+        print(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Startup benchmark: measures how long it takes to import OpenBurn's entry points.
+Every import is timed in a fresh interpreter, and the best of several runs is kept.
+
+usage: python benchmarks/bench_startup.py [--save FILE] [--baseline FILE] [--tolerance FRACTION]
+"""
+import argparse
+import json
+import subprocess
+import sys
+from os import path
+from typing import Dict
+
+ROOT_PATH = path.dirname(path.dirname(path.realpath(__file__)))
+BASELINE_FILE = path.join(ROOT_PATH, 'benchmarks', 'startup_baseline.json')
+
+# modules to time, from cheapest to most expensive
+STARTUP_MODULES = ('openburn', 'openburn.core.internalballistics', 'openburn.application', 'main')
+
+_TIMER = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+def measure_import(module: str, repeat: int = 5) -> float:
+    """
+    :param module: the module to import
+    :param repeat: number of fresh interpreters to time the import in
+    :return: best import time, in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', _TIMER.format(module=module)], cwd=ROOT_PATH,
+                             check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        times.append(float(out.strip().splitlines()[-1]))
+    return min(times)
+
+
+def run(repeat: int = 5) -> Dict[str, float]:
+    """
+    :return: dict of module : best import time, in seconds
+    """
+    return {module: measure_import(module, repeat) for module in STARTUP_MODULES}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', metavar='FILE', help="save the results as the new baseline")
+    parser.add_argument('--baseline', metavar='FILE', nargs='?', const=BASELINE_FILE,
+                        help="compare against a baseline, defaults to " + path.relpath(BASELINE_FILE, ROOT_PATH))
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="fraction an import may be slower than the baseline before it is flagged")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    regressions = 0
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+
+    for module, seconds in results.items():
+        line = f"{module:40s} {seconds * 1000:8.1f} ms"
+        if module in baseline:
+            change = seconds / baseline[module] - 1
+            line += f"  ({change:+.0%} vs baseline)"
+            if change > args.tolerance:
+                line += "  REGRESSION"
+                regressions += 1
+        print(line)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, sort_keys=True, indent=4)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Benchmark suite of the simulation, solver and serialization hot paths, run against standard reference motors:
+a single grain motor, the 4 grain BATES motor of the tests, and a long 12 grain motor.
+Every benchmark is timed in loops long enough to measure, and the best per call time of several runs is kept.
+
+usage: python benchmarks/bench_suite.py [--filter PATTERN] [--save FILE] [--baseline FILE] [--tolerance FRACTION]
+"""
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import tempfile
+import time
+from os import path
+from typing import Any, Callable, Dict
+
+ROOT_PATH = path.dirname(path.dirname(path.realpath(__file__)))
+sys.path.insert(0, ROOT_PATH)
+
+from openburn.application.propellant_store import PropellantStore  # noqa: E402
+from openburn.core.grain import CylindricalCoreGrain  # noqa: E402
+from openburn.core.internalballistics import InternalBallisticsSim, SimSettings, SimEngine  # noqa: E402
+from openburn.core.motor import OpenBurnMotor  # noqa: E402
+from openburn.core.nozzle import ConicalNozzle  # noqa: E402
+from openburn.core.propellant import SimplePropellant  # noqa: E402
+
+BASELINE_FILE = path.join(ROOT_PATH, 'benchmarks', 'suite_baseline.json')
+MIN_LOOP_TIME = 0.05    # seconds each timed loop runs for at least
+PROPELLANT_DB_SIZE = 500    # propellants in the benchmarked library
+
+SIM_ENGINES = (SimEngine.PYTHON, SimEngine.NUMPY)
+MOTOR_PROPERTIES = ('get_kn', 'get_burning_area', 'get_propellant_mass', 'get_volume_loading',
+                    'get_port_throat_ratio', 'get_mass_flow')
+
+
+def make_reference_motors() -> Dict[str, OpenBurnMotor]:
+    """
+    :return: dict of name : motor, from smallest to largest
+    """
+    propellant = SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
+    designs = {
+        'single': (1, 2, 4, 1, ConicalNozzle(throat=0.3, exit=0.9, half_angle=15, throat_len=0.25)),
+        'bates4': (4, 2, 4, 1, ConicalNozzle(throat=0.5, exit=2, half_angle=15, throat_len=0.25)),
+        'long12': (12, 3, 6, 1.5, ConicalNozzle(throat=1.25, exit=3.5, half_angle=15, throat_len=0.5)),
+    }
+    motors = {}
+    for name, (grains, diameter, length, core, nozzle) in designs.items():
+        motor = OpenBurnMotor()
+        motor.set_grains([CylindricalCoreGrain(diameter=diameter, length=length, core_diameter=core,
+                                               burning_faces=2, propellant=propellant)
+                          for _ in range(grains)])
+        motor.set_nozzle(nozzle)
+        motors[name] = motor
+    return motors
+
+
+def make_benchmarks(directory: str) -> Dict[str, Callable[[], Any]]:
+    """
+    :param directory: a temporary directory for files written by benchmarks
+    :return: dict of benchmark name : function to time
+    """
+    benchmarks = {}
+    for name, motor in make_reference_motors().items():
+        for engine in SIM_ENGINES:
+            settings = SimSettings(twophase=0.85, timestep=0.01, engine=engine)
+            benchmarks[f"run_sim/{name}/{engine.value}"] = \
+                lambda motor=motor, settings=settings: InternalBallisticsSim.run_sim(motor, settings)
+        benchmarks[f"calc_exit_mach/{name}"] = lambda motor=motor: InternalBallisticsSim.calc_exit_mach(motor)
+        for prop in MOTOR_PROPERTIES:
+            benchmarks[f"motor/{name}/{prop}"] = getattr(motor, prop)
+        data = motor.to_json()
+        benchmarks[f"to_json/{name}"] = motor.to_json
+        benchmarks[f"from_json/{name}"] = lambda data=data: OpenBurnMotor.from_json(data)
+
+    store = PropellantStore(path.join(directory, 'propellants.db'))
+    propellants = [SimplePropellant(f"prop{i}", 0.02 + i * 1e-5, 0.2 + i * 1e-4, 4500 + i, 0.06, 1.2)
+                   for i in range(PROPELLANT_DB_SIZE)]
+    store.save_many(propellants)
+    names = store.get_names()
+    benchmarks['propellant_db/save'] = lambda: store.save_many(propellants)
+    benchmarks['propellant_db/load'] = lambda: [store.load(name) for name in names]
+    benchmarks['propellant_db/find'] = lambda: store.find(n=(0.21, 0.22), cstar=(4600, None))
+    return benchmarks
+
+
+def measure(func: Callable[[], Any], repeat: int = 5) -> float:
+    """
+    :param func: the function to time
+    :param repeat: number of timed loops
+    :return: best time per call, in seconds
+    """
+    number = 1
+    while True:     # find a loop length that runs for at least MIN_LOOP_TIME
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_LOOP_TIME:
+            break
+        number *= 2
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    return min(times)
+
+
+def run(repeat: int = 5, pattern: str = '*') -> Dict[str, float]:
+    """
+    :param repeat: number of timed loops per benchmark
+    :param pattern: only run benchmarks whose name matches this glob pattern
+    :return: dict of benchmark name : best time per call, in seconds
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        benchmarks = make_benchmarks(directory)
+        return {name: measure(func, repeat) for name, func in benchmarks.items()
+                if fnmatch.fnmatchcase(name, pattern)}
+
+
+def format_time(seconds: float) -> str:
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:9.2f} ms"
+    return f"{seconds * 1e6:9.2f} us"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--filter', default='*', metavar='PATTERN',
+                        help="only run benchmarks matching a glob pattern, e.g. 'run_sim/*'")
+    parser.add_argument('--save', metavar='FILE', help="save the results as the new baseline")
+    parser.add_argument('--baseline', metavar='FILE', nargs='?', const=BASELINE_FILE,
+                        help="compare against a baseline, defaults to " + path.relpath(BASELINE_FILE, ROOT_PATH))
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="fraction a benchmark may be slower than the baseline before it is flagged")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+
+    results = run(args.repeat, args.filter)
+    regressions = 0
+    for name, seconds in results.items():
+        line = f"{name:40s} {format_time(seconds)}"
+        if name in baseline:
+            change = seconds / baseline[name] - 1
+            line += f"  ({change:+.0%} vs baseline)"
+            if change > args.tolerance:
+                line += "  REGRESSION"
+                regressions += 1
+        print(line)
+
+    if args.save:
+        if os.path.exists(args.save) and args.filter != '*':
+            with open(args.save, 'r') as f:
+                results = dict(json.load(f), **results)     # only replace the benchmarks that were run
+        with open(args.save, 'w') as f:
+            json.dump(results, f, sort_keys=True, indent=4)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
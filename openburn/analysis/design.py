@@ -0,0 +1,71 @@
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Any, Callable, Dict
+
+from openburn.core.motor import OpenBurnMotor
+from openburn.core.propellant import OpenBurnPropellant
+
+
+def _set_grain_count(motor: OpenBurnMotor, count: int) -> None:
+    """Drop grains from the aft end, or add copies of the aft grain"""
+    count = int(round(count))
+    if count < 1:
+        raise ValueError(f"A motor needs at least one grain, got {count}")
+    grains = motor.grains[:count]
+    grains += [deepcopy(motor.grains[-1]) for _ in range(count - len(grains))]
+    motor.set_grains(grains)
+
+
+def _set_propellant(motor: OpenBurnMotor, propellant: OpenBurnPropellant) -> None:
+    for grain in motor.grains:
+        grain.propellant = propellant
+
+
+def _grain_setter(attr: str) -> Callable[[OpenBurnMotor, float], None]:
+    def setter(motor: OpenBurnMotor, value: float) -> None:
+        for grain in motor.grains:
+            if not hasattr(type(grain), attr):
+                raise ValueError(f"{type(grain).__name__} has no {attr}")
+            setattr(grain, attr, value)
+    return setter
+
+
+def _nozzle_setter(attr: str) -> Callable[[OpenBurnMotor, float], None]:
+    def setter(motor: OpenBurnMotor, value: float) -> None:
+        setattr(motor.nozzle, attr, value)
+    return setter
+
+
+# Named design parameters : function that applies the value to a motor.
+# Parameters are applied in this order, so grain params also apply to grains added by 'grain_count'.
+# Grain params are applied to every grain, all lengths are in inches.
+DESIGN_PARAMETERS: Dict[str, Callable[[OpenBurnMotor, Any], None]] = OrderedDict([
+    ('grain_count', _set_grain_count),
+    ('grain_diameter', _grain_setter('diameter')),
+    ('grain_length', _grain_setter('length')),
+    ('core_diameter', _grain_setter('core_diameter')),
+    ('burning_faces', _grain_setter('burning_faces')),
+    ('propellant', _set_propellant),
+    ('throat_diameter', _nozzle_setter('throat_dia')),
+    ('exit_diameter', _nozzle_setter('exit_dia')),
+])
+
+
+def apply_design_params(motor: OpenBurnMotor, params: Dict[str, Any]) -> OpenBurnMotor:
+    """
+    Creates a variant of a motor design
+    :param motor: the base motor, which is not modified
+    :param params: dict of design parameter name : value, see DESIGN_PARAMETERS
+    :return: a modified copy of the motor
+    :raises ValueError: for unknown params, and grain params the motor's grains don't have
+    """
+    unknown = set(params) - set(DESIGN_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown design parameters: {', '.join(sorted(unknown))}")
+
+    variant = deepcopy(motor)
+    for name, setter in DESIGN_PARAMETERS.items():
+        if name in params:
+            setter(variant, params[name])
+    variant.set_grains(variant.grains)  # recalculate the average propellant
+    return variant
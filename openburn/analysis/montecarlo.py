@@ -0,0 +1,342 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from openburn.core.internalballistics import InternalBallisticsSim, SimSettings
+from openburn.core.motor import OpenBurnMotor
+from openburn.core.simresults import SimResults
+
+# parameters that can be dispersed, grouped by the object they belong to.
+# propellant and nozzle params are sampled once per motor, grain params are sampled for every grain that has them.
+PROPELLANT_PARAMS = ('a', 'n', 'cstar', 'rho')
+GRAIN_PARAMS = ('diameter', 'length', 'core_diameter')
+NOZZLE_PARAMS = ('throat_dia', 'exit_dia')
+
+
+class Tolerance:
+    """Random manufacturing scatter around a nominal value"""
+    DISTRIBUTIONS = ('normal', 'uniform', 'triangular')
+
+    def __init__(self, width: float, relative: bool = False, distribution: str = 'normal'):
+        """
+        :param width: standard deviation of a normal distribution,
+            or half width of a uniform or triangular distribution
+        :param relative: if True, width is a fraction of the nominal value, otherwise it is in the param's units
+        :param distribution: one of DISTRIBUTIONS
+        """
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution '{distribution}'")
+        self.width = width
+        self.relative = relative
+        self.distribution = distribution
+
+    def sample(self, rng: np.random.Generator, nominal: float) -> float:
+        """
+        :param rng: the random stream to draw from
+        :param nominal: the nominal value
+        :return: a randomly dispersed value
+        """
+        width = self.width * abs(nominal) if self.relative else self.width
+        if self.distribution == 'normal':
+            offset = rng.normal(0, width)
+        elif self.distribution == 'uniform':
+            offset = rng.uniform(-width, width)
+        else:
+            offset = rng.triangular(-width, 0, width)
+        return nominal + float(offset)
+
+
+def disperse_motor(motor: OpenBurnMotor, tolerances: Dict[str, Tolerance], rng: np.random.Generator) -> OpenBurnMotor:
+    """
+    Creates a randomly dispersed copy of a motor
+    :param motor: the nominal motor, which is not modified
+    :param tolerances: dict of 'propellant.<param>', 'grain.<param>' or 'nozzle.<param>' : Tolerance
+    :param rng: the random stream to draw from
+    :return: the dispersed copy
+    """
+    sample = deepcopy(motor)
+
+    # every distinct propellant is one batch, shared by the grains that use it
+    batches = {}
+    for grain in sample.grains:
+        key = id(grain.propellant)
+        if key not in batches:
+            batches[key] = deepcopy(grain.propellant)
+            for param in PROPELLANT_PARAMS:
+                tolerance = tolerances.get('propellant.' + param)
+                if tolerance is not None:
+                    setattr(batches[key], param, tolerance.sample(rng, getattr(batches[key], param)))
+        grain.propellant = batches[key]
+
+        for param in GRAIN_PARAMS:
+            tolerance = tolerances.get('grain.' + param)
+            if tolerance is not None and hasattr(type(grain), param):  # e.g. port geometry grains have no core
+                setattr(grain, param, tolerance.sample(rng, getattr(grain, param)))
+
+    for param in NOZZLE_PARAMS:
+        tolerance = tolerances.get('nozzle.' + param)
+        if tolerance is not None:
+            setattr(sample.nozzle, param, tolerance.sample(rng, getattr(sample.nozzle, param)))
+
+    sample.set_grains(sample.grains)  # recalculate the average propellant
+    return sample
+
+
+class RunningHistogram:
+    """Fixed-bin histogram of a scalar, with a running mean, variance, min and max.
+    Values outside of the bin range are counted in the first or last bin"""
+    def __init__(self, low: float, high: float, bins: int):
+        self.edges = np.linspace(low, high, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0   # sum of squared differences from the mean
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, value: float) -> None:
+        index = np.searchsorted(self.edges, value, side='right') - 1
+        self.counts[min(max(index, 0), len(self.counts) - 1)] += 1
+
+        # Welford's algorithm
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "RunningHistogram") -> None:
+        """Add the values of another histogram with the same bins"""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.counts += other.counts
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def get_std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else 0.0
+
+    def get_percentile(self, q: float) -> float:
+        """
+        :param q: percentile, between 0 and 100
+        :return: the approximate value at the percentile, interpolated within its bin
+        """
+        return float(_histogram_percentile(self.counts[np.newaxis, :], self.edges, q)[0])
+
+
+class CurveHistogram:
+    """Distribution of a time series across many runs.
+    Each run is interpolated onto a fixed time grid, and a value histogram is kept for every grid point,
+    so memory use does not depend on the number of runs"""
+    def __init__(self, time_grid: np.ndarray, high: float, bins: int):
+        self.time_grid = time_grid
+        self.edges = np.linspace(0, high, bins + 1)
+        self.counts = np.zeros((len(time_grid), bins), dtype=np.int64)
+
+    def add(self, time: np.ndarray, values: np.ndarray) -> None:
+        """
+        :param time: time stamps of the run
+        :param values: values of the run. The value is 0 after the end of the run
+        """
+        resampled = np.interp(self.time_grid, time, values, right=0)
+        bins = len(self.edges) - 1
+        index = np.clip((resampled / self.edges[-1] * bins).astype(int), 0, bins - 1)
+        self.counts[np.arange(len(self.time_grid)), index] += 1
+
+    def merge(self, other: "CurveHistogram") -> None:
+        self.counts += other.counts
+
+    def get_percentile(self, q: float) -> np.ndarray:
+        """
+        :param q: percentile, between 0 and 100
+        :return: the approximate value at the percentile, at every point of the time grid
+        """
+        return _histogram_percentile(self.counts, self.edges, q)
+
+
+def _histogram_percentile(counts: np.ndarray, edges: np.ndarray, q: float) -> np.ndarray:
+    """Percentile of each row of a 2D array of histogram counts, interpolated linearly within the bin"""
+    totals = counts.sum(axis=1)
+    cumulative = np.cumsum(counts, axis=1)
+    target = q / 100 * totals
+    index = np.minimum((cumulative < target[:, np.newaxis]).sum(axis=1), counts.shape[1] - 1)
+
+    rows = np.arange(counts.shape[0])
+    below = cumulative[rows, index] - counts[rows, index]
+    in_bin = counts[rows, index]
+    fraction = np.divide(target - below, in_bin, out=np.zeros(len(rows)), where=in_bin > 0)
+    return edges[index] + np.clip(fraction, 0, 1) * (edges[index + 1] - edges[index])
+
+
+class MonteCarloResults:
+    """Running aggregates of a Monte Carlo analysis"""
+    def __init__(self, time_grid: np.ndarray, max_thrust: float, max_pressure: float,
+                 max_pressure_range: Tuple[float, float], impulse_range: Tuple[float, float], bins: int):
+        self.samples = 0
+        self.failures = 0
+        self.thrust = CurveHistogram(time_grid, max_thrust, bins)
+        self.pressure = CurveHistogram(time_grid, max_pressure, bins)
+        self.max_pressure = RunningHistogram(*max_pressure_range, bins)
+        self.total_impulse = RunningHistogram(*impulse_range, bins)
+
+    def add(self, results: SimResults) -> None:
+        self.samples += 1
+        self.thrust.add(results.time, results.thrust)
+        self.pressure.add(results.time, results.pressure)
+        self.max_pressure.add(results.get_max_presure())
+        self.total_impulse.add(results.get_total_impulse())
+
+    def add_failure(self) -> None:
+        self.samples += 1
+        self.failures += 1
+
+    def merge(self, other: "MonteCarloResults") -> None:
+        self.samples += other.samples
+        self.failures += other.failures
+        self.thrust.merge(other.thrust)
+        self.pressure.merge(other.pressure)
+        self.max_pressure.merge(other.max_pressure)
+        self.total_impulse.merge(other.total_impulse)
+
+    def empty_copy(self) -> "MonteCarloResults":
+        """
+        :return: aggregates with the same grid and bins, and no samples
+        """
+        result = deepcopy(self)
+        result.samples = result.failures = 0
+        result.thrust.counts[:] = 0
+        result.pressure.counts[:] = 0
+        bins = len(self.max_pressure.counts)
+        result.max_pressure = RunningHistogram(self.max_pressure.edges[0], self.max_pressure.edges[-1], bins)
+        result.total_impulse = RunningHistogram(self.total_impulse.edges[0], self.total_impulse.edges[-1], bins)
+        return result
+
+    def get_time_grid(self) -> np.ndarray:
+        return self.thrust.time_grid
+
+    def get_percentile_bands(self, curve: str, percentiles: List[float] = (5, 50, 95)) -> Dict[float, np.ndarray]:
+        """
+        :param curve: 'thrust' or 'pressure'
+        :param percentiles: percentiles between 0 and 100
+        :return: dict of percentile : curve value at every point of the time grid
+        """
+        histogram = {'thrust': self.thrust, 'pressure': self.pressure}[curve]
+        return {q: histogram.get_percentile(q) for q in percentiles}
+
+    def get_histogram(self, metric: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param metric: 'max_pressure' or 'total_impulse'
+        :return: tuple of (counts, bin edges)
+        """
+        histogram = {'max_pressure': self.max_pressure, 'total_impulse': self.total_impulse}[metric]
+        return histogram.counts, histogram.edges
+
+
+# state of a worker process, set once by _init_worker
+_worker_state: Tuple[OpenBurnMotor, SimSettings, Dict[str, Tolerance], MonteCarloResults] = None
+
+
+def _init_worker(motor: OpenBurnMotor, settings: SimSettings, tolerances: Dict[str, Tolerance],
+                 template: MonteCarloResults) -> None:
+    global _worker_state
+    _worker_state = (motor, settings, tolerances, template)
+
+
+def _simulate_chunk(seed: np.random.SeedSequence, samples: int) -> MonteCarloResults:
+    """Simulate a chunk of samples with its own random stream, and aggregate them"""
+    motor, settings, tolerances, template = _worker_state
+    rng = np.random.default_rng(seed)
+    aggregate = template.empty_copy()
+    for _ in range(samples):
+        try:
+            sample = disperse_motor(motor, tolerances, rng)
+            aggregate.add(InternalBallisticsSim.run_sim(sample, settings))
+        except Exception:   # a sample that can't be simulated is a failure, and doesn't abort the run
+            aggregate.add_failure()
+    return aggregate
+
+
+class MonteCarloAnalysis:
+    """Dispersion analysis of a motor design with random propellant and geometry tolerances.
+    Samples are simulated in chunks across a pool of worker processes. Each chunk draws from its own
+    random stream spawned from the seed, so the results are reproducible regardless of the number of workers"""
+    def __init__(self, motor: OpenBurnMotor, settings: SimSettings, tolerances: Dict[str, Tolerance],
+                 seed: int = None, workers: int = None):
+        """
+        :param motor: the nominal motor design
+        :param settings: settings used to simulate every sample
+        :param tolerances: dict of 'propellant.<param>', 'grain.<param>' or 'nozzle.<param>' : Tolerance.
+            See PROPELLANT_PARAMS, GRAIN_PARAMS and NOZZLE_PARAMS
+        :param seed: random seed
+        :param workers: number of worker processes. Defaults to the number of cores,
+            1 simulates in this process without a pool
+        """
+        allowed = {f'propellant.{x}' for x in PROPELLANT_PARAMS} | {f'grain.{x}' for x in GRAIN_PARAMS} | \
+            {f'nozzle.{x}' for x in NOZZLE_PARAMS}
+        unknown = set(tolerances) - allowed
+        if unknown:
+            raise ValueError(f"Unknown dispersion parameters: {', '.join(sorted(unknown))}")
+
+        self.motor = motor
+        self.settings = settings
+        self.tolerances = tolerances
+        self.seed = seed
+        self.workers = workers if workers is not None else os.cpu_count()
+
+    def run(self, samples: int, chunk_size: int = 50, bins: int = 100, time_points: int = 200,
+            range_factor: float = 1.5, progress: Callable[[int, int], None] = None) -> MonteCarloResults:
+        """
+        Simulate the dispersed samples
+        :param samples: number of samples to simulate
+        :param chunk_size: number of samples per unit of work
+        :param bins: number of histogram bins for every aggregate
+        :param time_points: number of points in the time grid of the thrust and pressure curves
+        :param range_factor: the histogram ranges are sized from the nominal run:
+            up to range_factor times the nominal values. Values outside of the range go to the outermost bins
+        :param progress: optional callback, called with (completed, total) samples each time a chunk finishes
+        :return: MonteCarloResults
+        """
+        nominal = InternalBallisticsSim.run_sim(self.motor, self.settings)
+        max_pressure = nominal.get_max_presure()
+        impulse = nominal.get_total_impulse()
+        template = MonteCarloResults(
+            time_grid=np.linspace(0, range_factor * nominal.get_burn_time(), time_points),
+            max_thrust=range_factor * nominal.get_max_thrust(),
+            max_pressure=range_factor * max_pressure,
+            max_pressure_range=(max_pressure / range_factor, max_pressure * range_factor),
+            impulse_range=(impulse / range_factor, impulse * range_factor),
+            bins=bins)
+
+        chunks = [min(chunk_size, samples - start) for start in range(0, samples, chunk_size)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(chunks))
+        results = template.empty_copy()
+        completed = 0
+
+        if self.workers <= 1:
+            _init_worker(self.motor, self.settings, self.tolerances, template)
+            for seed, size in zip(seeds, chunks):
+                results.merge(_simulate_chunk(seed, size))
+                completed += size
+                if progress is not None:
+                    progress(completed, samples)
+            return results
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.motor, self.settings, self.tolerances, template)) as executor:
+            futures = [executor.submit(_simulate_chunk, seed, size) for seed, size in zip(seeds, chunks)]
+            # merged in submission order, so the float sums are the same on every run with the seed
+            for future, size in zip(futures, chunks):
+                results.merge(future.result())
+                completed += size
+                if progress is not None:
+                    progress(completed, samples)
+        return results
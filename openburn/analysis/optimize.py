@@ -0,0 +1,466 @@
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+
+from openburn.analysis.design import DESIGN_PARAMETERS
+from openburn.analysis.sweep import init_worker, simulate_variant
+from openburn.core.internalballistics import SimSettings
+from openburn.core.motor import OpenBurnMotor
+from openburn.core.simcache import SimCache
+from openburn.core.simresults import SimResults
+from openburn.util.motorclass import get_class_impulse
+from openburn.util.units import convert_magnitude
+
+# design params that only take whole values
+INTEGER_PARAMETERS = ('grain_count', 'burning_faces')
+DEFAULT_STEP = 0.001    # default resolution of continuous params, in inches
+
+# search control, see DesignOptimizer.run
+INITIAL_SIGMA = 0.25    # initial mutation size, as a fraction of each param's range
+FINAL_SIGMA = 0.02      # mutation size when the time budget runs out
+CROSSOVER_RATE = 0.5
+MAX_DUPLICATE_RETRIES = 10
+
+
+class Bound:
+    """Range of values a design param may take"""
+    def __init__(self, low: float, high: float, step: float = None):
+        """
+        :param low: smallest value
+        :param high: largest value
+        :param step: values are rounded to multiples of step above low, so nearly identical candidates are
+            simulated only once. Defaults to 1 for integer params and DEFAULT_STEP otherwise
+        """
+        if high < low:
+            raise ValueError(f"Bound low {low} is above high {high}")
+        self.low = low
+        self.high = high
+        self.step = step
+
+    def from_unit(self, value: float) -> float:
+        """
+        :param value: position within the range, 0 is low and 1 is high
+        :return: the param value, rounded to the step
+        """
+        value = self.low + min(max(value, 0), 1) * (self.high - self.low)
+        if self.step:
+            value = self.low + round((value - self.low) / self.step) * self.step
+            value = min(value, self.high)
+        return round(value, 12)     # so values reached by different paths compare equal
+
+    def to_unit(self, value: float) -> float:
+        return (value - self.low) / (self.high - self.low) if self.high > self.low else 0.0
+
+
+class Objective:
+    """A summary metric to minimize, maximize or bring to a target value.
+    Any SimResults summary metric or design param can be used"""
+    def __init__(self, metric: str, goal: str = 'min', target: float = None, weight: float = 1.0):
+        """
+        :param metric: name of a SimResults summary metric or a design param
+        :param goal: 'min', 'max' or 'target'
+        :param target: the target value, when goal is 'target'
+        :param weight: relative importance, used to rank the Pareto set
+        """
+        if goal not in ('min', 'max', 'target'):
+            raise ValueError(f"Unknown objective goal '{goal}'")
+        if goal == 'target' and target is None:
+            raise ValueError("A target objective needs a target value")
+        self.metric = metric
+        self.goal = goal
+        self.target = target
+        self.weight = weight
+
+    @classmethod
+    def minimize(cls, metric: str, weight: float = 1.0) -> "Objective":
+        return cls(metric, 'min', weight=weight)
+
+    @classmethod
+    def maximize(cls, metric: str, weight: float = 1.0) -> "Objective":
+        return cls(metric, 'max', weight=weight)
+
+    @classmethod
+    def target_value(cls, metric: str, target: float, weight: float = 1.0) -> "Objective":
+        return cls(metric, 'target', target=target, weight=weight)
+
+    @classmethod
+    def target_class(cls, des: str, percent: float = 50, weight: float = 1.0) -> "Objective":
+        """
+        :param des: motor class letter, see get_motor_class
+        :param percent: how far into the class the total impulse should be
+        :return: an objective targeting the total impulse of the class
+        """
+        impulse = convert_magnitude(get_class_impulse(des, percent), 'newton', 'lbf')
+        return cls.target_value('total_impulse', impulse, weight)
+
+    def score(self, value: float) -> float:
+        """
+        :return: the objective's value as a quantity to minimize
+        """
+        if self.goal == 'max':
+            return -value
+        if self.goal == 'target':
+            return abs(value - self.target)
+        return value
+
+
+class Constraint:
+    """Limits on a summary metric or design param that a design must meet"""
+    def __init__(self, metric: str, minimum: float = None, maximum: float = None):
+        """
+        :param metric: name of a SimResults summary metric or a design param
+        :param minimum: smallest allowed value, or None
+        :param maximum: largest allowed value, or None
+        """
+        self.metric = metric
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def violation(self, value: float) -> float:
+        """
+        :return: how far the value is outside the limits, relative to the limit. 0 if it is within them
+        """
+        violation = 0.0
+        if self.maximum is not None and value > self.maximum:
+            violation += (value - self.maximum) / max(abs(self.maximum), 1e-12)
+        if self.minimum is not None and value < self.minimum:
+            violation += (self.minimum - value) / max(abs(self.minimum), 1e-12)
+        return violation
+
+
+class Candidate:
+    """A simulated design"""
+    def __init__(self, params: Dict[str, Any], summary: Dict[str, float] or str,
+                 objectives: Sequence[Objective], constraints: Sequence[Constraint]):
+        """
+        :param params: the design params
+        :param summary: SimResults summary metrics, or an error message if the design could not be simulated
+        """
+        self.params = params
+        self.summary = summary if not isinstance(summary, str) else None
+        self.error = summary if isinstance(summary, str) else None
+
+        if self.error is None:
+            self.scores = np.array([objective.score(self.get_value(objective.metric)) for objective in objectives])
+            self.violation = sum(constraint.violation(self.get_value(constraint.metric))
+                                 for constraint in constraints)
+        else:
+            self.scores = np.full(len(objectives), np.inf)
+            self.violation = np.inf
+
+    def get_value(self, name: str) -> float:
+        """
+        :param name: a summary metric or design param
+        """
+        if self.summary is not None and name in self.summary:
+            return self.summary[name]
+        return self.params[name]
+
+    def is_feasible(self) -> bool:
+        return self.violation == 0
+
+    def dominates(self, other: "Candidate") -> bool:
+        """
+        :return: true if this candidate is no worse than the other in every objective, and better in one
+        """
+        return bool(np.all(self.scores <= other.scores) and np.any(self.scores < other.scores))
+
+
+def _dominance(scores: np.ndarray) -> np.ndarray:
+    """dominated[i, j] is True if candidate j dominates candidate i"""
+    no_worse = np.all(scores[np.newaxis, :, :] <= scores[:, np.newaxis, :], axis=2)
+    better = np.any(scores[np.newaxis, :, :] < scores[:, np.newaxis, :], axis=2)
+    return no_worse & better
+
+
+def pareto_front(scores: np.ndarray) -> np.ndarray:
+    """
+    :param scores: (candidate, objective) array of values to minimize
+    :return: boolean mask of the non-dominated candidates
+    """
+    if len(scores) == 0:
+        return np.zeros(0, dtype=bool)
+    return ~np.any(_dominance(scores), axis=1)
+
+
+def pareto_ranks(scores: np.ndarray) -> np.ndarray:
+    """
+    Non-dominated sorting
+    :param scores: (candidate, objective) array of values to minimize
+    :return: Pareto front index of each candidate, 0 for the non-dominated set
+    """
+    count = len(scores)
+    dominated = _dominance(scores) if count else np.zeros((0, 0), dtype=bool)
+    ranks = np.full(count, -1)
+    remaining = np.ones(count, dtype=bool)
+    rank = 0
+    while remaining.any():
+        front = remaining & ~np.any(dominated[:, remaining], axis=1)
+        ranks[front] = rank
+        remaining &= ~front
+        rank += 1
+    return ranks
+
+
+class OptimizationResults:
+    """Every design simulated by a DesignOptimizer run"""
+    def __init__(self, candidates: List[Candidate], objectives: Sequence[Objective], cache_hits: int = 0):
+        """
+        :param candidates: every unique design simulated, in the order they finished
+        :param objectives: the run's objectives
+        :param cache_hits: number of candidates that were duplicates of designs already simulated
+        """
+        self.candidates = candidates
+        self.objectives = objectives
+        self.cache_hits = cache_hits
+        self._ranked: List[Candidate] = None    # computed on first use, the candidates don't change
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def get_ranked(self) -> List[Candidate]:
+        """
+        :return: every candidate, best first. Feasible designs come first, ordered by Pareto front and then by the
+            weighted sum of their objectives, normalized over the feasible designs.
+            Infeasible designs follow in order of increasing constraint violation
+        """
+        if self._ranked is None:
+            self._ranked = self._rank()
+        return list(self._ranked)
+
+    def _rank(self) -> List[Candidate]:
+        feasible = [c for c in self.candidates if c.is_feasible()]
+        infeasible = sorted((c for c in self.candidates if not c.is_feasible()), key=lambda c: c.violation)
+        if not feasible:
+            return infeasible
+
+        scores = np.array([c.scores for c in feasible])
+        ranks = pareto_ranks(scores)
+        low, high = scores.min(axis=0), scores.max(axis=0)
+        span = np.where(high > low, high - low, 1)
+        weights = np.array([objective.weight for objective in self.objectives])
+        weighted = ((scores - low) / span * weights).sum(axis=1)
+        order = np.lexsort((weighted, ranks))
+        return [feasible[i] for i in order] + infeasible
+
+    def get_pareto_front(self, ranked: bool = True) -> List[Candidate]:
+        """
+        :param ranked: order the designs as in get_ranked. Otherwise they are in the order they finished
+        :return: the feasible non-dominated designs. Empty if no design met the constraints
+        """
+        feasible = [c for c in self.candidates if c.is_feasible()]
+        if not feasible:
+            return []
+        front = pareto_front(np.array([c.scores for c in feasible]))
+        if not ranked:
+            return [c for c, on_front in zip(feasible, front) if on_front]
+        front_ids = {id(c) for c, on_front in zip(feasible, front) if on_front}
+        return [c for c in self.get_ranked() if id(c) in front_ids]
+
+    def get_best(self) -> Optional[Candidate]:
+        ranked = self.get_ranked()
+        return ranked[0] if ranked else None
+
+    def write_csv(self, f: TextIO) -> None:
+        """
+        Writes every candidate as csv, best first
+        :param f: text file to write to
+        """
+        param_names = []
+        for candidate in self.candidates:
+            param_names += [name for name in candidate.params if name not in param_names]
+        fields = param_names + list(SimResults.SUMMARY_METRICS) + ['feasible', 'error']
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for candidate in self.get_ranked():
+            row = dict(candidate.params)
+            row.update(candidate.summary or {})
+            row['feasible'] = candidate.is_feasible()
+            row['error'] = candidate.error
+            writer.writerow(row)
+
+
+class DesignOptimizer:
+    """Searches a motor's design params for designs that best meet a set of objectives and constraints.
+    Uses a derivative-free, steady-state evolutionary search: each time a simulation finishes, a new candidate
+    is bred from the current best designs, so the worker processes never wait for each other.
+    Designs are rounded to each param's step and every design is only simulated once."""
+    def __init__(self, motor: OpenBurnMotor, settings: SimSettings, bounds: Dict[str, Bound],
+                 objectives: Sequence[Objective], constraints: Sequence[Constraint] = (),
+                 workers: int = None, seed: int = None, results_cache: SimCache = None):
+        """
+        :param motor: the base motor design, see openburn.analysis.design
+        :param settings: settings used to simulate every design
+        :param bounds: dict of design param name : Bound of the params to search
+        :param objectives: what makes a design better
+        :param constraints: limits every design must meet
+        :param workers: number of worker processes. Defaults to the number of cores,
+            1 simulates in this process without a pool
+        :param seed: seed of the random search, for repeatable runs with a single worker
+        :param results_cache: optional SimCache, so designs simulated by earlier runs are only loaded
+        """
+        for name in bounds:
+            if name not in DESIGN_PARAMETERS or name == 'propellant':
+                raise ValueError(f"'{name}' is not a numeric design parameter")
+        if not objectives:
+            raise ValueError("At least one objective is needed")
+
+        self.motor = motor
+        self.settings = settings
+        self.bounds = dict(bounds)
+        for name, bound in self.bounds.items():
+            if bound.step is None:
+                bound.step = 1 if name in INTEGER_PARAMETERS else DEFAULT_STEP
+        self.objectives = list(objectives)
+        self.constraints = list(constraints)
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.rng = np.random.default_rng(seed)
+        self.results_cache = results_cache
+
+        # design key : Candidate, for every design simulated by this optimizer
+        self.cache: Dict[Tuple, Candidate] = {}
+        self.cache_hits = 0
+        # the designs new candidates are bred from, kept up to date as designs finish, see _add_candidate
+        self._front: List[Candidate] = []     # feasible non-dominated designs, in the order they finished
+        self._closest: List[Candidate] = []   # the infeasible designs closest to feasible, least violation first
+
+    def _make_params(self, unit: np.ndarray) -> Dict[str, Any]:
+        return {name: bound.from_unit(value) for (name, bound), value in zip(self.bounds.items(), unit)}
+
+    def _to_unit(self, params: Dict[str, Any]) -> np.ndarray:
+        return np.array([bound.to_unit(params[name]) for name, bound in self.bounds.items()])
+
+    @staticmethod
+    def _key(params: Dict[str, Any]) -> Tuple:
+        return tuple(sorted(params.items()))
+
+    def _initial_samples(self, count: int) -> List[np.ndarray]:
+        """Latin hypercube sample of the unit design space"""
+        dims = len(self.bounds)
+        strata = np.array([self.rng.permutation(count) for _ in range(dims)]).T
+        return list((strata + self.rng.random((count, dims))) / count)
+
+    def _breed(self, elite: List[Candidate], sigma: float) -> np.ndarray:
+        """Mutate a random elite design, crossed with a second elite design some of the time"""
+        parent = self._to_unit(elite[self.rng.integers(len(elite))].params)
+        if len(elite) > 1 and self.rng.random() < CROSSOVER_RATE:
+            other = self._to_unit(elite[self.rng.integers(len(elite))].params)
+            parent = np.where(self.rng.random(len(parent)) < 0.5, parent, other)
+        return np.clip(parent + self.rng.normal(0, sigma, len(parent)), 0, 1)
+
+    def _add_candidate(self, candidate: Candidate) -> None:
+        """Store a finished design, updating the elite designs.
+        A design is only compared to the current front, so breeding doesn't slow down as the search grows"""
+        self.cache[self._key(candidate.params)] = candidate
+        if candidate.is_feasible():
+            if not any(other.dominates(candidate) for other in self._front):
+                self._front = [other for other in self._front if not candidate.dominates(other)]
+                self._front.append(candidate)
+        elif not self._front:
+            index = len(self._closest)
+            while index > 0 and self._closest[index - 1].violation > candidate.violation:
+                index -= 1
+            self._closest.insert(index, candidate)
+            del self._closest[max(len(self.bounds), 2):]
+
+    def _get_elite(self) -> List[Candidate]:
+        # until something is feasible, search around the designs closest to feasible
+        return self._front if self._front else self._closest
+
+    def run(self, time_budget: float = 60, max_evaluations: int = None, initial_samples: int = None,
+            progress: Callable[[int, float], None] = None) -> OptimizationResults:
+        """
+        Search until the time budget or evaluation limit runs out
+        :param time_budget: wall clock time to search for, in seconds. Simulations still running when it
+            runs out are abandoned
+        :param max_evaluations: optional limit on the number of designs simulated
+        :param initial_samples: number of designs in the initial space-filling sample.
+            Defaults to 4 per design param, and at least 2 per worker
+        :param progress: optional callback, called with (designs simulated, fraction of the time budget used)
+            each time a simulation finishes
+        :return: OptimizationResults of every design simulated by this optimizer, including previous runs
+        """
+        start = time.monotonic()
+        deadline = start + time_budget
+        if initial_samples is None:
+            initial_samples = max(4 * len(self.bounds), 2 * self.workers)
+        pending = self._initial_samples(initial_samples)
+        evaluations = 0
+        in_flight: Dict[Tuple, Dict[str, Any]] = {}
+
+        def limit_reached() -> bool:
+            return time.monotonic() >= deadline or \
+                (max_evaluations is not None and evaluations + len(in_flight) >= max_evaluations)
+
+        def next_params() -> Optional[Dict[str, Any]]:
+            """The next design that has not been simulated, or None if the search keeps finding duplicates"""
+            nonlocal pending
+            sigma = max(INITIAL_SIGMA * (1 - (time.monotonic() - start) / time_budget), FINAL_SIGMA)
+            elite = None
+            for _ in range(MAX_DUPLICATE_RETRIES):
+                if pending:
+                    unit = pending.pop()
+                else:
+                    elite = elite or self._get_elite()
+                    unit = self._breed(elite, sigma) if elite else self.rng.random(len(self.bounds))
+                params = self._make_params(unit)
+                key = self._key(params)
+                if key not in self.cache and key not in in_flight:
+                    return params
+                self.cache_hits += 1
+            return None
+
+        def finished(params: Dict[str, Any], summary: Dict[str, float] or str) -> None:
+            nonlocal evaluations
+            self._add_candidate(Candidate(params, summary, self.objectives, self.constraints))
+            evaluations += 1
+            if progress is not None:
+                progress(evaluations, min((time.monotonic() - start) / time_budget, 1))
+
+        if self.workers <= 1:
+            init_worker(self.motor, self.settings, self.results_cache)
+            while not limit_reached():
+                params = next_params()
+                if params is None:
+                    break
+                finished(params, simulate_variant(params))
+            return self._results()
+
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                       initargs=(self.motor, self.settings, self.results_cache))
+        futures = {}
+        try:
+
+            def submit() -> bool:
+                params = next_params()
+                if params is None:
+                    return False
+                in_flight[self._key(params)] = params
+                futures[executor.submit(simulate_variant, params)] = params
+                return True
+
+            # keep two designs queued per worker, so workers never idle while a new design is bred
+            while len(futures) < 2 * self.workers and not limit_reached() and submit():
+                pass
+            while futures:
+                done, _ = wait(futures, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+                if not done:
+                    break   # out of time
+                for future in done:
+                    params = futures.pop(future)
+                    del in_flight[self._key(params)]
+                    finished(params, future.result())
+                while len(futures) < 2 * self.workers and not limit_reached() and submit():
+                    pass
+        finally:
+            for future in futures:
+                future.cancel()     # queued designs are abandoned. shutdown's cancel_futures needs python 3.9
+            executor.shutdown(wait=False)
+        return self._results()
+
+    def _results(self) -> OptimizationResults:
+        return OptimizationResults(list(self.cache.values()), self.objectives, self.cache_hits)
@@ -0,0 +1,155 @@
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from typing import Any, Callable, Dict, List, Sequence, TextIO
+
+from openburn.analysis.design import apply_design_params
+from openburn.core.internalballistics import InternalBallisticsSim, SimSettings
+from openburn.core.motor import OpenBurnMotor
+from openburn.core.simcache import SimCache
+from openburn.core.simresults import SimDataPoint, SimResults
+
+# base motor and settings of a worker process, set once by init_worker so they aren't pickled for every variant
+_worker_motor: OpenBurnMotor = None
+_worker_settings: SimSettings = None
+_worker_cache: SimCache = None
+_worker_stop: Callable[[SimDataPoint], bool] = None
+
+
+def init_worker(motor: OpenBurnMotor, settings: SimSettings, cache: SimCache = None,
+                stop: Callable[[SimDataPoint], bool] = None) -> None:
+    """
+    Set the base motor and settings of the calling process for simulate_variant.
+    Used as the initializer of the worker processes of sweeps and optimizations
+    """
+    global _worker_motor, _worker_settings, _worker_cache, _worker_stop
+    _worker_motor = motor
+    _worker_settings = settings
+    _worker_cache = cache
+    _worker_stop = stop
+
+
+def simulate_variant(params: Dict[str, Any]) -> Dict[str, float] or str:
+    """
+    Simulate a single variant of the worker's base motor
+    :return: the summary metrics, or an error message if the variant could not be simulated
+    """
+    try:
+        motor = apply_design_params(_worker_motor, params)
+        return InternalBallisticsSim.run_sim(motor, _worker_settings, _worker_cache, _worker_stop).get_summary()
+    except Exception as e:  # one bad variant must not abort the sweep and lose the finished variants
+        return f"{type(e).__name__}: {e}"
+
+
+def make_grid(parameters: Dict[str, Sequence]) -> List[Dict[str, Any]]:
+    """
+    Creates every combination of the given parameter values
+    :param parameters: dict of design parameter name : values to sweep, see DESIGN_PARAMETERS
+    :return: list of variants, as dicts of design parameter name : value.
+        The order is deterministic, with the last parameter varying fastest
+    """
+    names = list(parameters)
+    return [dict(zip(names, values)) for values in product(*(parameters[name] for name in names))]
+
+
+class SweepResults:
+    """A table of the design params and summary metrics of every variant in a sweep, in variant order"""
+    def __init__(self, variants: List[Dict[str, Any]], summaries: List[Dict[str, float] or str]):
+        """
+        :param variants: the design params of each variant
+        :param summaries: SimResults summary metrics of each variant, or an error message if it failed
+        """
+        self.variants = variants
+        self.summaries = summaries
+
+    def __len__(self) -> int:
+        return len(self.variants)
+
+    def get_param_names(self) -> List[str]:
+        names = []
+        for variant in self.variants:
+            names += [name for name in variant if name not in names]
+        return names
+
+    def get_rows(self) -> List[Dict[str, Any]]:
+        """
+        :return: one dict per variant of design params, summary metrics and 'error' (None if successful)
+        """
+        rows = []
+        for variant, summary in zip(self.variants, self.summaries):
+            row = dict(variant)
+            if isinstance(summary, str):
+                row.update({metric: None for metric in SimResults.SUMMARY_METRICS})
+                row['error'] = summary
+            else:
+                row.update(summary)
+                row['error'] = None
+            rows.append(row)
+        return rows
+
+    def get_column(self, name: str) -> List[Any]:
+        """
+        :param name: a design param or summary metric name
+        :return: the value for every variant, None where it is missing
+        """
+        return [row.get(name) for row in self.get_rows()]
+
+    def write_csv(self, f: TextIO) -> None:
+        """
+        Writes the table as csv, with propellants written by name
+        :param f: text file to write to
+        """
+        fields = self.get_param_names() + list(SimResults.SUMMARY_METRICS) + ['error']
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for row in self.get_rows():
+            writer.writerow({key: getattr(value, 'name', value) for key, value in row.items()})
+
+
+class ParameterSweep:
+    """Simulates many variants of a single motor design across a pool of worker processes"""
+    def __init__(self, motor: OpenBurnMotor, settings: SimSettings, workers: int = None, cache: SimCache = None,
+                 stop: Callable[[SimDataPoint], bool] = None):
+        """
+        :param motor: the base motor design
+        :param settings: settings used to simulate every variant
+        :param workers: number of worker processes. Defaults to the number of cores,
+            1 simulates in this process without a pool
+        :param cache: optional SimCache shared by the workers, so variants simulated before are only loaded
+        :param stop: optional stop condition, such as a PressureLimit. Variants that meet it are abandoned
+            as soon as they do, and reported as errors. Must be picklable to use worker processes
+        """
+        self.motor = motor
+        self.settings = settings
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.cache = cache
+        self.stop = stop
+
+    def run(self, variants: List[Dict[str, Any]],
+            progress: Callable[[int, int], None] = None) -> SweepResults:
+        """
+        Simulate every variant
+        :param variants: list of dicts of design parameter name : value, see make_grid
+        :param progress: optional callback, called with (completed, total) each time a variant finishes
+        :return: SweepResults, in the same order as variants regardless of completion order
+        """
+        summaries = [None] * len(variants)
+
+        if self.workers <= 1:
+            init_worker(self.motor, self.settings, self.cache, self.stop)
+            for i, params in enumerate(variants):
+                summaries[i] = simulate_variant(params)
+                if progress is not None:
+                    progress(i + 1, len(variants))
+            return SweepResults(variants, summaries)
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                 initargs=(self.motor, self.settings, self.cache, self.stop)) as executor:
+            futures = {executor.submit(simulate_variant, params): i for i, params in enumerate(variants)}
+            for completed, future in enumerate(as_completed(futures), start=1):
+                summaries[futures[future]] = future.result()
+                if progress is not None:
+                    progress(completed, len(variants))
+
+        return SweepResults(variants, summaries)
@@ -1,4 +1,14 @@
-from openburn.application.application import OpenBurnApplication
+# The singleton application context is created on first access, so importing this package stays cheap
+# and does not need Qt or the user databases
+_app_context = None
 
-# the singleton application context
-app_context = OpenBurnApplication()
+
+def get_app_context() -> "OpenBurnApplication":
+    """
+    :return: the singleton application context, created on the first call
+    """
+    global _app_context
+    if _app_context is None:
+        from openburn.application.application import OpenBurnApplication
+        _app_context = OpenBurnApplication()
+    return _app_context
@@ -1,9 +1,15 @@
+from os import path
+
 from qtpy.QtCore import QObject
 from qtpy.QtWidgets import QUndoStack
 
+from openburn import USER_PATH
 from openburn.core.motor import OpenBurnMotor
+from openburn.core.simcache import SimCache
+from openburn.application.motor_model import MotorModel
 from openburn.application.settings import SettingsDatabase
 from openburn.application.propellant_db import PropellantDatabase
+from openburn.application.sim_runner import SimRunner
 
 
 class OpenBurnApplication(QObject):
@@ -14,18 +20,74 @@ class OpenBurnApplication(QObject):
         settings,
         undo stack,
         and current design info
+    The databases are loaded from the user directory the first time they are used.
+    When redraw_on_changes is set, every edit of the design starts a simulation on sim_runner, superseding
+    the simulation of the previous edit.
     """
-    def __init__(self):
+    def __init__(self, user_path: str = USER_PATH):
+        """
+        :param user_path: directory containing the user's propellant and settings databases
+        """
         super(OpenBurnApplication, self).__init__()
-        self.motor = OpenBurnMotor()
+        self.motor_model = MotorModel()
         self.current_design_filename: str = None
 
         self.undo_stack = QUndoStack(self)
-        self.propellant_db = PropellantDatabase('user/propellants.json')
-        self.settings = SettingsDatabase('user/settings.json')
+        self.user_path = user_path
+        self._propellant_db: PropellantDatabase = None
+        self._settings: SettingsDatabase = None
+        self._sim_runner: SimRunner = None
+        self.motor_model.motor_changed.connect(self._on_motor_changed)
+
+    @property
+    def propellant_db(self) -> PropellantDatabase:
+        if self._propellant_db is None:
+            self._propellant_db = PropellantDatabase(path.join(self.user_path, 'propellants.db'))
+        return self._propellant_db
+
+    @property
+    def settings(self) -> SettingsDatabase:
+        if self._settings is None:
+            self._settings = SettingsDatabase(path.join(self.user_path, 'settings.json'))
+        return self._settings
+
+    @property
+    def sim_runner(self) -> SimRunner:
+        if self._sim_runner is None:
+            # edits are often undone, so results are cached to show them again without simulating
+            self._sim_runner = SimRunner(cache=SimCache(path.join(self.user_path, 'cache', 'sim_results')))
+        return self._sim_runner
+
+    @property
+    def motor(self) -> OpenBurnMotor:
+        """the current design. Edit it through motor_model, so the UI is notified of changes"""
+        return self.motor_model.motor
+
+    def can_simulate(self) -> bool:
+        """
+        :return: true if the current design is complete enough to simulate
+        """
+        return len(self.motor.grains) > 0 and self.motor.nozzle is not None
+
+    def simulate(self) -> int or None:
+        """
+        Start simulating the current design on sim_runner, superseding the previous simulation
+        :return: the run id, or None if the design can't be simulated
+        """
+        if not self.can_simulate():
+            return None
+        return self.sim_runner.simulate(self.motor)
+
+    def _on_motor_changed(self):
+        if not self.settings.settings.redraw_on_changes:
+            return
+        if self.can_simulate():
+            self.simulate()
+        elif self._sim_runner is not None:
+            self._sim_runner.cancel()   # the running simulation is of a design that no longer exists
 
     def reset_design(self):
-        self.motor = OpenBurnMotor()
+        self.motor_model.set_motor(OpenBurnMotor())
 
     def save_current_design(self):
         self.save_design(self.current_design_filename)
@@ -39,7 +101,7 @@ class OpenBurnApplication(QObject):
     def load_design(self, filename: str):
         with open(filename, 'r') as f:
             data = f.read()
-            self.motor = OpenBurnMotor.from_json(data)
+            self.motor_model.set_motor(OpenBurnMotor.from_json(data))
 
 
 
@@ -0,0 +1,62 @@
+from qtpy.QtCore import QObject, Signal
+
+from openburn.core.grain import OpenBurnGrain
+from openburn.core.motor import OpenBurnMotor
+from openburn.core.nozzle import OpenBurnNozzle
+
+
+class MotorModel(QObject):
+    """Qt adapter around a plain OpenBurnMotor.
+    The core motor objects don't depend on Qt, so UI code edits the current design through this class,
+    which emits a signal for every change."""
+    motor_changed = Signal()    # emitted after any change to the design
+    motor_replaced = Signal()   # a different motor is being edited, e.g. a design was loaded
+    grains_changed = Signal()
+    nozzle_changed = Signal()
+
+    def __init__(self, motor: OpenBurnMotor = None):
+        super(MotorModel, self).__init__()
+        self.motor: OpenBurnMotor = motor if motor is not None else OpenBurnMotor()
+
+    def set_motor(self, motor: OpenBurnMotor) -> None:
+        self.motor = motor
+        self.motor_replaced.emit()
+        self.grains_changed.emit()
+        self.nozzle_changed.emit()
+        self.motor_changed.emit()
+
+    def _grains_edited(self) -> None:
+        self.motor.set_grains(self.motor.grains)  # recalculate the average propellant
+        self.grains_changed.emit()
+        self.motor_changed.emit()
+
+    def add_grain(self, grain: OpenBurnGrain) -> None:
+        self.motor.add_grain(grain)
+        self._grains_edited()
+
+    def update_grain(self, index: int, grain: OpenBurnGrain) -> None:
+        """
+        Replace a grain
+        :param index: position of the grain to replace, from the head end
+        :param grain: the new grain
+        """
+        self.motor.grains[index] = grain
+        self._grains_edited()
+
+    def remove_grain(self, index: int) -> None:
+        del self.motor.grains[index]
+        self._grains_edited()
+
+    def move_grain(self, index: int, offset: int) -> None:
+        """
+        Move a grain towards the aft end (positive offset) or head end (negative offset)
+        """
+        grains = self.motor.grains
+        new_index = min(max(index + offset, 0), len(grains) - 1)
+        grains.insert(new_index, grains.pop(index))
+        self._grains_edited()
+
+    def set_nozzle(self, nozzle: OpenBurnNozzle) -> None:
+        self.motor.set_nozzle(nozzle)
+        self.nozzle_changed.emit()
+        self.motor_changed.emit()
@@ -1,48 +1,101 @@
-from typing import Dict
-import jsonpickle
+from collections.abc import Mapping
+from os import path
+from typing import Dict, Iterator, List
 
 from qtpy.QtCore import QObject, Signal
 
+from openburn.application.propellant_store import PropellantStore
 from openburn.core.propellant import OpenBurnPropellant
 
 
+class PropellantMapping(Mapping):
+    """Read only view of a PropellantStore as a dict of propellant name : propellant.
+    Propellants are decoded the first time they are used, then kept"""
+    def __init__(self, store: PropellantStore):
+        self.store = store
+        self.loaded: Dict[str, OpenBurnPropellant] = {}
+
+    def __getitem__(self, name: str) -> OpenBurnPropellant:
+        try:
+            return self.loaded[name]
+        except KeyError:
+            propellant = self.store.load(name)
+            if propellant is None:
+                raise
+            self.loaded[name] = propellant
+            return propellant
+
+    def __contains__(self, name) -> bool:
+        return name in self.loaded or name in self.store
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.get_names())
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+
 class PropellantDatabase(QObject):
+    """The user's propellant library, stored in an SQLite database, see PropellantStore.
+    Every edit is saved as it is made, and propellants are only loaded when they are used"""
     database_ready = Signal()
     propellant_added = Signal(str)
     propellant_edited = Signal(str)
     propellant_removed = Signal(str)
 
     def __init__(self, filename: str = None):
+        """
+        :param filename: the database file, see load_database. Without one, the library is kept in memory
+        """
         super(PropellantDatabase, self).__init__()
-
-        # Dict ordered by propellant name : propellant
-        self.propellants: Dict[str: OpenBurnPropellant] = {}
+        self.database_filename: str = None
+        self.store = PropellantStore()
+        # propellant name : propellant, ordered by name
+        self.propellants: PropellantMapping = PropellantMapping(self.store)
         if filename is not None:
             self.load_database(filename)
 
-    def propellant_names(self):
-        return [prop.name for prop in self.propellants]
+    def propellant_names(self) -> List[str]:
+        return self.store.get_names()
 
     def load_database(self, filename: str):
-        self.clear_database()
-        with open(filename, 'r') as f:
-            data = f.read()
-            if len(data) > 0:
-                self.propellants = jsonpickle.decode(data)
-        self.database_filename: str = filename
+        """
+        Opens a propellant database. If it doesn't exist yet, it is created and the json library
+        of the same name, saved by earlier versions of OpenBurn, is imported into it
+        :param filename: the database file. A .json library name opens the .db file next to it
+        """
+        base, extension = path.splitext(filename)
+        if extension == '.json':
+            filename = base + '.db'
+        store = PropellantStore.open(filename, legacy_filename=base + '.json')
+        self.store.close()
+        self.store = store
+        self.propellants = PropellantMapping(store)
+        self.database_filename = filename
         self.database_ready.emit()
 
     def save_database(self):
-        with open(self.database_filename, 'w+') as f:
-            if len(self.propellants) > 0:
-                jsonpickle.set_encoder_options('json', sort_keys=True, indent=4)
-                f.write(jsonpickle.encode(self.propellants))
+        # edits are stored as they are made, this only makes sure they are on disk
+        self.store.connection.commit()
 
     def clear_database(self) -> None:
-        self.propellants.clear()
+        """
+        Removes every propellant from the database
+        """
+        self.store.clear()
+        self.propellants.loaded.clear()
+
+    def find_propellants(self, **ranges) -> List[OpenBurnPropellant]:
+        """
+        Finds propellants by their properties, without loading the rest of the library
+        :param ranges: property name : (minimum, maximum), see PropellantStore.find
+        :return: the matching propellants, ordered by name
+        """
+        return [self.propellants[name] for name in self.store.find(**ranges)]
 
     def add_propellant(self, propellant: OpenBurnPropellant) -> None:
-        self.propellants[propellant.name] = propellant
+        self.store.save(propellant)
+        self.propellants.loaded[propellant.name] = propellant
         self.propellant_added.emit(propellant.name)    # emit signal
 
     def remove_propellant(self, key: str) -> None:
@@ -50,15 +103,18 @@ class PropellantDatabase(QObject):
         Removes a propellant from the database
         :param key: the propellant name to be removed
         """
-        self.propellants.pop(key)
+        if key not in self.propellants:
+            raise KeyError(key)
+        self.store.remove(key)
+        self.propellants.loaded.pop(key, None)
         self.propellant_removed.emit(key)   # emit signal
 
     def update_propellant(self, key: str, new_prop: OpenBurnPropellant) -> None:
         """Updates the propellant database
         :param key: the old propellant's name
-        :param new_prop: the new propellant, to replace old_prop
+        :param new_prop: the new propellant, to replace old_prop. It is stored under its own name
         """
-        self.propellants[key] = new_prop
+        self.store.save(new_prop, replaces=key)
+        self.propellants.loaded.pop(key, None)
+        self.propellants.loaded[new_prop.name] = new_prop
         self.propellant_edited.emit(key)
-
-
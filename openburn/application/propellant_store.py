@@ -0,0 +1,175 @@
+"""
+SQLite storage of a propellant library.
+
+Every propellant is a row, keyed by name, with its burn rate and thermochemical properties in indexed columns so
+range queries never decode the rest of the library, and its full state as json so any propellant type can be
+stored. Edits are committed one entry at a time and entries are only decoded when they are loaded.
+The store does not depend on Qt, see openburn.application.propellant_db for the UI's database.
+"""
+import importlib
+import json
+import os
+import sqlite3
+from typing import Iterable, List, Optional, Tuple
+
+from openburn.core.propellant import OpenBurnPropellant
+from openburn.schema import decode_legacy
+
+SCHEMA_VERSION = 1  # sqlite user_version of the current schema
+INDEXED_PROPERTIES = ('a', 'n', 'cstar', 'rho', 'gamma')   # propellant attributes with their own column
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS propellants (
+    name TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    {', '.join(f'{name} REAL' for name in INDEXED_PROPERTIES)},
+    state TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS propellants_a ON propellants (a);
+CREATE INDEX IF NOT EXISTS propellants_n ON propellants (n);
+CREATE INDEX IF NOT EXISTS propellants_cstar ON propellants (cstar);
+PRAGMA user_version = {SCHEMA_VERSION};
+"""
+
+
+def _get_type_name(propellant: OpenBurnPropellant) -> str:
+    cls = type(propellant)
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _get_type(type_name: str) -> type:
+    module, _, name = type_name.rpartition('.')
+    if module != 'openburn' and not module.startswith('openburn.'):
+        raise ValueError(f"'{type_name}' is not a propellant type")     # never import modules named by the file
+    cls = getattr(importlib.import_module(module), name, None)
+    if not isinstance(cls, type) or not issubclass(cls, OpenBurnPropellant):
+        raise ValueError(f"'{type_name}' is not a propellant type")
+    return cls
+
+
+class PropellantStore:
+    """A propellant library in an SQLite database file"""
+    def __init__(self, filename: str = ':memory:'):
+        """
+        :param filename: the database file, created if it doesn't exist. Defaults to an in-memory database
+        """
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        version, = self.connection.execute('PRAGMA user_version').fetchone()
+        if version > SCHEMA_VERSION:
+            self.connection.close()
+            raise ValueError(f"{filename} was made by a newer version of OpenBurn")
+        with self.connection:
+            self.connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM propellants').fetchone()[0]
+
+    def __contains__(self, name: str) -> bool:
+        return self.connection.execute('SELECT 1 FROM propellants WHERE name = ?', (name,)).fetchone() is not None
+
+    def get_names(self) -> List[str]:
+        """
+        :return: the name of every propellant, in alphabetical order
+        """
+        return [name for name, in self.connection.execute('SELECT name FROM propellants ORDER BY name')]
+
+    def load(self, name: str) -> Optional[OpenBurnPropellant]:
+        """
+        :param name: the propellant's name
+        :return: the decoded propellant, or None if there is no propellant with that name
+        """
+        row = self.connection.execute('SELECT type, state FROM propellants WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            return None
+        type_name, state = row
+        cls = _get_type(type_name)
+        propellant = cls.__new__(cls)
+        propellant.__setstate__(json.loads(state))
+        return propellant
+
+    def save(self, propellant: OpenBurnPropellant, replaces: str = None) -> None:
+        """
+        Inserts or replaces a propellant, keyed by its name
+        :param propellant: the propellant to store
+        :param replaces: name of a propellant this one replaces, if it was renamed
+        """
+        self.save_many([propellant], replaces=[replaces] if replaces is not None else ())
+
+    def save_many(self, propellants: Iterable[OpenBurnPropellant], replaces: Iterable[str] = ()) -> None:
+        """
+        Inserts or replaces many propellants in one transaction
+        :param propellants: the propellants to store
+        :param replaces: names of propellants to remove first
+        """
+        rows = []
+        for propellant in propellants:
+            state = propellant.__getstate__()
+            rows.append((propellant.name, _get_type_name(propellant),
+                         *(state.get(name) for name in INDEXED_PROPERTIES), json.dumps(state, sort_keys=True)))
+        with self.connection:
+            self.connection.executemany('DELETE FROM propellants WHERE name = ?', [(name,) for name in replaces])
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO propellants VALUES ({', '.join('?' * (len(INDEXED_PROPERTIES) + 3))})",
+                rows)
+
+    def remove(self, name: str) -> None:
+        with self.connection:
+            self.connection.execute('DELETE FROM propellants WHERE name = ?', (name,))
+
+    def clear(self) -> None:
+        with self.connection:
+            self.connection.execute('DELETE FROM propellants')
+
+    def find(self, **ranges: Tuple[Optional[float], Optional[float]]) -> List[str]:
+        """
+        Finds propellants by their properties, using the column indexes
+        :param ranges: property name : (minimum, maximum), inclusive. Either limit may be None.
+            e.g. find(n=(0.2, 0.4), cstar=(4800, None))
+        :return: names of the matching propellants, in alphabetical order
+        """
+        conditions, params = [], []
+        for name, (minimum, maximum) in ranges.items():
+            if name not in INDEXED_PROPERTIES:
+                raise ValueError(f"Can't search propellants by '{name}'")
+            if minimum is not None:
+                conditions.append(f"{name} >= ?")
+                params.append(minimum)
+            if maximum is not None:
+                conditions.append(f"{name} <= ?")
+                params.append(maximum)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return [name for name, in self.connection.execute(f"SELECT name FROM propellants {where} ORDER BY name",
+                                                          params)]
+
+    def import_json(self, filename: str) -> int:
+        """
+        Imports a jsonpickle encoded propellant library, as saved by earlier versions of OpenBurn.
+        Both a list of propellants and a dict of name : propellant are accepted
+        :param filename: the json file
+        :return: the number of propellants imported
+        """
+        with open(filename, 'r') as f:
+            data = f.read()
+        propellants = decode_legacy(json.loads(data)) if data.strip() else []
+        if isinstance(propellants, dict):
+            propellants = list(propellants.values())
+        propellants = [prop for prop in propellants if isinstance(prop, OpenBurnPropellant)]
+        self.save_many(propellants)
+        return len(propellants)
+
+    @classmethod
+    def open(cls, filename: str, legacy_filename: str = None) -> "PropellantStore":
+        """
+        Opens a library, importing a json library the first time the database is created
+        :param filename: the database file
+        :param legacy_filename: a jsonpickle library to import if the database doesn't exist yet
+        """
+        is_new = not os.path.exists(filename)
+        store = cls(filename)
+        if is_new and legacy_filename is not None and os.path.exists(legacy_filename):
+            store.import_json(legacy_filename)
+        return store
@@ -0,0 +1,177 @@
+"""
+Simulation of designs on worker threads, so the UI never waits for the simulator.
+
+A SimRunner starts each simulation as a SimWorker on a QThreadPool. The worker reports progress with partial
+results while it runs, and can be cancelled between any two time steps. Only the latest run is reported:
+starting a run supersedes the runs before it, which are cancelled and whose signals are dropped.
+"""
+import threading
+from typing import Dict
+
+from qtpy.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from openburn.core.internalballistics import InternalBallisticsSim, SimSettings, SimulationException, \
+    SimulationStopped, PROGRESS_INTERVAL
+from openburn.core.motor import OpenBurnMotor
+from openburn.core.simcache import SimCache
+from openburn.core.simresults import SimResults
+
+
+class SimWorkerSignals(QObject):
+    """Signals of a SimWorker. QRunnable is not a QObject, so a worker emits through this object,
+    and the signals are queued to the threads of the connected objects"""
+    progress = Signal(int, object)  # run id, partial SimResults
+    finished = Signal(int, object)  # run id, SimResults
+    failed = Signal(int, str, object)   # run id, error message, partial SimResults or None
+    cancelled = Signal(int)     # run id
+
+
+class SimWorker(QRunnable):
+    """Simulates a single motor on a thread pool"""
+    def __init__(self, run_id: int, motor: OpenBurnMotor, settings: SimSettings, cache: SimCache = None,
+                 progress_interval: float = PROGRESS_INTERVAL):
+        """
+        :param run_id: identifies the run in the worker's signals
+        :param motor: the motor to simulate. It must not be edited while the worker runs, so pass a copy
+        :param settings: settings of the simulation
+        :param cache: optional SimCache to load results from and store them in
+        :param progress_interval: seconds between progress signals
+        """
+        super(SimWorker, self).__init__()
+        self.run_id = run_id
+        self.motor = motor
+        self.settings = settings
+        self.cache = cache
+        self.progress_interval = progress_interval
+        self.signals = SimWorkerSignals()
+        self._cancelled = threading.Event()
+        self.setAutoDelete(False)   # owned by its SimRunner until it has reported its end
+
+    def cancel(self) -> None:
+        """
+        Stop the simulation at the next time step. Safe to call from any thread
+        """
+        self._cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def run(self) -> None:
+        try:
+            results = self.simulate()
+        except SimulationException as e:
+            self.signals.failed.emit(self.run_id, str(e), e.results)
+        except Exception as e:  # anything raised here would be lost with the thread, so report every error
+            self.signals.failed.emit(self.run_id, f"{type(e).__name__}: {e}", None)
+        else:
+            if results is None:
+                self.signals.cancelled.emit(self.run_id)
+            else:
+                self.signals.finished.emit(self.run_id, results)
+
+    def simulate(self) -> SimResults or None:
+        """
+        Simulate the motor in the calling thread, emitting progress
+        :return: the results, or None if the run was cancelled
+        :raises SimulationException: if the motor can't be simulated. The exception holds the partial results
+        """
+        if self.is_cancelled():
+            return None     # superseded before it started
+        try:
+            return InternalBallisticsSim.run_sim(self.motor, self.settings, self.cache,
+                                                 stop=lambda point: self.is_cancelled(),
+                                                 progress=self._emit_progress,
+                                                 progress_interval=self.progress_interval)
+        except SimulationStopped:
+            if self.is_cancelled():
+                return None
+            raise
+
+    def _emit_progress(self, results: SimResults) -> None:
+        self.signals.progress.emit(self.run_id, results)
+
+
+class SimRunner(QObject):
+    """Runs simulations on a thread pool and reports the latest one with signals, in the runner's thread"""
+    started = Signal(int)   # run id
+    progress = Signal(int, object)  # run id, partial SimResults
+    finished = Signal(int, object)  # run id, SimResults
+    failed = Signal(int, str)   # run id, error message
+    cancelled = Signal(int)     # run id
+
+    def __init__(self, settings: SimSettings = None, cache: SimCache = None, thread_pool: QThreadPool = None,
+                 progress_interval: float = PROGRESS_INTERVAL):
+        """
+        :param settings: settings of every simulation, defaults to SimSettings()
+        :param cache: optional SimCache shared by the simulations
+        :param thread_pool: the pool to run simulations on, defaults to the global pool
+        :param progress_interval: seconds between progress signals of a running simulation
+        """
+        super(SimRunner, self).__init__()
+        self.settings = settings if settings is not None else SimSettings()
+        self.cache = cache
+        self.progress_interval = progress_interval
+        self.thread_pool = thread_pool if thread_pool is not None else QThreadPool.globalInstance()
+        self.current_run: int = None    # id of the run being reported, None when idle
+        self.results: SimResults = None     # the results of the latest finished run
+        self._workers: Dict[int, SimWorker] = {}    # run id : worker that hasn't reported its end yet
+        self._last_run_id = 0
+
+    def is_running(self) -> bool:
+        return self.current_run is not None
+
+    def simulate(self, motor: OpenBurnMotor) -> int:
+        """
+        Start simulating a motor, superseding any run in progress
+        :param motor: the motor to simulate. It is copied, so it can be edited while the simulation runs
+        :return: the id of the new run
+        """
+        self.cancel()
+        self.current_run = None     # the cancelled runs are superseded, not reported
+        self._last_run_id += 1
+        run_id = self._last_run_id
+
+        worker = SimWorker(run_id, motor.copy(), self.settings, self.cache, self.progress_interval)
+        worker.signals.progress.connect(self._on_progress)
+        worker.signals.finished.connect(self._on_finished)
+        worker.signals.failed.connect(self._on_failed)
+        worker.signals.cancelled.connect(self._on_cancelled)
+        self._workers[run_id] = worker
+        self.current_run = run_id
+        self.started.emit(run_id)
+        self.thread_pool.start(worker)
+        return run_id
+
+    def cancel(self) -> None:
+        """
+        Cancel every run in progress. cancelled is emitted once the current run has stopped
+        """
+        for worker in self._workers.values():
+            worker.cancel()
+
+    def _end_run(self, run_id: int) -> bool:
+        """
+        :return: true if the run is the current one, which is then finished
+        """
+        self._workers.pop(run_id, None)
+        if run_id != self.current_run:
+            return False    # superseded
+        self.current_run = None
+        return True
+
+    def _on_progress(self, run_id: int, results: SimResults) -> None:
+        if run_id == self.current_run:
+            self.progress.emit(run_id, results)
+
+    def _on_finished(self, run_id: int, results: SimResults) -> None:
+        if self._end_run(run_id):
+            self.results = results
+            self.finished.emit(run_id, results)
+
+    def _on_failed(self, run_id: int, message: str, results: SimResults) -> None:
+        if self._end_run(run_id):
+            self.failed.emit(run_id, message)
+
+    def _on_cancelled(self, run_id: int) -> None:
+        if self._end_run(run_id):
+            self.cancelled.emit(run_id)
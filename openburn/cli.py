@@ -0,0 +1,278 @@
+"""
+Headless batch simulation of motor design files, without Qt or a display.
+
+Designs are read from files, directories, glob patterns, or as one json document per line from stdin ('-'),
+loaded and simulated across a pool of worker processes, and the summary metrics of each design are written to
+stdout as json lines or csv, in input order, as soon as they are ready.
+
+usage: python -m openburn [-h] [--set NAME=VALUE] [--workers N] [--format {jsonl,csv}] [--cache [DIR]]
+                          [--max-pressure PSI] [--profile FRACTION] input [input ...]
+"""
+import argparse
+import csv
+import glob
+import inspect
+import json
+import os
+import sys
+import zlib
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from enum import Enum
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, TextIO, Tuple
+
+from openburn.core.internalballistics import InternalBallisticsSim, SimSettings, SimulationException, PressureLimit
+from openburn.core.motor import OpenBurnMotor
+from openburn.core.simcache import SimCache
+from openburn.core.simprofile import SimProfile
+from openburn.core.simresults import SimDataPoint, SimResults
+
+DESIGN_EXTENSIONS = ('.json', '.obz')   # files picked from directories, design json and binary design documents
+STDIN = '-'
+MAX_CHUNK_SIZE = 64     # designs sent to a worker at once, larger chunks have less overhead but stream less often
+CHUNKS_PER_WORKER = 2   # chunks queued per worker, so workers don't idle while designs are read
+
+# a design to simulate, (name, document). The document is None for files, which the worker reads itself
+Design = Tuple[str, bytes or None]
+
+# settings of a worker process, set once by _init_worker so they aren't pickled for every design
+_worker_settings: SimSettings = None
+_worker_cache: SimCache = None
+_worker_stop: Callable[[SimDataPoint], bool] = None
+_worker_profile_rate: float = 0
+
+
+def _init_worker(settings: SimSettings, cache: SimCache = None, stop: Callable[[SimDataPoint], bool] = None,
+                 profile_rate: float = 0) -> None:
+    global _worker_settings, _worker_cache, _worker_stop, _worker_profile_rate
+    _worker_settings = settings
+    _worker_cache = cache
+    _worker_stop = stop
+    _worker_profile_rate = profile_rate
+
+
+def is_sampled(name: str, rate: float) -> bool:
+    """
+    :param name: the design's name
+    :param rate: fraction of designs to sample
+    :return: true if the design is in the sample. The same designs are sampled every run
+    """
+    return zlib.crc32(name.encode()) < rate * 2 ** 32
+
+
+def _simulate_design(design: Design) -> Dict[str, float] or str:
+    """
+    Load and simulate a single design
+    :return: the summary metrics, with the SimProfile summary as 'profile' if the design was sampled for profiling,
+        or an error message if the design could not be loaded or simulated
+    """
+    name, data = design
+    profile = SimProfile() if is_sampled(name, _worker_profile_rate) else None
+    try:
+        if data is None:
+            with open(name, 'rb') as f:
+                data = f.read()
+        motor = OpenBurnMotor.from_json(data)
+        summary = InternalBallisticsSim.run_sim(motor, _worker_settings, _worker_cache, _worker_stop,
+                                                profile).get_summary()
+        if profile is not None:
+            summary['profile'] = profile.get_summary()
+        return summary
+    except (SimulationException, OSError, ValueError, TypeError, KeyError, ZeroDivisionError) as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def _simulate_chunk(designs: List[Design]) -> List[Dict[str, float] or str]:
+    return [_simulate_design(design) for design in designs]
+
+
+def iter_chunks(designs: Iterable[Design], max_size: int = MAX_CHUNK_SIZE) -> Iterator[List[Design]]:
+    """
+    :param designs: see iter_designs
+    :param max_size: largest chunk
+    :return: consecutive chunks of the designs. The first chunks are small, so the first results are written
+        without waiting for many designs to be read, and their size doubles up to max_size
+    """
+    designs = iter(designs)
+    size = 1
+    while True:
+        chunk = list(islice(designs, size))
+        if not chunk:
+            return
+        yield chunk
+        size = min(2 * size, max_size)
+
+
+def parse_settings(overrides: Iterable[str]) -> SimSettings:
+    """
+    :param overrides: 'name=value' strings, where name is a SimSettings argument, e.g. 'timestep=0.005'
+    :return: the settings, with defaults for anything not overridden
+    :raises ValueError: for unknown names or invalid values
+    """
+    params = inspect.signature(SimSettings).parameters
+    kwargs = {}
+    for override in overrides:
+        name, sep, value = override.partition('=')
+        name = name.strip()
+        if not sep or name not in params:
+            raise ValueError(f"Unknown sim setting '{override}', expected one of: {', '.join(params)}")
+        default = params[name].default
+        if isinstance(default, Enum):
+            kwargs[name] = type(default)(value.strip().lower())
+        elif isinstance(default, bool):
+            if value.strip().lower() not in ('true', 'false', '1', '0'):
+                raise ValueError(f"{name} must be true or false")
+            kwargs[name] = value.strip().lower() in ('true', '1')
+        else:
+            kwargs[name] = type(default)(value)
+    return SimSettings(**kwargs)
+
+
+def iter_designs(inputs: Iterable[str], stdin: TextIO = None) -> Iterator[Design]:
+    """
+    :param inputs: design files, directories of design files, glob patterns, or '-' for json lines from stdin
+    :param stdin: the stream read for '-', defaults to sys.stdin
+    :return: the designs, in input order. Directories and patterns are sorted by name.
+        Files are listed right away, while stdin is only read as the designs are iterated
+    :raises ValueError: for inputs that don't match any file, before any design is read
+    """
+    sources: List[List[Design] or str] = []    # the designs of each input, or STDIN
+    for item in inputs:
+        if item == STDIN:
+            sources.append(STDIN)
+        elif os.path.isdir(item):
+            sources.append([(filename, None) for filename in
+                            (os.path.join(item, name) for name in sorted(os.listdir(item)))
+                            if filename.endswith(DESIGN_EXTENSIONS) and os.path.isfile(filename)])
+        elif os.path.isfile(item):
+            sources.append([(item, None)])
+        else:
+            filenames = sorted(filename for filename in glob.glob(item, recursive=True) if os.path.isfile(filename))
+            if not filenames:
+                raise ValueError(f"No design files match '{item}'")
+            sources.append([(filename, None) for filename in filenames])
+    return _read_designs(sources, stdin or sys.stdin)
+
+
+def _read_designs(sources: List[List[Design] or str], stdin: TextIO) -> Iterator[Design]:
+    for source in sources:
+        if isinstance(source, str):
+            for number, line in enumerate(stdin, start=1):
+                if line.strip():
+                    yield f"{STDIN}:{number}", line.encode()
+        else:
+            yield from source
+
+
+def simulate_designs(designs: Iterable[Design], settings: SimSettings, workers: int = None, cache: SimCache = None,
+                     stop: Callable[[SimDataPoint], bool] = None,
+                     profile_rate: float = 0) -> Iterator[Tuple[str, Dict[str, float] or str]]:
+    """
+    Load and simulate designs across a pool of worker processes.
+    Designs are read as the workers need them, so a stream of designs is simulated as it arrives
+    :param designs: see iter_designs
+    :param settings: settings used to simulate every design
+    :param workers: number of worker processes. Defaults to the number of cores,
+        1 simulates in this process without a pool
+    :param cache: optional SimCache shared by the workers
+    :param stop: optional stop condition, see ParameterSweep
+    :param profile_rate: fraction of designs to profile, see is_sampled
+    :return: (name, summary metrics or error message) of each design, in input order, as they are ready
+    """
+    workers = workers if workers is not None else os.cpu_count()
+    if workers <= 1:
+        _init_worker(settings, cache, stop, profile_rate)
+        for design in designs:
+            yield design[0], _simulate_design(design)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(settings, cache, stop, profile_rate)) as executor:
+        pending = deque()   # (chunk, future), in input order
+        for chunk in iter_chunks(designs):
+            pending.append((chunk, executor.submit(_simulate_chunk, chunk)))
+            if len(pending) >= CHUNKS_PER_WORKER * workers:
+                yield from _chunk_results(*pending.popleft())
+        while pending:
+            yield from _chunk_results(*pending.popleft())
+
+
+def _chunk_results(chunk: List[Design], future: Future) -> Iterator[Tuple[str, Dict[str, float] or str]]:
+    for design, summary in zip(chunk, future.result()):
+        yield design[0], summary
+
+
+def write_results(results: Iterable[Tuple[str, Dict[str, float] or str]], f: TextIO, output_format: str,
+                  profiled: bool = False) -> int:
+    """
+    Writes a row per design as it is ready, with the design's name, summary metrics and 'error' (None if successful)
+    :param results: see simulate_designs
+    :param f: text file to write to
+    :param output_format: 'jsonl' or 'csv'
+    :param profiled: add a 'profile' column, with the SimProfile summary of sampled designs. In csv it is json
+    :return: the number of designs that failed
+    """
+    fields = ['design'] + list(SimResults.SUMMARY_METRICS) + ['error'] + (['profile'] if profiled else [])
+    writer = None
+    if output_format == 'csv':
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+
+    failed = 0
+    for name, summary in results:
+        row: Dict[str, Any] = {'design': name}
+        if isinstance(summary, str):
+            row.update({metric: None for metric in SimResults.SUMMARY_METRICS})
+            row['error'] = summary
+            failed += 1
+        else:
+            row.update(summary)
+            row['error'] = None
+        if writer is not None:
+            if row.get('profile') is not None:
+                row['profile'] = json.dumps(row['profile'])
+            writer.writerow(row)
+        else:
+            f.write(json.dumps(row) + '\n')
+        f.flush()
+    return failed
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    :return: exit status, 0 if every design was simulated, 1 if any failed, 2 for invalid arguments
+    """
+    parser = argparse.ArgumentParser(prog='openburn', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', metavar='input',
+                        help="design file, directory, glob pattern, or '-' to read json lines from stdin")
+    parser.add_argument('--set', dest='settings', action='append', default=[], metavar='NAME=VALUE',
+                        help="override a sim setting, e.g. --set timestep=0.005 --set engine=numpy. "
+                             f"Settings: {', '.join(inspect.signature(SimSettings).parameters)}")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes, defaults to the number of cores")
+    parser.add_argument('--format', dest='output_format', choices=('jsonl', 'csv'), default='jsonl')
+    parser.add_argument('--cache', nargs='?', const='', default=None, metavar='DIR',
+                        help="reuse cached results, in DIR or the default cache directory")
+    parser.add_argument('--max-pressure', type=float, default=None, metavar='PSI',
+                        help="abandon designs whose chamber pressure exceeds this, reporting them as errors")
+    parser.add_argument('--profile', type=float, default=0, metavar='FRACTION',
+                        help="profile a fraction of the designs, adding timers and counters to their rows")
+    args = parser.parse_args(argv)
+
+    try:
+        settings = parse_settings(args.settings)
+        designs = iter_designs(args.inputs)     # streamed, so designs are simulated as they are read
+    except ValueError as e:
+        parser.error(str(e))    # exits with status 2
+
+    cache = SimCache(args.cache or None) if args.cache is not None else None
+    stop = PressureLimit(args.max_pressure) if args.max_pressure is not None else None
+    try:
+        failed = write_results(simulate_designs(designs, settings, args.workers, cache, stop, args.profile),
+                               sys.stdout, args.output_format, profiled=args.profile > 0)
+    except BrokenPipeError:
+        # the reader of the output exited, e.g. piped into head. Silence the error python reports at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    return 1 if failed else 0
@@ -1,14 +1,52 @@
 from abc import abstractmethod
 from math import pi
+from typing import Tuple
 
+import numpy as np
+
+from openburn.core.portgeometry import Port, PortMap, DEFAULT_RESOLUTION, make_port, get_port_map
 from openburn.core.propellant import OpenBurnPropellant
 from openburn.object import OpenBurnObject
 
+GEOMETRY_TABLE_POINTS = 201     # default number of web distances sampled by OpenBurnGrain.get_geometry_table
+
+
+class GrainGeometryTable:
+    """Burning area, port area and remaining volume of a grain, sampled at evenly spaced web distances
+    from zero (the grain's state when the table was made) to burnout"""
+    def __init__(self, web: np.ndarray, burning_area: np.ndarray, port_area: np.ndarray, volume: np.ndarray):
+        """
+        :param web: web distances burned, in inches, evenly spaced and starting at 0
+        :param burning_area: burning surface area at each web distance, in in^2
+        :param port_area: port area at each web distance, in in^2
+        :param volume: propellant volume at each web distance, in in^3
+        """
+        self.web = web
+        self.burning_area = burning_area
+        self.port_area = port_area
+        self.volume = volume
+        for array in (web, burning_area, port_area, volume):
+            array.flags.writeable = False   # tables are cached and shared between grain copies
+
+    def get_web_thickness(self) -> float:
+        return float(self.web[-1])
+
+    def interpolate(self, web) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        :param web: web distance burned, in inches. A float or numpy array
+        :return: tuple of (burning area, port area, volume), interpolated at each web distance
+        """
+        return (np.interp(web, self.web, self.burning_area),
+                np.interp(web, self.web, self.port_area),
+                np.interp(web, self.web, self.volume))
+
 
 class OpenBurnGrain(OpenBurnObject):
     """Base class of all propellant segments.
     The segment is cylindrical with a 2D port shape extruded through the entire length.
     """
+    __slots__ = ('diameter', 'length', 'burning_faces', 'propellant', 'burn_rate', '_geometry_table')
+
     def __init__(self, diameter: float, length: float, burning_faces: float,
                  propellant: OpenBurnPropellant = None):
 
@@ -30,6 +68,52 @@ class OpenBurnGrain(OpenBurnObject):
         port_volume = self.get_port_area() * self.length
         return grain_volume - port_volume
 
+    def get_face_area(self) -> float:
+        """
+        :return: area of a single uninhibited end face, in in^2
+        """
+        return (self.diameter / 2) ** 2 * pi - self.get_port_area()
+
+    @abstractmethod
+    def get_web_thickness(self) -> float:
+        """
+        :return: distance the grain can regress before it burns out, in inches
+        """
+
+    @abstractmethod
+    def get_geometry_at_web(self, web) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Grain geometry after regressing a given distance from its current state
+        :param web: web distance burned, in inches. A float or numpy array
+        :return: tuple of (burning area in in^2, port area in in^2, propellant volume in in^3)
+        """
+
+    def get_geometry_table(self, points: int = GEOMETRY_TABLE_POINTS) -> GrainGeometryTable:
+        """
+        Geometry of the grain from its current state to burnout, see GrainGeometryTable.
+        The table is cached until the grain's dimensions change.
+        New grain types only need to implement get_web_thickness and get_geometry_at_web
+        :param points: number of web distances to sample
+        """
+        key = (self._get_geometry_key(), points)
+        cached = getattr(self, '_geometry_table', None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        web = np.linspace(0, self.get_web_thickness(), points)
+        burning_area, port_area, volume = (np.array(x, dtype=float) * np.ones_like(web)
+                                           for x in self.get_geometry_at_web(web))
+        table = GrainGeometryTable(web, burning_area, port_area, volume)
+        self._geometry_table = (key, table)
+        return table
+
+    def _get_geometry_key(self) -> tuple:
+        """
+        :return: the params that define the grain's geometry
+        """
+        return tuple(getattr(self, key, None) for key in self.get_slots()
+                     if key not in ('uuid', 'propellant', 'burn_rate') and not key.startswith('_'))
+
     @abstractmethod
     def get_burning_area(self) -> float:
         """
@@ -70,6 +154,8 @@ class OpenBurnGrain(OpenBurnObject):
 
 class CylindricalCoreGrain(OpenBurnGrain):
     """A cylindrical core BATES grain"""
+    __slots__ = ('core_diameter',)
+
     def __init__(self, diameter: float, length: float, burning_faces: float,
                  core_diameter: float, propellant: OpenBurnPropellant = None):
         """
@@ -95,6 +181,19 @@ class CylindricalCoreGrain(OpenBurnGrain):
     def get_port_area(self) -> float:
         return (self.core_diameter / 2) ** 2 * pi
 
+    def get_web_thickness(self) -> float:
+        return max((self.diameter - self.core_diameter) / 2, 0)
+
+    def get_geometry_at_web(self, web) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        core_diameter = self.core_diameter + 2 * web
+        length = self.length - self.burning_faces * web
+
+        port_area = (core_diameter / 2) ** 2 * pi
+        face_area = 1/4 * pi * (self.diameter ** 2 - core_diameter ** 2)
+        burning_area = pi * core_diameter * length + self.burning_faces * face_area
+        volume = face_area * length
+        return burning_area, port_area, volume
+
     def get_burning_area(self):
         core_area = pi * self.core_diameter * self.length
         face_area = 1/4*pi * (self.diameter**2 - self.core_diameter**2)
@@ -111,3 +210,74 @@ class CylindricalCoreGrain(OpenBurnGrain):
 
     def is_burned_out(self):
         return self.core_diameter >= self.diameter
+
+
+class PortGeometryGrain(OpenBurnGrain):
+    """A grain with any 2D port shape, such as a star, finocyl, moonburner or C-slot.
+    See openburn.core.portgeometry for the port shapes and how they regress."""
+    __slots__ = ('port', 'resolution', 'web_burned')
+
+    def __init__(self, diameter: float, length: float, port: Port, burning_faces: float,
+                 propellant: OpenBurnPropellant = None, resolution: int = DEFAULT_RESOLUTION):
+        """
+        :param diameter: the grain's diameter, in inches
+        :param length: the grain's length, in inches
+        :param port: polygons making up the port, see openburn.core.portgeometry
+        :param burning_faces: # of faces burning. two is typical, if both are inhibited, this number is 0
+        :param propellant: an OpenBurnPropellant object
+        :param resolution: number of raster cells across the grain diameter used to regress the port
+        """
+        super(PortGeometryGrain, self).__init__(diameter, length, burning_faces, propellant)
+        self.port: Port = make_port(port)
+        self.resolution: int = resolution
+        self.web_burned: float = 0  # distance the port surface has regressed, in inches
+
+    def get_port_map(self) -> PortMap:
+        """
+        :return: port area and perimeter of the initial port against web distance. Cached, see get_port_map
+        """
+        return get_port_map(self.port, self.diameter, self.resolution)
+
+    def get_perimeter(self) -> float:
+        """
+        :return: length of the burning port surface, in inches
+        """
+        return float(self.get_port_map().get_perimeter(self.web_burned))
+
+    def get_port_area(self) -> float:
+        return float(self.get_port_map().get_port_area(self.web_burned))
+
+    def get_web_thickness(self) -> float:
+        return max(self.get_port_map().get_web_thickness() - self.web_burned, 0)
+
+    def get_geometry_at_web(self, web) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        port_map = self.get_port_map()
+        length = self.length - self.burning_faces * web
+
+        port_area = port_map.get_port_area(self.web_burned + web)
+        face_area = (self.diameter / 2) ** 2 * pi - port_area
+        burning_area = port_map.get_perimeter(self.web_burned + web) * length + self.burning_faces * face_area
+        volume = face_area * length
+        return burning_area, port_area, volume
+
+    def burn(self, burnrate: float, time_step: float) -> bool:
+        if self.is_burned_out():
+            return False
+        self.burn_rate = burnrate
+
+        burn_dist = burnrate * time_step
+        self.web_burned += burn_dist
+        self.length -= self.burning_faces * burn_dist
+        return True
+
+    def get_burning_area(self) -> float:
+        return float(self.get_geometry_at_web(0)[0])
+
+    def get_upstream_burning_area(self, x_val: float) -> float:
+        if x_val > self.length:
+            return 0
+        faces = self.burning_faces > 1
+        return self.get_perimeter() * (self.length - x_val) + self.get_face_area() * int(faces)
+
+    def is_burned_out(self) -> bool:
+        return self.web_burned >= self.get_port_map().get_web_thickness()
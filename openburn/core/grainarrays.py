@@ -0,0 +1,347 @@
+from copy import copy
+from math import pi
+from typing import List, Tuple
+
+import numpy as np
+
+from openburn.core.grain import OpenBurnGrain, CylindricalCoreGrain
+
+
+class GrainArrays:
+    """Structure-of-arrays view of a motor's grains, used by the vectorized simulation engine.
+    Every grain param lives in a contiguous numpy array indexed by grain position (head end first),
+    so the whole motor regresses with a single array operation per time step.
+
+    NOTE: only CylindricalCoreGrain segments can be represented this way at the moment
+    """
+    def __init__(self, grains: List[OpenBurnGrain]):
+        """
+        :param grains: the motor's grains, from head end to aft end. The grain objects are not modified.
+        :raises TypeError: if a grain type cannot be represented by arrays
+        """
+        for grain in grains:
+            if not isinstance(grain, CylindricalCoreGrain):
+                raise TypeError(f"{type(grain).__name__} is not supported by the vectorized engine")
+
+        # all lengths in inches
+        self.diameter = np.array([grain.diameter for grain in grains], dtype=float)
+        self.core_diameter = np.array([grain.core_diameter for grain in grains], dtype=float)
+        self.length = np.array([grain.length for grain in grains], dtype=float)
+        self.burning_faces = np.array([grain.burning_faces for grain in grains], dtype=float)
+
+        # propellant params, see SimplePropellant
+        self.a = np.array([grain.propellant.a for grain in grains], dtype=float)
+        self.n = np.array([grain.propellant.n for grain in grains], dtype=float)
+        self.rho = np.array([grain.propellant.rho for grain in grains], dtype=float)
+
+        self.burn_rate = np.zeros(len(grains))
+
+    def __len__(self) -> int:
+        return len(self.diameter)
+
+    def get_port_area(self) -> np.ndarray:
+        """
+        :return: port area of each grain, in in^2
+        """
+        return (self.core_diameter / 2) ** 2 * pi
+
+    def get_face_area(self) -> np.ndarray:
+        """
+        :return: area of a single burning face of each grain, in in^2
+        """
+        return 1/4 * pi * (self.diameter ** 2 - self.core_diameter ** 2)
+
+    def get_burning_area(self) -> np.ndarray:
+        """
+        :return: uninhibited burning area of each grain, in in^2
+        """
+        core_area = pi * self.core_diameter * self.length
+        return core_area + self.burning_faces * self.get_face_area()
+
+    def get_mass_flow(self) -> np.ndarray:
+        """
+        :return: mass flow generated by each grain, in lb/sec
+        """
+        return self.get_burning_area() * self.rho * self.burn_rate
+
+    def get_burn_rate(self, chamber_pressure: float) -> np.ndarray:
+        """
+        Steady state burn rate of each grain, r = aP^n
+        :param chamber_pressure: chamber pressure, in psi
+        :return: burn rate of each grain, in inches / second
+        """
+        return self.a * chamber_pressure ** self.n
+
+    def is_burned_out(self) -> np.ndarray:
+        """
+        :return: boolean mask of grains that are burned out
+        """
+        return self.core_diameter >= self.diameter
+
+    def get_web_remaining(self) -> np.ndarray:
+        """
+        :return: distance each grain can regress before it burns out, in inches
+        """
+        return (self.diameter - self.core_diameter) / 2
+
+    def copy(self) -> "GrainArrays":
+        """
+        :return: an independent copy of the grain state
+        """
+        result = self.__class__.__new__(self.__class__)
+        for key, value in self.__dict__.items():
+            setattr(result, key, value.copy())
+        return result
+
+    def apply_to(self, grains: List[CylindricalCoreGrain]) -> None:
+        """
+        Copy the regressed state back into grain objects
+        :param grains: grains matching the ones these arrays were created from
+        """
+        for i, grain in enumerate(grains):
+            grain.core_diameter = float(self.core_diameter[i])
+            grain.length = float(self.length[i])
+            grain.burn_rate = float(self.burn_rate[i])
+
+    def burn(self, burn_rate: np.ndarray, time_step: float) -> None:
+        """
+        Regress every grain that is not yet burned out, see CylindricalCoreGrain.burn
+        :param burn_rate: burn rate of each grain, in inches / second
+        :param time_step: how much time will pass
+        """
+        burning = ~self.is_burned_out()
+        self.burn_rate = np.where(burning, burn_rate, self.burn_rate)
+        self.regress(np.where(burning, burn_rate * time_step, 0))
+
+    def regress(self, burn_dist: np.ndarray) -> None:
+        """
+        Regress each grain's burning surfaces by the given distance
+        :param burn_dist: distance to regress each grain, in inches
+        """
+        self.core_diameter += 2 * burn_dist
+        self.length -= self.burning_faces * burn_dist
+
+
+class GrainTables:
+    """Structure-of-arrays view of a motor's grain geometry tables, used by the web-space simulation engine.
+    The state of each grain is a single number, the web distance it has burned, and its geometry is
+    interpolated from the grain's cached GrainGeometryTable. Any grain type that provides a geometry table
+    is supported."""
+    def __init__(self, grains: List[OpenBurnGrain]):
+        """
+        :param grains: the motor's grains, from head end to aft end. The grain objects are not modified.
+        """
+        tables = [grain.get_geometry_table() for grain in grains]
+
+        # tables are stacked into (grain, sample) arrays, all lengths in inches
+        self.web_thickness = np.array([table.get_web_thickness() for table in tables], dtype=float)
+        self.burning_area_table = np.array([table.burning_area for table in tables], dtype=float)
+        self.port_area_table = np.array([table.port_area for table in tables], dtype=float)
+        self.volume_table = np.array([table.volume for table in tables], dtype=float)
+        self.outer_area = np.array([(grain.diameter / 2) ** 2 * pi for grain in grains], dtype=float)
+        self.burning_faces = np.array([grain.burning_faces for grain in grains], dtype=float)
+
+        # propellant params, see SimplePropellant
+        self.a = np.array([grain.propellant.a for grain in grains], dtype=float)
+        self.n = np.array([grain.propellant.n for grain in grains], dtype=float)
+        self.rho = np.array([grain.propellant.rho for grain in grains], dtype=float)
+
+        self.web = np.zeros(len(grains))
+        self.burn_rate = np.zeros(len(grains))
+
+    def __len__(self) -> int:
+        return len(self.web_thickness)
+
+    def _interpolate(self, table: np.ndarray, web: np.ndarray = None) -> np.ndarray:
+        """Linear interpolation of every grain's table at once, the tables share evenly spaced samples"""
+        web = self.web if web is None else web
+        last = table.shape[1] - 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            position = np.where(self.web_thickness > 0, web / self.web_thickness, 1.0) * last
+        position = np.clip(position, 0, last)
+        index = np.minimum(position.astype(int), last - 1)
+        frac = position - index
+        rows = np.arange(len(table))
+        return table[rows, index] * (1 - frac) + table[rows, index + 1] * frac
+
+    def get_burning_area(self, web: np.ndarray = None) -> np.ndarray:
+        """
+        :param web: optional web distance of each grain, instead of the current state
+        :return: burning area of each grain, in in^2
+        """
+        return self._interpolate(self.burning_area_table, web)
+
+    def get_port_area(self) -> np.ndarray:
+        """
+        :return: port area of each grain, in in^2
+        """
+        return self._interpolate(self.port_area_table)
+
+    def get_volume(self) -> np.ndarray:
+        """
+        :return: remaining propellant volume of each grain, in in^3
+        """
+        return self._interpolate(self.volume_table)
+
+    def get_face_area(self) -> np.ndarray:
+        """
+        :return: area of a single burning face of each grain, in in^2
+        """
+        return self.outer_area - self.get_port_area()
+
+    def get_mass_flow(self) -> np.ndarray:
+        """
+        :return: mass flow generated by each grain, in lb/sec
+        """
+        return self.get_burning_area() * self.rho * self.burn_rate
+
+    def get_burn_rate(self, chamber_pressure: float) -> np.ndarray:
+        """
+        :param chamber_pressure: chamber pressure in psi
+        :return: burn rate of each grain, in inches / second
+        """
+        return self.a * chamber_pressure ** self.n
+
+    def get_web_remaining(self) -> np.ndarray:
+        """
+        :return: distance each grain can regress before it burns out, in inches
+        """
+        return self.web_thickness - self.web
+
+    def is_burned_out(self) -> np.ndarray:
+        """
+        :return: boolean mask of grains that are burned out
+        """
+        return self.web >= self.web_thickness
+
+    def regressed(self, burn_dist: np.ndarray) -> "GrainTables":
+        """
+        :param burn_dist: distance to regress each grain, in inches
+        :return: a copy of the state regressed by the given distance. The tables are shared, not copied
+        """
+        result = copy(self)
+        result.web = np.minimum(self.web + burn_dist, self.web_thickness)
+        result.burn_rate = self.burn_rate.copy()
+        return result
+
+    def apply_to(self, grains: List[OpenBurnGrain]) -> None:
+        """
+        Regress grain objects to the current state
+        :param grains: unburned copies of the grains these tables were created from
+        """
+        for i, grain in enumerate(grains):
+            web = float(self.web[i])
+            if web > 0:
+                grain.burn(web, 1.0)
+            grain.burn_rate = float(self.burn_rate[i])
+
+
+class GrainCells:
+    """Cylindrical grains split into axial cells of equal length, used to model erosive burning.
+    Each cell has its own core diameter, so the core can regress faster where the mass flux is high.
+    Arrays of cell params have the shape (grain, cell), with cells ordered from the head end of each grain,
+    so flattening them orders every cell in the motor from head end to aft end.
+    The end faces regress with the grain's length, and take the diameter of the cell they bound."""
+    def __init__(self, grains: List[OpenBurnGrain], cells: int):
+        """
+        :param grains: the motor's grains, from head end to aft end. The grain objects are not modified.
+        :param cells: number of cells each grain is split into
+        :raises TypeError: if a grain is not a CylindricalCoreGrain
+        """
+        arrays = GrainArrays(grains)
+        self.diameter = arrays.diameter
+        self.length = arrays.length
+        self.burning_faces = arrays.burning_faces
+        self.a = arrays.a
+        self.n = arrays.n
+        self.rho = arrays.rho
+
+        self.core_diameter = np.repeat(arrays.core_diameter[:, np.newaxis], cells, axis=1)
+        self.burn_rate = np.zeros(self.core_diameter.shape)
+
+    def __len__(self) -> int:
+        return len(self.diameter)
+
+    def get_cell_length(self) -> np.ndarray:
+        """
+        :return: length of the cells of each grain, in inches
+        """
+        return np.maximum(self.length, 0) / self.core_diameter.shape[1]
+
+    def get_port_area(self) -> np.ndarray:
+        """
+        :return: port area of each cell, in in^2
+        """
+        return (np.minimum(self.core_diameter, self.diameter[:, np.newaxis]) / 2) ** 2 * pi
+
+    def get_core_area(self) -> np.ndarray:
+        """
+        :return: burning area of the core of each cell, in in^2
+        """
+        burning = self.core_diameter < self.diameter[:, np.newaxis]
+        return np.where(burning, pi * self.core_diameter * self.get_cell_length()[:, np.newaxis], 0)
+
+    def get_face_area(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :return: tuple of (head face area, aft face area) of each grain that is burning, in in^2.
+            With one burning face, the aft face burns
+        """
+        outer = self.diameter ** 2
+        head = 1/4 * pi * np.maximum(outer - self.core_diameter[:, 0] ** 2, 0)
+        aft = 1/4 * pi * np.maximum(outer - self.core_diameter[:, -1] ** 2, 0)
+        return np.where(self.burning_faces > 1, head, 0), np.where(self.burning_faces > 0, aft, 0)
+
+    def get_burning_area(self) -> np.ndarray:
+        """
+        :return: burning area of each grain, in in^2
+        """
+        head, aft = self.get_face_area()
+        return self.get_core_area().sum(axis=1) + head + aft
+
+    def get_mass_flux(self, face_burn_rate: np.ndarray) -> Tuple[np.ndarray, float, float]:
+        """
+        Marches the mass flow from the head end to the aft end of the motor, in one cumulative sum over all cells
+        :param face_burn_rate: burn rate of the end faces of each grain, in inches / second
+        :return: tuple of (mass flux at the middle of each cell in lb/sec/in^2,
+            mass flow at the aft end of the propellant in lb/sec, total mass flow in lb/sec)
+        """
+        head, aft = self.get_face_area()
+        cell_flow = self.get_core_area() * self.burn_rate * self.rho[:, np.newaxis]
+        head_flow = head * face_burn_rate * self.rho
+        aft_flow = aft * face_burn_rate * self.rho
+
+        # the head face enters the flow at the start of the first cell, the aft face after the last cell
+        generated = cell_flow.copy()
+        generated[:, 0] += head_flow
+        upstream = np.cumsum(generated.ravel()).reshape(generated.shape)
+        upstream[1:] += np.cumsum(aft_flow)[:-1, np.newaxis]
+
+        midpoint_flow = upstream - cell_flow / 2
+        total = float(upstream[-1, -1] + aft_flow[-1])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mass_flux = np.where(self.get_port_area() > 0, midpoint_flow / self.get_port_area(), 0)
+        return mass_flux, float(upstream[-1, -1]), total
+
+    def is_burned_out(self) -> np.ndarray:
+        """
+        :return: boolean mask of grains that are burned out
+        """
+        return np.all(self.core_diameter >= self.diameter[:, np.newaxis], axis=1) | (self.length <= 0)
+
+    def regress(self, core_dist: np.ndarray, face_dist: np.ndarray) -> None:
+        """
+        :param core_dist: distance to regress the core of each cell, in inches
+        :param face_dist: distance to regress the end faces of each grain, in inches
+        """
+        self.core_diameter = np.minimum(self.core_diameter + 2 * core_dist, self.diameter[:, np.newaxis])
+        self.length = self.length - self.burning_faces * face_dist
+
+    def apply_to(self, grains: List[CylindricalCoreGrain]) -> None:
+        """
+        Copy the regressed state back into grain objects, using the mean core diameter of each grain
+        :param grains: grains matching the ones these cells were created from
+        """
+        for i, grain in enumerate(grains):
+            grain.core_diameter = float(self.core_diameter[i].mean())
+            grain.length = float(self.length[i])
+            grain.burn_rate = float(self.burn_rate[i].mean())
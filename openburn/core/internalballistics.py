@@ -1,21 +1,56 @@
+import time
 from copy import deepcopy
+from enum import Enum
 from math import sqrt
-from statistics import mean
+from typing import Callable, Iterator, Tuple, Union
 
-# from qtpy.QtCore import QObject, Signal, Slot
+import numpy as np
 
 from openburn.core.motor import OpenBurnMotor
 from openburn.core.grain import OpenBurnGrain
+from openburn.core.grainarrays import GrainArrays, GrainTables, GrainCells
+from openburn.core.isentropic import solve_exit_mach
+from openburn.core.simcache import SimCache, hash_simulation
+from openburn.core.simprofile import SimProfile, COUNTED_SIM_METHODS, COUNTED_BALLISTICS_METHODS
+from openburn.core.simresults import SimDataPoint, SimResults, SimResultsBuilder, integrate_trapezoid
 
-from openburn.util.units import convert_magnitude
+from openburn.util.units import get_conversion
 
 MAX_SIM_TIME = 50     # maximum simulation time in seconds before failing sim
+PROGRESS_INTERVAL = 0.1     # default seconds between progress reports of InternalBallisticsSim.run_sim
+
+# adaptive time step control, see InternalBallisticsSim._run_sim_adaptive
+ADAPTIVE_SAFETY = 0.9       # safety factor applied to the optimal step size
+ADAPTIVE_MIN_SCALE = 0.2    # largest reduction of the step size after a rejected step
+ADAPTIVE_MAX_SCALE = 4.0    # largest increase of the step size after an accepted step
+BURNOUT_WEB_TOLERANCE = 1e-9    # web remaining at which a grain counts as burned out, in inches
+BURNOUT_MAX_ITERATIONS = 50
+
+# erosive burning, see InternalBallisticsSim._run_sim_erosive
+EROSIVE_ALPHA = 4.8e-6  # Lenoir-Robillard heat transfer coefficient in SI units, typical of AP composites
+EROSIVE_BETA = 53.0     # Lenoir-Robillard blowing coefficient, dimensionless
+EROSIVE_COUPLING_ITERATIONS = 3     # passes between the burn rates and the chamber pressure at each step
+EROSIVE_NEWTON_ITERATIONS = 4
+PRESSURE_TOLERANCE = 1e-9   # relative tolerance of the chamber pressure solve
+PRESSURE_MAX_ITERATIONS = 50
+
+
+class SimEngine(Enum):
+    """Regression engines available to the InternalBallisticsSim"""
+    PYTHON = 'python'   # walks the motor's grain objects at every time step
+    NUMPY = 'numpy'     # regresses every grain at once using numpy arrays, see GrainArrays
+    ADAPTIVE = 'adaptive'   # like NUMPY, with an error controlled time step and exact burnout detection
+    WEB = 'web'     # integrates in web distance using each grain's geometry table, see GrainTables
 
 
 class SimSettings:
     """Params that control how the InternalBallisticsSim runs"""
     def __init__(self, pres: float = 14.7, temp: float = 70.0,
-                 twophase: float = 0.85, skinfric: float = 0.98, timestep: float = 0.01):
+                 twophase: float = 0.85, skinfric: float = 0.98, timestep: float = 0.01,
+                 engine: SimEngine = SimEngine.PYTHON, snapshot_interval: int = 0,
+                 snapshot_burnout: bool = False, tolerance: float = 1e-5,
+                 min_time_step: float = 1e-5, max_time_step: float = 0.25, web_steps: int = 100,
+                 erosive_cells: int = 0, erosive_alpha: float = EROSIVE_ALPHA, erosive_beta: float = EROSIVE_BETA):
         """
         :param pres: ambient pressure, in psi
         :param temp: ambient temperature, in deg F.
@@ -23,71 +58,197 @@ class SimSettings:
             BurnSim assumes 85% (0.85) by default.
         :param skinfric: total efficiency of the nozzle expansion, when accounting for losses to skin friction
             0.97 to 0.98 is typical for this value
-        :param timestep: discrete time step for simulation. defaults to 0.01 seconds
+        :param timestep: discrete time step for simulation. defaults to 0.01 seconds.
+            With SimEngine.ADAPTIVE this is only the initial time step
+        :param engine: which regression engine to use.
+            SimEngine.NUMPY is much faster for motors with many grains, but only supports cylindrical grains
+        :param snapshot_interval: store a copy of the regressed motor every N time steps. 0 (default) disables this
+        :param snapshot_burnout: store a copy of the regressed motor at every step where a grain burns out
+        :param tolerance: SimEngine.ADAPTIVE only. Maximum estimated error of the regression distance
+            of a single time step, in inches
+        :param min_time_step: SimEngine.ADAPTIVE only. Lower limit of the time step, in seconds
+        :param max_time_step: SimEngine.ADAPTIVE only. Upper limit of the time step, in seconds
+        :param web_steps: SimEngine.WEB only. Number of equal web distance steps the thickest grain is burned in
+        :param erosive_cells: model erosive burning by splitting each grain into this many axial cells.
+            0 (default) disables erosive burning. When enabled, the fixed time step cell model is used
+            whatever the engine setting, and only cylindrical grains are supported
+        :param erosive_alpha: Lenoir-Robillard heat transfer coefficient, in SI units (m/s per (kg/m^2/s)^0.8 m^-0.2)
+        :param erosive_beta: Lenoir-Robillard blowing coefficient, dimensionless
         """
         self.ambient_pressure: float = pres
         self.ambient_temp: float = temp
         self.two_phase_flow_eff: float = twophase
         self.skin_friction_eff: float = skinfric
         self.time_step: float = timestep
+        self.engine: SimEngine = engine
+        self.snapshot_interval: int = snapshot_interval
+        self.snapshot_burnout: bool = snapshot_burnout
+        self.tolerance: float = tolerance
+        self.min_time_step: float = min_time_step
+        self.max_time_step: float = max_time_step
+        self.web_steps: int = web_steps
+        self.erosive_cells: int = erosive_cells
+        self.erosive_alpha: float = erosive_alpha
+        self.erosive_beta: float = erosive_beta
+
+    def takes_snapshots(self) -> bool:
+        """
+        :return: true if the simulation stores copies of the motor geometry at any time step
+        """
+        return self.snapshot_interval > 0 or self.snapshot_burnout
 
+    def integrates_trapezoid(self) -> bool:
+        """
+        :return: true if the engine integrates impulse with the trapezoidal rule, and each data point is at the end
+            of its time step. The other engines integrate with the rectangle rule, from each point to the next
+        """
+        return self.erosive_cells == 0 and self.engine in (SimEngine.ADAPTIVE, SimEngine.WEB)
+
+    def wants_snapshot(self, iteration: int, burnout: bool) -> bool:
+        """
+        Should the simulation store a full copy of the motor geometry at this time step?
+        :param iteration: index of the current time step
+        :param burnout: true if a grain burned out during this time step
+        """
+        if burnout and self.snapshot_burnout:
+            return True
+        return self.snapshot_interval > 0 and iteration % self.snapshot_interval == 0
 
-class SimDataPoint:
-    """Simulation data at a given discrete time step"""
-    def __init__(self):
-        self.motor: OpenBurnMotor = None
-        self.pressure: float = 0
-        self.mass_flux: float = 0
-        self.thrust: float = 0
-        self.isp: float = 0
-        self.kn: float = 0
 
-        self.burn_rate: float = 0
-        self.time_stamp: float = 0
+class SimulationException(Exception):
+    """Exception raised when the simulation encounters an error.
+    results holds the SimResults of the steps simulated before the error, if any"""
+    def __init__(self, message, results: SimResults = None):
+        super(SimulationException, self).__init__(message)
+        self.results = results
 
 
-class SimResults:
-    """The results of running an InternalBallisticsSim"""
-    def __init__(self, data_points, burn_time, total_impulse):
-        self.data = data_points
-        self.burn_time = burn_time
-        self.total_impulse = total_impulse
+class SimulationStopped(SimulationException):
+    """Exception raised by InternalBallisticsSim.run_sim when its stop condition is met.
+    results holds the steps simulated up to and including the one that met the condition"""
+
+
+class PressureLimit:
+    """Stop condition that ends a simulation once the chamber pressure exceeds a limit,
+    such as the case's pressure rating. See InternalBallisticsSim.run_sim"""
+    def __init__(self, max_pressure: float):
+        """
+        :param max_pressure: the highest allowed chamber pressure, in psi
+        """
+        self.max_pressure = max_pressure
+
+    def __call__(self, point: SimDataPoint) -> bool:
+        return point.pressure > self.max_pressure
 
-    def get_burn_time(self):
-        return self.burn_time
+    def __repr__(self) -> str:
+        return f"PressureLimit({self.max_pressure} psi)"
 
-    def get_total_impulse(self):
-        return self.total_impulse
 
-    def get_max_presure(self):
-        return max(x.pressure for x in self.data)
+GrainState = Union[GrainArrays, GrainTables]
 
-    def get_max_thrust(self):
-        return max(x.thrust for x in self.data)
 
-    def get_max_isp(self):
-        return max(x.isp for x in self.data)
+class ArrayBallistics:
+    """Chamber and nozzle performance of a motor whose grain state is held in a GrainArrays or GrainTables object.
+    Everything that does not depend on grain geometry is computed once, when the object is created"""
+    def __init__(self, motor: OpenBurnMotor, settings: SimSettings):
+        nozzle = motor.nozzle
+        prop = motor.avg_propellant
+        self.settings = settings
+        self.throat_area = nozzle.get_throat_area()
+
+        # p = (Kn * a * rho * C* )^(1/(1-n)), see InternalBallisticsSim.calc_chamber_pressure
+        rho_slugs = prop.rho * get_conversion('lb_per_in3', 'slug_per_in3')[0]
+        self.pressure_coeff = prop.a * rho_slugs * prop.cstar
+        self.pressure_exp = 1 / (1 - prop.n)
+        self.burn_rate_coeff = prop.a
+        self.burn_rate_exp = prop.n
+
+        # see InternalBallisticsSim.calc_thrust
+        self.exp_ratio = nozzle.get_expansion_ratio()
+        self.exit_pressure_ratio = InternalBallisticsSim.calc_exit_pressure(motor, 1.0)
+        self.momentum_cf = InternalBallisticsSim.calc_momentum_thrust_coeff(prop.gamma, self.exit_pressure_ratio)
+        self.thrust_eff = nozzle.get_divergence_loss() * settings.two_phase_flow_eff
+
+    def calc_kn(self, grains: GrainState, burning: np.ndarray = None) -> float:
+        """
+        :param grains: the grain state
+        :param burning: optional mask of grains that contribute burning area
+        :return: Kn, dimensionless
+        """
+        area = grains.get_burning_area()
+        if burning is not None:
+            area = area[burning]
+        return float(area.sum()) / self.throat_area
 
-    def get_max_mass_flux(self):
-        return max(x.mass_flux for x in self.data)
+    def calc_chamber_pressure(self, kn: float) -> float:
+        """
+        :return: steady-state chamber pressure, in psi
+        """
+        return (kn * self.pressure_coeff) ** self.pressure_exp
 
-    def get_avg_thrust(self):
-        return mean(x.thrust for x in self.data)
+    def calc_erosive_chamber_pressure(self, burning_area: float, erosive_volume_rate: float, guess: float) -> float:
+        """
+        Steady-state chamber pressure when part of the propellant burns faster than a * Pc^n.
+        Solves Pc = a * rho * C* / At * (Ab * Pc^n + E / a) with Newton's method, where E is the extra
+        propellant volume burned per second. With E = 0 this is calc_chamber_pressure
+        :param burning_area: total burning area, in in^2
+        :param erosive_volume_rate: E, the propellant volume burned by erosive burning, in in^3 / second
+        :param guess: initial chamber pressure, such as the previous time step's, in psi
+        :return: chamber pressure, in psi
+        """
+        k = self.pressure_coeff / self.throat_area
+        n = self.burn_rate_exp
+        extra = erosive_volume_rate / self.burn_rate_coeff
+        pressure = guess if guess > 0 else self.calc_chamber_pressure(burning_area / self.throat_area)
+        for _ in range(PRESSURE_MAX_ITERATIONS):
+            residual = k * (burning_area * pressure ** n + extra) - pressure
+            slope = k * burning_area * n * pressure ** (n - 1) - 1
+            new_pressure = max(pressure - residual / slope, pressure / 2)
+            if abs(new_pressure - pressure) < PRESSURE_TOLERANCE * pressure:
+                return new_pressure
+            pressure = new_pressure
+        return pressure
+
+    def calc_burn_rate(self, grains: GrainState, burning: np.ndarray) -> np.ndarray:
+        """
+        :return: burn rate of each grain at the state's chamber pressure, zero if the grain is not burning
+        """
+        chamber_pressure = self.calc_chamber_pressure(self.calc_kn(grains, burning))
+        return np.where(burning, grains.get_burn_rate(chamber_pressure), 0)
 
-    def get_avg_isp(self):
-        return mean(x.isp for x in self.data)
+    def calc_thrust(self, chamber_pressure: float) -> float:
+        """
+        :return: thrust in lbs
+        """
+        Nf = self.settings.skin_friction_eff
+        cf_v = self.momentum_cf + \
+            (chamber_pressure * self.exit_pressure_ratio - self.settings.ambient_pressure) * \
+            self.exp_ratio / chamber_pressure
+        return self.thrust_eff * (Nf * cf_v + (1 - Nf)) * self.throat_area * chamber_pressure
 
-    def get_kn_range(self):
-        """Returns a tuple of the kn range (min, max)"""
-        min_ = min(x.kn for x in self.data)
-        max_ = max(x.kn for x in self.data)
-        return min_, max_
+    def fill_data_point(self, point: SimDataPoint, grains: GrainState, burning: np.ndarray = None) -> None:
+        """
+        Set the performance data of a time step, except for the time stamp
+        :param point: the data point to fill
+        :param grains: the grain state, including the current burn rates
+        :param burning: optional mask of grains that contribute burning area
+        """
+        kn = self.calc_kn(grains, burning)
+        point.kn = kn
+        point.pressure = self.calc_chamber_pressure(kn)
+        point.thrust = self.calc_thrust(point.pressure)
 
+        # mass flux at the aft end of the propellant, where the aft face of the last grain is not upstream
+        grain_mass_flow = grains.get_mass_flow()
+        if burning is not None:
+            grain_mass_flow = np.where(burning, grain_mass_flow, 0)
+        mass_flow = float(grain_mass_flow.sum())
+        aft_face = grains.get_face_area()[-1] * min(grains.burning_faces[-1], 1)
+        aft_mass_flow = mass_flow - aft_face * grains.rho[-1] * grains.burn_rate[-1]
 
-class SimulationException(Exception):
-    """Exception raised when the simulation encounters an error"""
-    def __init__(self, message):
-        super(SimulationException, self).__init__(message)
+        point.mass_flux = float(aft_mass_flow / grains.get_port_area()[-1])
+        point.isp = point.thrust / mass_flow
+        point.burn_rate = float(grains.burn_rate[-1])
 
 
 class InternalBallisticsSim:
@@ -98,68 +259,490 @@ class InternalBallisticsSim:
         super(InternalBallisticsSim, self).__init__()
 
     @classmethod
-    def run_sim(cls, motor: OpenBurnMotor, settings: SimSettings) -> "SimResults":
+    def run_sim(cls, motor: OpenBurnMotor, settings: SimSettings, cache: SimCache = None,
+                stop: Callable[[SimDataPoint], bool] = None, profile: SimProfile = None,
+                progress: Callable[["SimResults"], None] = None,
+                progress_interval: float = PROGRESS_INTERVAL) -> "SimResults":
         """
         Regression simulation
         Calculates internal ballistics regression and info
         :param motor: the initial motor, regressing at discrete time steps, with settings controlled by
         :param settings:
+        :param cache: optional SimCache. Results of a motor and settings that were simulated before are loaded
+            from it instead of simulated again. Runs that take snapshots are never cached
+        :param stop: optional condition, called with each step's data. If it returns true the simulation ends
+            and SimulationStopped is raised, see PressureLimit
+        :param profile: optional SimProfile to measure the run with. It is also set as the results' profile
+        :param progress: optional callback, called with the partial results while the motor is simulated.
+            It isn't called for results loaded from the cache
+        :param progress_interval: seconds between calls of progress. Each call copies the results so far,
+            so calling it at every step (0) makes long runs quadratic
+        :raises SimulationException: if the motor can't be simulated. The exception holds the partial results
         :returns SimResults: an object that encapsulates the results of the simulation run"""
+        key = None
+        if cache is not None and not settings.takes_snapshots():
+            key = hash_simulation(motor, settings)
+            results = cache.get(key)
+            if results is not None:
+                if profile is not None:
+                    profile.count('cache_hits')
+                    results.profile = profile
+                if stop is not None:
+                    cls._check_stop(results, stop, settings)
+                return results
+
+        run = cls.iter_sim(motor, settings, profile)
+        data = SimResultsBuilder()
+        last_progress = time.perf_counter()
+        try:
+            for point in run:
+                data.append(point)
+                if progress is not None:
+                    now = time.perf_counter()
+                    if now - last_progress >= progress_interval:
+                        last_progress = now
+                        progress(data.build(burn_time=run.burn_time, total_impulse=run.total_impulse))
+                if stop is not None and stop(point):
+                    raise SimulationStopped(f"Simulation stopped by {stop!r} at {point.time_stamp:.3f} s")
+        except SimulationException as e:
+            run.close()
+            e.results = data.build(burn_time=run.burn_time, total_impulse=run.total_impulse)
+            e.results.profile = profile
+            raise
+
+        results = data.build(burn_time=run.burn_time, total_impulse=run.total_impulse)
+        results.profile = profile
+        if key is not None:
+            cache.put(key, results)
+        return results
 
+    @classmethod
+    def iter_sim(cls, motor: OpenBurnMotor, settings: SimSettings, profile: SimProfile = None) -> "SimRun":
+        """
+        Streaming regression simulation.
+        :param motor: the initial motor, which is never modified
+        :param settings: settings of the simulation
+        :param profile: optional SimProfile to measure the run with
+        :return: a SimRun, which simulates one step each time it is iterated and yields the step's SimDataPoint.
+            Steps are not stored, so memory use is constant, and iteration can stop at any step
+        """
+        return SimRun(motor, settings, profile)
+
+    @classmethod
+    def _iter_engine(cls, run: "SimRun") -> Iterator[SimDataPoint]:
+        settings = run.settings
+        if settings.erosive_cells > 0:
+            return cls._iter_erosive(run)
+        if settings.engine is SimEngine.NUMPY:
+            return cls._iter_numpy(run)
+        if settings.engine is SimEngine.ADAPTIVE:
+            return cls._iter_adaptive(run)
+        if settings.engine is SimEngine.WEB:
+            return cls._iter_web(run)
+        return cls._iter_python(run)
+
+    @classmethod
+    def _check_stop(cls, results: SimResults, stop: Callable[[SimDataPoint], bool], settings: SimSettings) -> None:
+        """Apply a stop condition to stored results, raising SimulationStopped like a running simulation would"""
+        for i, point in enumerate(results.data):
+            if stop(point):
+                end = results.time[i + 1] if i + 1 < len(results) else np.inf
+                partial = results.slice_time(results.time[0], end)
+                # totals of the steps the run would have taken, integrated the way the engine does
+                if settings.integrates_trapezoid():
+                    partial.burn_time = float(partial.time[-1] - partial.time[0])
+                    partial.total_impulse = integrate_trapezoid(partial.thrust, partial.time)
+                else:
+                    time_steps = results.get_time_steps()[:i + 1]
+                    partial.burn_time = float(time_steps.sum())
+                    partial.total_impulse = float(np.dot(partial.thrust, time_steps))
+                raise SimulationStopped(f"Simulation stopped by {stop!r} at {point.time_stamp:.3f} s", partial)
+
+    @classmethod
+    def _iter_python(cls, run: "SimRun") -> Iterator[SimDataPoint]:
+        """Regression simulation that burns a single working copy of the motor in place"""
+        motor, settings, profile = run.motor, run.settings, run.profile
         iterations = 0
-        total_burn_time = 0
-        total_impulse = 0
         num_burnout = 0
 
-        data = []
-        prev_data = None
+        # the caller's motor is never modified, only our working copy is regressed.
+        # Its grains are detached, so burning doesn't notify the motor of every attribute it sets. Instead the
+        # motor is invalidated once after each grain burns
+        current_motor = deepcopy(motor)
+        for grain in current_motor.grains:
+            grain.set_parent(None)
+        if profile is not None:
+            profile.lap('copy')
 
-        while num_burnout < motor.get_num_grains():
+        while num_burnout < current_motor.get_num_grains():
             current_data = SimDataPoint()
 
-            # clone motor data for initial condition
-            if iterations == 0:
-                current_data.motor = deepcopy(motor)
-            else:
-                current_data.motor = deepcopy(prev_data.motor)
-
-            current_motor = current_data.motor
-
             # regression simulation for each grain
             for grain in current_motor.grains:
                 burnrate = cls.calc_steady_state_burn_rate(current_motor, grain, settings)
                 current_data.burn_rate = burnrate
 
                 grain.burn(burnrate, settings.time_step)
+                current_motor.invalidate()
 
-                if grain.is_burned_out():
-                    num_burnout += 1
+            prev_burnout = num_burnout
+            num_burnout = sum(1 for grain in current_motor.grains if grain.is_burned_out())
+            if profile is not None:
+                profile.lap('regress')
 
             # set simulation data for this time step after regression
             current_data.pressure = cls.calc_chamber_pressure(current_motor, settings)
-            current_data.time = total_burn_time
+            current_data.time_stamp = run.burn_time
             current_data.thrust = cls.calc_thrust(current_motor, settings)
             current_data.mass_flux = cls.calc_mass_flux(current_motor, current_motor.get_length())
             current_data.isp = cls.calc_isp(current_motor, settings)
             current_data.kn = current_motor.get_kn()
+            if profile is not None:
+                profile.lap('performance')
 
-            # add data to results
-            data.append(current_data)
+            if settings.wants_snapshot(iterations, num_burnout > prev_burnout):
+                current_data.motor = deepcopy(current_motor)
+                if profile is not None:
+                    profile.lap('snapshot')
 
             # update motor info
-            total_impulse += current_data.thrust * settings.time_step
-            total_burn_time += settings.time_step
+            run.total_impulse += current_data.thrust * settings.time_step
+            run.burn_time += settings.time_step
+            yield current_data
 
             # set up for next iteration
             iterations += 1
-            prev_data = current_data
 
             # fallback failure state: MAX_SIM_TIME second burn time
-            if total_burn_time > MAX_SIM_TIME:
+            if run.burn_time > MAX_SIM_TIME:
                 raise SimulationException(f"Error! Simulation exceeded {MAX_SIM_TIME} seconds.")
 
-        results = SimResults(data_points=data, total_impulse=total_impulse, burn_time=total_burn_time)
-        return results
+    @classmethod
+    def _iter_numpy(cls, run: "SimRun") -> Iterator[SimDataPoint]:
+        """
+        Vectorized regression simulation.
+        Grain state is held in a GrainArrays object and every grain regresses in one array operation,
+        using the chamber pressure from the start of the time step.
+        Motor snapshots are only built when requested by the settings.
+        """
+        motor, settings, profile = run.motor, run.settings, run.profile
+        grains = cls._make_grain_arrays(motor)
+        ballistics = cls._make_ballistics(run)
+
+        iterations = 0
+        num_burnout = 0
+        chamber_pressure = ballistics.calc_chamber_pressure(ballistics.calc_kn(grains))
+        if profile is not None:
+            profile.lap('setup')
+        while num_burnout < len(grains):
+            grains.burn(grains.get_burn_rate(chamber_pressure), settings.time_step)
+
+            prev_burnout = num_burnout
+            num_burnout = int(grains.is_burned_out().sum())
+            if profile is not None:
+                profile.lap('regress')
+
+            current_data = SimDataPoint()
+            ballistics.fill_data_point(current_data, grains)
+            current_data.time_stamp = run.burn_time
+            chamber_pressure = current_data.pressure
+            if profile is not None:
+                profile.lap('performance')
+
+            if settings.wants_snapshot(iterations, num_burnout > prev_burnout):
+                current_data.motor = deepcopy(motor)
+                grains.apply_to(current_data.motor.grains)
+                if profile is not None:
+                    profile.lap('snapshot')
+
+            run.total_impulse += current_data.thrust * settings.time_step
+            run.burn_time += settings.time_step
+            yield current_data
+            iterations += 1
+
+            if run.burn_time > MAX_SIM_TIME:
+                raise SimulationException(f"Error! Simulation exceeded {MAX_SIM_TIME} seconds.")
+
+    @classmethod
+    def _iter_adaptive(cls, run: "SimRun") -> Iterator[SimDataPoint]:
+        """
+        Vectorized regression simulation with an error controlled time step.
+        Each step is integrated with Heun's method, using the difference from the embedded Euler step as the
+        error estimate, so the step grows while the chamber pressure is flat and shrinks when it changes quickly.
+        Grain burnout is located exactly by root finding on the web remaining, and the step is cut short
+        to end on it.
+        Data points are recorded at the state reached at the end of each step, starting with the initial state,
+        and impulse is integrated with the trapezoidal rule.
+        """
+        motor, settings, profile = run.motor, run.settings, run.profile
+        grains = cls._make_grain_arrays(motor)
+        ballistics = cls._make_ballistics(run)
+
+        burning = ~grains.is_burned_out()
+        grains.burn_rate = ballistics.calc_burn_rate(grains, burning)
+
+        def step_distance(time_step: float, rates: np.ndarray) -> Tuple[np.ndarray, float]:
+            """Heun step. Returns the regression distance of each grain and the local error estimate"""
+            trial = grains.copy()
+            trial.regress(rates * time_step)
+            trial_rates = ballistics.calc_burn_rate(trial, burning)
+            error = float(np.max(np.abs(trial_rates - rates))) * time_step / 2
+            return (rates + trial_rates) * time_step / 2, error
+
+        def find_burnout(time_step: float, rates: np.ndarray) -> float:
+            """Regula falsi (Illinois) for the time at which the first burning grain's web reaches zero"""
+            web = grains.get_web_remaining()[burning]
+
+            def web_left(t: float) -> float:
+                return float(np.min(web - step_distance(t, rates)[0][burning]))
+
+            t_lo, f_lo = 0.0, float(np.min(web))
+            t_hi, f_hi = time_step, web_left(time_step)
+            side = 0
+            for _ in range(BURNOUT_MAX_ITERATIONS):
+                if profile is not None:
+                    profile.count('burnout_iterations')
+                t = (t_lo * f_hi - t_hi * f_lo) / (f_hi - f_lo)
+                f = web_left(t)
+                if abs(f) < BURNOUT_WEB_TOLERANCE:
+                    return t
+                if f > 0:
+                    t_lo, f_lo = t, f
+                    if side == 1:
+                        f_hi /= 2
+                    side = 1
+                else:
+                    t_hi, f_hi = t, f
+                    if side == -1:
+                        f_lo /= 2
+                    side = -1
+            return t_hi     # land just past the event rather than just before it
+
+        iterations = 0
+        current_data = SimDataPoint()
+        ballistics.fill_data_point(current_data, grains, burning)
+        if profile is not None:
+            profile.lap('setup')
+        yield current_data
+
+        time_step = settings.time_step
+        while burning.any():
+            rates = grains.burn_rate
+
+            # shrink the step until the error estimate is within tolerance
+            while True:
+                time_step = min(max(time_step, settings.min_time_step), settings.max_time_step)
+                distance, error = step_distance(time_step, rates)
+                if error <= settings.tolerance or time_step <= settings.min_time_step:
+                    break
+                if profile is not None:
+                    profile.count('rejected_steps')
+                time_step *= max(ADAPTIVE_SAFETY * sqrt(settings.tolerance / error), ADAPTIVE_MIN_SCALE)
+            next_time_step = time_step * (ADAPTIVE_MAX_SCALE if error == 0 else
+                                          min(ADAPTIVE_SAFETY * sqrt(settings.tolerance / error),
+                                              ADAPTIVE_MAX_SCALE))
+            if profile is not None:
+                profile.lap('step_control')
+
+            # end the step exactly on the first grain burnout within it
+            burnout = distance >= grains.get_web_remaining()
+            if (burnout & burning).any():
+                time_step = find_burnout(time_step, rates)
+                distance, _ = step_distance(time_step, rates)
+                burnout = grains.get_web_remaining() - distance < BURNOUT_WEB_TOLERANCE
+                if profile is not None:
+                    profile.lap('burnout_search')
+
+            grains.regress(np.where(burning, distance, 0))
+            grains.burn_rate = ballistics.calc_burn_rate(grains, burning)
+            grains.core_diameter[burnout & burning] = grains.diameter[burnout & burning]
+            if profile is not None:
+                profile.lap('regress')
+
+            # record the state at the end of the step, just before any grains burning out in it drop out
+            prev_thrust = current_data.thrust
+            current_data = SimDataPoint()
+            ballistics.fill_data_point(current_data, grains, burning)
+            run.burn_time += time_step
+            run.total_impulse += (prev_thrust + current_data.thrust) / 2 * time_step
+            current_data.time_stamp = run.burn_time
+
+            new_burnout = (burnout & burning).any()
+            burning &= ~burnout
+            grains.burn_rate = np.where(burning, grains.burn_rate, 0)
+
+            iterations += 1
+            if profile is not None:
+                profile.lap('performance')
+            if settings.wants_snapshot(iterations, new_burnout):
+                current_data.motor = deepcopy(motor)
+                grains.apply_to(current_data.motor.grains)
+                if profile is not None:
+                    profile.lap('snapshot')
+            yield current_data
+
+            time_step = next_time_step
+            if run.burn_time > MAX_SIM_TIME:
+                raise SimulationException(f"Error! Simulation exceeded {MAX_SIM_TIME} seconds.")
+
+    @classmethod
+    def _iter_web(cls, run: "SimRun") -> Iterator[SimDataPoint]:
+        """
+        Regression simulation in web space.
+        Grain geometry comes from each grain's cached geometry table, so a step costs one table lookup per grain
+        and works for any grain type. Every step burns the fastest regressing grain by the same web distance,
+        using burn rates from the midpoint of the step, and the time step is mapped back from the web step and
+        burn rate. Steps end exactly on grain burnout, since the web remaining of every grain is known.
+        Data points are recorded like SimEngine.ADAPTIVE: the initial state, then the end of each step.
+        """
+        motor, settings, profile = run.motor, run.settings, run.profile
+        grains = GrainTables(motor.grains)
+        ballistics = cls._make_ballistics(run)
+        web_step = float(grains.web_thickness.max(initial=0)) / settings.web_steps
+
+        burning = ~grains.is_burned_out()
+        grains.burn_rate = ballistics.calc_burn_rate(grains, burning)
+
+        iterations = 0
+        current_data = SimDataPoint()
+        ballistics.fill_data_point(current_data, grains, burning)
+        if profile is not None:
+            profile.lap('setup')
+        yield current_data
+
+        while burning.any():
+            # midpoint rule: burn rates half way through a step of the fastest grain
+            rates = grains.burn_rate
+            half_step = grains.regressed(rates * (web_step / rates.max() / 2))
+            rates = np.where(burning, ballistics.calc_burn_rate(half_step, burning), 0)
+            time_step = web_step / rates.max()
+
+            # end the step exactly on the first grain burnout within it
+            with np.errstate(divide='ignore'):
+                time_to_burnout = np.where(burning, grains.get_web_remaining() / rates, np.inf)
+            time_step = min(time_step, float(time_to_burnout.min()))
+
+            grains.web = np.minimum(grains.web + rates * time_step, grains.web_thickness)
+            burnout = burning & (grains.get_web_remaining() < BURNOUT_WEB_TOLERANCE)
+            grains.web[burnout] = grains.web_thickness[burnout]
+            grains.burn_rate = ballistics.calc_burn_rate(grains, burning)
+            if profile is not None:
+                profile.lap('regress')
+
+            # record the state at the end of the step, just before any grains burning out in it drop out
+            prev_thrust = current_data.thrust
+            current_data = SimDataPoint()
+            ballistics.fill_data_point(current_data, grains, burning)
+            run.burn_time += time_step
+            run.total_impulse += (prev_thrust + current_data.thrust) / 2 * time_step
+            current_data.time_stamp = run.burn_time
+
+            burning &= ~burnout
+            grains.burn_rate = np.where(burning, grains.burn_rate, 0)
+
+            iterations += 1
+            if profile is not None:
+                profile.lap('performance')
+            if settings.wants_snapshot(iterations, burnout.any()):
+                current_data.motor = deepcopy(motor)
+                grains.apply_to(current_data.motor.grains)
+                if profile is not None:
+                    profile.lap('snapshot')
+            yield current_data
+
+            if run.burn_time > MAX_SIM_TIME:
+                raise SimulationException(f"Error! Simulation exceeded {MAX_SIM_TIME} seconds.")
+
+    @classmethod
+    def _iter_erosive(cls, run: "SimRun") -> Iterator[SimDataPoint]:
+        """
+        Fixed time step regression simulation with erosive burning.
+        Every grain is split into axial cells, see GrainCells. At each step the mass flow is marched from the
+        head end to the aft end through every cell at once, the Lenoir-Robillard burn rate of each cell is found
+        from its mass flux, and the chamber pressure is solved with the extra mass flow of erosive burning.
+        Burn rates and chamber pressure depend on each other, so they are iterated a few times per step,
+        starting from the previous step's pressure.
+        The cost of a step is linear in the total number of cells.
+        """
+        motor, settings, profile = run.motor, run.settings, run.profile
+        try:
+            cells = GrainCells(motor.grains, settings.erosive_cells)
+        except TypeError as e:
+            raise SimulationException(str(e))
+        ballistics = cls._make_ballistics(run)
+
+        def solve_state(chamber_pressure: float) -> Tuple[float, np.ndarray]:
+            """Burn rates of the current geometry. Returns the chamber pressure and the face burn rates"""
+            for _ in range(EROSIVE_COUPLING_ITERATIONS):
+                face_rate = cells.a * chamber_pressure ** cells.n
+                base_rate = np.repeat(face_rate[:, np.newaxis], cells.core_diameter.shape[1], axis=1)
+                mass_flux, _, _ = cells.get_mass_flux(face_rate)
+                cells.burn_rate = cls.calc_erosive_burn_rate(base_rate, mass_flux, cells.core_diameter,
+                                                             cells.rho[:, np.newaxis], settings)
+                erosive_volume_rate = float((cells.get_core_area() * (cells.burn_rate - base_rate)).sum())
+                chamber_pressure = ballistics.calc_erosive_chamber_pressure(
+                    float(cells.get_burning_area().sum()), erosive_volume_rate, chamber_pressure)
+            return chamber_pressure, face_rate
+
+        iterations = 0
+        chamber_pressure = ballistics.calc_chamber_pressure(float(cells.get_burning_area().sum()) /
+                                                            ballistics.throat_area)
+        chamber_pressure, face_rate = solve_state(chamber_pressure)
+        num_burnout = 0
+        if profile is not None:
+            profile.lap('setup')
+        while num_burnout < len(cells):
+            burning = ~cells.is_burned_out()
+            cells.regress(np.where(burning[:, np.newaxis], cells.burn_rate * settings.time_step, 0),
+                          np.where(burning, face_rate * settings.time_step, 0))
+
+            prev_burnout = num_burnout
+            num_burnout = int(cells.is_burned_out().sum())
+            if profile is not None:
+                profile.lap('regress')
+            chamber_pressure, face_rate = solve_state(chamber_pressure)
+            if profile is not None:
+                profile.lap('pressure_solve')
+
+            current_data = SimDataPoint()
+            current_data.kn = float(cells.get_burning_area().sum()) / ballistics.throat_area
+            current_data.pressure = chamber_pressure
+            current_data.thrust = ballistics.calc_thrust(chamber_pressure)
+            _, aft_mass_flow, mass_flow = cells.get_mass_flux(face_rate)
+            current_data.mass_flux = aft_mass_flow / float(cells.get_port_area()[-1, -1])
+            current_data.isp = current_data.thrust / mass_flow if mass_flow > 0 else 0
+            current_data.burn_rate = float(cells.burn_rate[-1, -1])
+            current_data.time_stamp = run.burn_time
+            if profile is not None:
+                profile.lap('performance')
+
+            if settings.wants_snapshot(iterations, num_burnout > prev_burnout):
+                current_data.motor = deepcopy(motor)
+                cells.apply_to(current_data.motor.grains)
+                if profile is not None:
+                    profile.lap('snapshot')
+
+            run.total_impulse += current_data.thrust * settings.time_step
+            run.burn_time += settings.time_step
+            yield current_data
+            iterations += 1
+
+            if run.burn_time > MAX_SIM_TIME:
+                raise SimulationException(f"Error! Simulation exceeded {MAX_SIM_TIME} seconds.")
+
+    @classmethod
+    def _make_ballistics(cls, run: "SimRun") -> ArrayBallistics:
+        ballistics = ArrayBallistics(run.motor, run.settings)
+        if run.profile is not None:
+            run.profile.count_calls(ballistics, COUNTED_BALLISTICS_METHODS)
+        return ballistics
+
+    @classmethod
+    def _make_grain_arrays(cls, motor: OpenBurnMotor) -> GrainArrays:
+        try:
+            return GrainArrays(motor.grains)
+        except TypeError as e:
+            raise SimulationException(str(e))
 
     @classmethod
     def calc_thrust(cls, motor: OpenBurnMotor, settings: SimSettings) -> float:
@@ -207,22 +790,31 @@ class InternalBallisticsSim:
         Cf = sqrt [ (2k^2 / k-1) (2/k+1 )^k+1k-1 * 1- (P2/P1)^(k-1/k) )] + (p2-p3)A2 / Pc
         See Rocket Propulsion Elements, Eq. 3-29
         """
-        # simplify terms involving k (gamma)
-        k = motor.avg_propellant.gamma
-        k_square = (2 * k**2) / (k - 1)
-        two_over_k = 2 / (k + 1)
-        k_over_k = (k + 1) / (k - 1)
-        k_minus_1 = (k - 1) / k
-
-        # set up other variables
         exp_ratio = motor.nozzle.get_expansion_ratio()
         exit_pressure = cls.calc_exit_pressure(motor, chamber_pressure)
         pressure_ratio = exit_pressure / chamber_pressure
 
-        momentum_thrust = sqrt(k_square * two_over_k ** k_over_k * (1 - (pressure_ratio ** k_minus_1)))
+        momentum_thrust = cls.calc_momentum_thrust_coeff(motor.avg_propellant.gamma, pressure_ratio)
         pressure_thrust = ((exit_pressure - settings.ambient_pressure) * exp_ratio) / chamber_pressure
         return momentum_thrust + pressure_thrust
 
+    @classmethod
+    def calc_momentum_thrust_coeff(cls, gamma: float, pressure_ratio: float) -> float:
+        """
+        Calculates the momentum term of the ideal thrust coefficient
+        :param gamma: ratio of specific heats of the exhaust
+        :param pressure_ratio: ratio of nozzle exit pressure to chamber pressure, Pe/Pc
+        :return: momentum thrust coefficient, dimensionless
+        """
+        # simplify terms involving k (gamma)
+        k = gamma
+        k_square = (2 * k**2) / (k - 1)
+        two_over_k = 2 / (k + 1)
+        k_over_k = (k + 1) / (k - 1)
+        k_minus_1 = (k - 1) / k
+
+        return sqrt(k_square * two_over_k ** k_over_k * (1 - (pressure_ratio ** k_minus_1)))
+
     @classmethod
     def calc_exit_pressure(cls, motor: OpenBurnMotor, chamber_pressure: float) -> float:
         """
@@ -245,7 +837,8 @@ class InternalBallisticsSim:
     def calc_exit_mach(cls, motor: OpenBurnMotor) -> float:
         """
         Calculates the exit mach number from the nozzle area ratio and gamma.
-        Numerically solves the isentropic flow equation for exit mach number
+        Numerically solves the isentropic flow equation for exit mach number, see solve_exit_mach.
+        Solutions are cached, since the nozzle does not change during a burn
         :param motor: the motor
         :return: the exit mach number
         see https://www.grc.nasa.gov/www/k-12/airplane/rktthsum.html
@@ -253,35 +846,7 @@ class InternalBallisticsSim:
         if motor.nozzle.exit_dia <= motor.nozzle.throat_dia:
             return 1.0  # sonic nozzle has a mach number of 1 by definition
 
-        mach_number = 2.2   # init with some arbitrary supersonic mach number
-        gamma = motor.avg_propellant.gamma
-        area_ratio = motor.nozzle.get_expansion_ratio()
-        gp1 = gamma + 1
-        gm1 = gamma - 1
-        exponent = gp1 / (2 * gm1)
-
-        # initial guesses
-        guess_area_ratio = area_ratio / 2
-        # init guess as a tiny bit different so we don't divide by zero when finding the change
-        guess_mach = mach_number + 0.05
-
-        # newton's method
-        while abs(area_ratio - guess_area_ratio) > 0.0001:
-            # find area ratio using our guesses
-            base = 1 + 0.5 * gm1 * guess_mach**2
-            new_area_ratio = 1 / (guess_mach * base ** -exponent * (gp1 / 2) ** exponent)
-
-            # find change (derivative)
-            deriv = (new_area_ratio - guess_area_ratio) / (guess_mach - mach_number)
-
-            # update guesses
-            guess_area_ratio = new_area_ratio
-            mach_number = guess_mach
-
-            # update mach
-            guess_mach = mach_number + (area_ratio - guess_area_ratio) / deriv
-
-        return mach_number
+        return solve_exit_mach(motor.nozzle.get_expansion_ratio(), motor.avg_propellant.gamma)
 
     @classmethod
     def calc_chamber_pressure(cls, motor: OpenBurnMotor, settings: SimSettings) -> float:
@@ -294,7 +859,7 @@ class InternalBallisticsSim:
         :param settings: controls two phase flow efficacy which affects C*
         :return: steady-state chamber pressure, in lbs/in^3
         """
-        rho_slugs = convert_magnitude(motor.avg_propellant.rho, 'lb_per_in3', 'slug_per_in3')
+        rho_slugs = motor.avg_propellant.rho * get_conversion('lb_per_in3', 'slug_per_in3')[0]
 
         cstar = motor.avg_propellant.cstar  # * settings.two_phase_flow_eff
         exp = 1 / (1 - motor.avg_propellant.n)
@@ -316,6 +881,40 @@ class InternalBallisticsSim:
         Pc = cls.calc_chamber_pressure(motor, settings)
         return prop.a * Pc ** prop.n
 
+    @classmethod
+    def calc_erosive_burn_rate(cls, base_rate: np.ndarray, mass_flux: np.ndarray, port_diameter: np.ndarray,
+                               rho: np.ndarray, settings: SimSettings) -> np.ndarray:
+        """
+        Burn rate including erosive burning, using the Lenoir-Robillard model
+        r = r0 + alpha * G^0.8 * D^-0.2 * exp(-beta * r * rho / G)
+        The rate appears on both sides, so it is solved with a few vectorized Newton iterations.
+        See Rocket Propulsion Elements, Eq. 12-7
+
+        :param base_rate: steady state burn rate a * Pc^n of each cell, in inches / second
+        :param mass_flux: core mass flux G of each cell, in lb/sec/in^2
+        :param port_diameter: hydraulic diameter D of each cell's port, in inches
+        :param rho: propellant density, in lb/in^3
+        :param settings: holds the Lenoir-Robillard coefficients
+        :return: burn rate of each cell, in inches / second
+        """
+        flux_factor = get_conversion('lb_per_sec_per_sq_in', 'kg_per_sec_per_sq_m')[0]
+        meters = get_conversion('inch', 'meter')[0]
+
+        flowing = mass_flux > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # alpha is in SI units, so the erosive term is evaluated in m/s and converted to inches / second
+            gain = settings.erosive_alpha * (mass_flux * flux_factor) ** 0.8 * \
+                (port_diameter * meters) ** -0.2 / meters
+            gain = np.where(flowing, gain, 0)
+            # r * rho / G is dimensionless, so no conversion is needed
+            decay = np.where(flowing, settings.erosive_beta * rho / mass_flux, 0)
+
+        rate = base_rate
+        for _ in range(EROSIVE_NEWTON_ITERATIONS):
+            erosive = gain * np.exp(-decay * rate)
+            rate = rate - (rate - base_rate - erosive) / (1 + decay * erosive)
+        return rate
+
     @classmethod
     def calc_isp(cls, motor: OpenBurnMotor, settings: SimSettings) -> float:
         """
@@ -342,3 +941,61 @@ class InternalBallisticsSim:
             return motor.get_upstream_mass_flow(x_val) / grain.get_port_area()
 
         raise Exception(f"Grain not found at x value: {x_val}")
+
+
+class SimRun:
+    """A simulation in progress, see InternalBallisticsSim.iter_sim.
+    Iterating it simulates the next step and yields the step's SimDataPoint.
+    burn_time and total_impulse are the totals of the steps yielded so far"""
+    def __init__(self, motor: OpenBurnMotor, settings: SimSettings, profile: SimProfile = None):
+        """
+        :param motor: the initial motor, which is never modified
+        :param settings: settings of the simulation
+        :param profile: optional SimProfile to measure the run with. It is finished when the run ends
+        :raises SimulationException: if the motor has no grains
+        """
+        if not motor.grains:
+            raise SimulationException("Error! The motor has no grains.")
+        self.motor = motor
+        self.settings = settings
+        self.profile = profile
+        self.burn_time: float = 0   # in seconds
+        self.total_impulse: float = 0   # in lb-sec
+        self.finished = False   # true once the motor has burned out
+        sim = InternalBallisticsSim
+        if profile is not None:
+            sim = profile.count_calls(sim, COUNTED_SIM_METHODS)
+            profile.start()
+        self._steps = sim._iter_engine(self)
+
+    def __iter__(self) -> "SimRun":
+        return self
+
+    def __next__(self) -> SimDataPoint:
+        profile = self.profile
+        if profile is not None:
+            profile.resume()    # time spent by the caller between steps is not part of the run
+        try:
+            point = next(self._steps)
+        except StopIteration:
+            self.finished = True
+            self._finish_profile()
+            raise
+        except Exception:
+            self._finish_profile()
+            raise
+        if profile is not None:
+            profile.lap('other')
+            profile.count('steps')
+        return point
+
+    def close(self) -> None:
+        """
+        End the simulation early, releasing its working state
+        """
+        self._steps.close()
+        self._finish_profile()
+
+    def _finish_profile(self) -> None:
+        if self.profile is not None:
+            self.profile.finish()
@@ -0,0 +1,114 @@
+from functools import lru_cache
+from math import isclose
+from typing import Dict
+
+import numpy as np
+
+EXIT_MACH_CACHE_SIZE = 1024     # number of (area ratio, gamma) solutions kept by solve_exit_mach
+MACH_TOLERANCE = 1e-10
+MAX_ITERATIONS = 50
+INITIAL_MACH = 2.2      # some arbitrary supersonic mach number, used when there is no better guess
+
+# the most recent solution of solve_exit_mach as (area ratio, gamma, mach), used to warm start the next solve
+_last_solution = (None, None, INITIAL_MACH)
+# total newton iterations of solve_exit_mach, only counted when a solution isn't cached, see get_solver_stats
+_exit_mach_iterations = 0
+
+
+def calc_area_ratio(mach, gamma: float):
+    """
+    Isentropic area ratio A/A* for a given mach number
+    :param mach: mach number, a float or numpy array
+    :param gamma: ratio of specific heats
+    :return: area ratio, the same type as mach
+    see https://www.grc.nasa.gov/www/k-12/airplane/rktthsum.html
+    """
+    gp1 = gamma + 1
+    gm1 = gamma - 1
+    exponent = gp1 / (2 * gm1)
+    return (2 / gp1 * (1 + 0.5 * gm1 * mach ** 2)) ** exponent / mach
+
+
+def _newton_step(mach, area_ratio, gamma: float):
+    """One newton iteration of the supersonic solution of calc_area_ratio(mach) = area_ratio"""
+    guess_ratio = calc_area_ratio(mach, gamma)
+    # d(A/A*)/dM = A/A* * (M^2 - 1) / (M * (1 + (gamma-1)/2 M^2))
+    deriv = guess_ratio * (mach ** 2 - 1) / (mach * (1 + 0.5 * (gamma - 1) * mach ** 2))
+    new_mach = mach - (guess_ratio - area_ratio) / deriv
+    # never step onto the subsonic branch
+    return np.maximum(new_mach, 1 + (mach - 1) / 2)
+
+
+def _solve_exit_mach(area_ratio: float, gamma: float, guess: float) -> float:
+    global _exit_mach_iterations
+    mach = guess
+    for i in range(MAX_ITERATIONS):
+        new_mach = float(_newton_step(mach, area_ratio, gamma))
+        if abs(new_mach - mach) < MACH_TOLERANCE:
+            _exit_mach_iterations += i + 1
+            return new_mach
+        mach = new_mach
+    _exit_mach_iterations += MAX_ITERATIONS
+    return mach
+
+
+@lru_cache(maxsize=EXIT_MACH_CACHE_SIZE)
+def _solve_exit_mach_cached(area_ratio: float, gamma: float) -> float:
+    global _last_solution
+    last_ratio, last_gamma, last_mach = _last_solution
+    # warm start from the previous solution if the nozzle or propellant only changed slightly
+    guess = INITIAL_MACH
+    if last_ratio is not None and isclose(last_ratio, area_ratio, rel_tol=0.1) and \
+            isclose(last_gamma, gamma, rel_tol=0.01):
+        guess = last_mach
+
+    mach = _solve_exit_mach(area_ratio, gamma, guess)
+    _last_solution = (area_ratio, gamma, mach)
+    return mach
+
+
+def solve_exit_mach(area_ratio: float, gamma: float) -> float:
+    """
+    Numerically solves the isentropic flow equation for the supersonic exit mach number.
+    Solutions are cached by (area ratio, gamma), and new solutions start from the previous one.
+    :param area_ratio: nozzle expansion ratio Ae/At
+    :param gamma: ratio of specific heats
+    :return: the exit mach number
+    """
+    if area_ratio <= 1:
+        return 1.0  # sonic nozzle has a mach number of 1 by definition
+    return _solve_exit_mach_cached(float(area_ratio), float(gamma))
+
+
+def get_solver_stats() -> Dict[str, int]:
+    """
+    :return: totals since the process started of solve_exit_mach's cache 'exit_mach_hits', the 'exit_mach_solves'
+        that weren't cached, and the 'exit_mach_iterations' of those solves
+    """
+    info = _solve_exit_mach_cached.cache_info()
+    return {'exit_mach_hits': info.hits, 'exit_mach_solves': info.misses,
+            'exit_mach_iterations': _exit_mach_iterations}
+
+
+def solve_exit_mach_array(area_ratios: np.ndarray, gamma: float, guess: np.ndarray = None) -> np.ndarray:
+    """
+    Vectorized solve_exit_mach, for many area ratios at once
+    :param area_ratios: array of nozzle expansion ratios
+    :param gamma: ratio of specific heats
+    :param guess: optional initial mach numbers, such as the solution for a similar set of nozzles
+    :return: array of exit mach numbers
+    """
+    area_ratios = np.asarray(area_ratios, dtype=float)
+    sonic = area_ratios <= 1
+    target = np.where(sonic, 2.0, area_ratios)     # solve a dummy supersonic ratio in place of sonic nozzles
+
+    mach = np.full(target.shape, INITIAL_MACH) if guess is None else np.array(guess, dtype=float)
+    mach = np.where(mach > 1, mach, INITIAL_MACH)
+    for _ in range(MAX_ITERATIONS):
+        new_mach = _newton_step(mach, target, gamma)
+        converged = np.all(np.abs(new_mach - mach) < MACH_TOLERANCE)
+        mach = new_mach
+        if converged:
+            break
+
+    return np.where(sonic, 1.0, mach)
@@ -1,6 +1,8 @@
-from typing import List
-from statistics import mean
-from math import ceil
+from bisect import bisect_left
+from typing import Any, Callable, List, Optional
+from math import fsum
+
+import numpy as np
 
 from openburn.core.grain import OpenBurnGrain
 from openburn.core.nozzle import OpenBurnNozzle
@@ -9,20 +11,152 @@ from openburn.core.propellant import SimplePropellant
 from openburn.object import OpenBurnObject
 
 
+class AxialIndex:
+    """Snapshot of where each grain sits along the motor axis and how much mass flow it generates.
+    Prefix sums over the grains are built once, so axial queries only need to bisect the grain end positions.
+    x = 0 is at the head end and x = len is the end of the propellant surface."""
+    def __init__(self, grains: List[OpenBurnGrain]):
+        """
+        :param grains: the motor's grains, from head end to aft end, in their current state
+        """
+        lengths = np.array([grain.length for grain in grains], dtype=float)
+        burning_area = np.array([grain.get_burning_area() for grain in grains], dtype=float)
+        face_area = np.array([grain.get_face_area() for grain in grains], dtype=float)
+        faces = np.array([grain.burning_faces for grain in grains], dtype=float)
+        flow_per_area = np.array([grain.propellant.rho * grain.burn_rate for grain in grains], dtype=float)
+
+        self.start = np.concatenate(([0], np.cumsum(lengths)))[:-1]
+        self.end = self.start + lengths
+        self.port_area = np.array([grain.get_port_area() for grain in grains], dtype=float)
+        self.mass_flow = burning_area * flow_per_area
+        # mass flow of all the grains upstream of each grain
+        self.upstream_mass_flow = np.concatenate(([0], np.cumsum(self.mass_flow)))
+
+        # mass flow of the core per unit length, and of the head end face, which only burns if both faces do
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.core_flow = np.where(lengths > 0, (burning_area - faces * face_area) / lengths, 0) * flow_per_area
+        self.head_face_flow = np.where(faces > 1, face_area, 0) * flow_per_area
+
+        self._end_list = self.end.tolist()    # bisect is faster on a list than searchsorted on a single value
+
+    def __len__(self) -> int:
+        return len(self.end)
+
+    def get_grain_index(self, x_val: float) -> Optional[int]:
+        """
+        :return: index of the grain found at x_val, or None if x_val is past the aft end.
+            On the boundary between two grains, the upstream grain is returned
+        """
+        index = bisect_left(self._end_list, x_val)
+        return index if index < len(self) else None
+
+    def get_upstream_mass_flow(self, x_val: float) -> float:
+        """
+        :return: mass flow generated upstream of x_val, in lb/sec
+        """
+        index = self.get_grain_index(x_val)
+        if index is None:
+            return float(self.upstream_mass_flow[-1])
+        depth = min(max(x_val - self.start[index], 0), self.end[index] - self.start[index])
+        return float(self.upstream_mass_flow[index] + self.core_flow[index] * depth + self.head_face_flow[index])
+
+    def get_mass_flux_profile(self, x_vals) -> np.ndarray:
+        """
+        Vectorized mass flux at many axial stations at once
+        :param x_vals: array-like of x values, in inches
+        :return: mass flux at each station, in lb/sec/in^2. nan for stations past the aft end
+        """
+        x_vals = np.asarray(x_vals, dtype=float)
+        index = np.searchsorted(self.end, x_vals, side='left')
+        inside = index < len(self)
+        index = np.minimum(index, len(self) - 1)
+
+        depth = np.clip(x_vals - self.start[index], 0, self.end[index] - self.start[index])
+        upstream = self.upstream_mass_flow[index] + self.core_flow[index] * depth + self.head_face_flow[index]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(inside, upstream / self.port_area[index], np.nan)
+
+
 class OpenBurnMotor(OpenBurnObject):
+    """A motor made of propellant grains, from head end to aft end, and a nozzle.
+    Properties derived from the grains and nozzle, such as get_kn and the axial index, are cached until a grain
+    or the nozzle changes. Grains and the nozzle notify the motor whenever one of their attributes is set,
+    including when a grain burns. Editing the grain list in place or a propellant is not noticed, so call
+    set_grains afterwards, which also recalculates the average propellant."""
+    __slots__ = ('grains', 'nozzle', 'avg_propellant', '_properties')
+
     def __init__(self) -> None:
         super(OpenBurnMotor, self).__init__()
         self.grains: List[OpenBurnGrain] = []
         self.nozzle: OpenBurnNozzle = None
         self.avg_propellant = None
 
+    def __setattr__(self, key: str, value) -> None:
+        object.__setattr__(self, key, value)
+        if key[0] == '_':
+            return
+        if key == 'grains':
+            for grain in value:
+                grain.set_parent(self)
+        elif key == 'nozzle' and value is not None:
+            value.set_parent(self)
+        self._properties = None
+
+    def __deepcopy__(self, memo):
+        result = super(OpenBurnMotor, self).__deepcopy__(memo)
+        for grain in getattr(result, 'grains', ()):     # a copy only has the attributes that were set
+            grain.set_parent(result)
+        if getattr(result, 'nozzle', None) is not None:
+            result.nozzle.set_parent(result)
+        return result
+
+    def _child_changed(self, child: OpenBurnObject) -> None:
+        # a burning grain sets several attributes in a row, so only the first one has anything to drop
+        if self._properties is not None:
+            self._properties = None
+
+    def invalidate(self) -> None:
+        """
+        Drop every cached property, such as after editing the grain list in place
+        """
+        # dropped rather than cleared, since copies of the motor share the cache until they change
+        self._properties = None
+
+    def _cached(self, key: str, func: Callable[[], Any]) -> Any:
+        """Memoize a derived property until the motor changes"""
+        properties = getattr(self, '_properties', None)
+        if properties is None:
+            properties = self._properties = {}
+        value = properties.get(key)     # properties are never None
+        if value is None:
+            value = properties[key] = func()
+        return value
+
     def add_grain(self, grain: OpenBurnGrain) -> None:
         self.grains.append(grain)
+        grain.set_parent(self)
+        self.invalidate()
 
     def set_grains(self, grains: List[OpenBurnGrain]) -> None:
         self.grains = grains
         self.avg_propellant = self.calc_avg_propellant()
 
+    def update_axial_index(self) -> AxialIndex:
+        """
+        Drop the cached properties and rebuild the axial index from the current grain state.
+        The index is rebuilt automatically the first time it is used after the grains change, so this is only
+        needed after editing the grain list in place.
+        :return: the new index
+        """
+        self.invalidate()
+        return self.get_axial_index()
+
+    def get_axial_index(self) -> AxialIndex:
+        """
+        :return: the current axial index, built if there is none
+        """
+        return self._cached('axial_index', lambda: AxialIndex(self.grains))
+
     def set_nozzle(self, nozzle: OpenBurnNozzle) -> None:
         self.nozzle = nozzle
 
@@ -32,11 +166,12 @@ class OpenBurnMotor(OpenBurnObject):
         individual propellant params
         :return:
         """
-        a = mean(grain.propellant.a for grain in self.grains)
-        n = mean(grain.propellant.n for grain in self.grains)
-        cstar = mean(grain.propellant.cstar for grain in self.grains)
-        rho = mean(grain.propellant.rho for grain in self.grains)
-        gamma = mean(grain.propellant.gamma for grain in self.grains)
+        count = len(self.grains)    # fsum is accurate like statistics.mean, without its slow exact fractions
+        a = fsum(grain.propellant.a for grain in self.grains) / count
+        n = fsum(grain.propellant.n for grain in self.grains) / count
+        cstar = fsum(grain.propellant.cstar for grain in self.grains) / count
+        rho = fsum(grain.propellant.rho for grain in self.grains) / count
+        gamma = fsum(grain.propellant.gamma for grain in self.grains) / count
         return SimplePropellant("AVG:" + str(self.uuid), a, n, cstar, rho, gamma)
 
     def get_num_grains(self) -> float:
@@ -46,67 +181,65 @@ class OpenBurnMotor(OpenBurnObject):
         """
         :return: propellant length, in inches
         """
-        return sum(x.length for x in self.grains)
+        return self._cached('length', lambda: sum(x.length for x in self.grains))
 
     def get_diameter(self):
         """
         :return: maximum grain diameter of the motor, in inches
         """
-        return max(x.diameter for x in self.grains)
+        return self._cached('diameter', lambda: max(x.diameter for x in self.grains))
 
     def get_propellant_mass(self) -> float:
         """
         :return Propellant mass, in lbs
         """
-        return sum(x.get_volume() * x.propellant.rho for x in self.grains)
+        return self._cached('propellant_mass', lambda: sum(x.get_volume() * x.propellant.rho for x in self.grains))
 
     def get_port_throat_ratio(self) -> float:
         """
         :return: Ratio of bottom grain port area to nozzle throat area, dimensionless
         """
-        return self.grains[-1].get_port_area() / self.nozzle.get_throat_area()
+        return self._cached('port_throat_ratio',
+                            lambda: self.grains[-1].get_port_area() / self.nozzle.get_throat_area())
 
     def get_volume_loading(self) -> float:
         """
         :return: Ratio of propellant volume to chamber volume, dimensionless
         """
+        return self._cached('volume_loading', self._calc_volume_loading)
+
+    def _calc_volume_loading(self) -> float:
         propellant_volume = sum(x.get_volume() for x in self.grains)
         chamber_volume = (self.get_diameter() / 2) ** 2 * self.get_length()
         return propellant_volume / chamber_volume
 
     def get_upstream_mass_flow(self, x_val: float) -> float:
         """
-        Calculate how much mass flow is occurring upstream of this given x coordinate
+        Calculate how much mass flow is occurring upstream of this given x coordinate, see AxialIndex
         :param x_val: x value of the point to find mass flux,
             where x = 0 is at the head end and x = len is the end of the propellant surface.
         :returns mass flow, in lb/sec
         """
-        x = 0
-        mass_flow = 0
-        for grain in self.grains:
-            len_ = grain.length
-            if x <= x_val:
-                pass
-                if ceil(x) < ceil(x_val - len_):
-                    burning_surface = grain.get_burning_area()
-                else:
-                    burning_surface = grain.get_upstream_burning_area(x + len_ - x_val)
-                mass_flow += burning_surface * grain.propellant.rho * grain.burn_rate
+        return self.get_axial_index().get_upstream_mass_flow(x_val)
 
-            x += len_
-
-        return mass_flow
+    def get_mass_flux_profile(self, x_vals) -> np.ndarray:
+        """
+        Mass flux along the motor axis, see AxialIndex.get_mass_flux_profile
+        :param x_vals: array-like of x values, in inches
+        :return: mass flux at each station, in lb/sec/in^2. nan for stations past the aft end
+        """
+        return self.get_axial_index().get_mass_flux_profile(x_vals)
 
     def get_mass_flow(self) -> float:
         """
         Calculate total mass flow out of the nozzle
         :return: mass flow in lb/sec
         """
-        return sum(
+        return self._cached('mass_flow', lambda: sum(
             grain.get_burning_area() *
             grain.propellant.rho *
             grain.burn_rate
-            for grain in self.grains)
+            for grain in self.grains))
 
     def get_grain_at_x(self, x_val: float) -> "OpenBurnGrain" or None:
         """
@@ -115,24 +248,19 @@ class OpenBurnMotor(OpenBurnObject):
             where x = 0 is at the head end and x = len is the end of the propellant surface.
         :return: the grain if found, otherwise None
         """
-        x = 0
-        for grain in self.grains:
-            x += grain.length
-            if x >= x_val:
-                return grain
-
-        return None
+        index = self.get_axial_index().get_grain_index(x_val)
+        return self.grains[index] if index is not None else None
 
     def get_burning_area(self) -> float:
         """
         Sum of all burning surface area in the motor
         :return: burning area, in in^2
         """
-        return sum(x.get_burning_area() for x in self.grains)
+        return self._cached('burning_area', lambda: sum(x.get_burning_area() for x in self.grains))
 
     def get_kn(self) -> float:
         """
         Kn (ratio of burning surface area to nozzle area)
         :return:
         """
-        return self.get_burning_area() / self.nozzle.get_throat_area()
+        return self._cached('kn', lambda: self.get_burning_area() / self.nozzle.get_throat_area())
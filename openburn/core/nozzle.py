@@ -6,6 +6,8 @@ from openburn.object import OpenBurnObject
 
 class OpenBurnNozzle(OpenBurnObject):
     """Base class of all nozzles"""
+    __slots__ = ('throat_dia', 'exit_dia')
+
     def __init__(self, throat: float, exit: float):
         super(OpenBurnNozzle, self).__init__()
         self.throat_dia: float = throat
@@ -28,6 +30,8 @@ class OpenBurnNozzle(OpenBurnObject):
 
 class ConicalNozzle(OpenBurnNozzle):
     """A conical nozzle with a straight cut throat"""
+    __slots__ = ('half_angle', 'throat_len')
+
     def __init__(self, throat: float, exit: float, half_angle: float, throat_len: float):
         """
         :param throat: the diameter of the nozzle throat, in inches
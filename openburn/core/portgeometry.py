@@ -0,0 +1,349 @@
+"""
+Regression of arbitrary 2D port shapes.
+
+A port is a tuple of polygons, each a tuple of (x, y) points in inches with the grain axis at the origin.
+Polygons may overlap each other and the outside of the grain, the port is their union.
+The port is rasterized, and the distance every point of the propellant is from the initial burning surface is
+found by solving the eikonal equation |grad T| = 1 on the raster. Since the propellant regresses at the same
+rate everywhere on the port, the burning surface at web distance w is the contour T = w, so the port area
+and perimeter curves of a design only have to be computed once.
+Those curves are cached on disk, keyed by a hash of the geometry, see get_port_map.
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+from math import pi, sin, cos
+from typing import Tuple, Sequence
+
+import numpy as np
+
+from openburn import USER_PATH
+
+Polygon = Tuple[Tuple[float, float], ...]
+Port = Tuple[Polygon, ...]
+
+PORT_MAP_VERSION = 1    # bump when the solver changes, so stale cache files are not used
+PORT_MAP_POINTS = 256   # number of web distances the port area and perimeter curves are sampled at
+PORT_MAP_CACHE_SIZE = 32    # number of port maps kept in memory
+DEFAULT_RESOLUTION = 256    # raster cells across the grain diameter
+CIRCLE_SEGMENTS = 128
+
+# directory of cached port maps. Set to None to disable the disk cache
+port_map_cache_path = os.path.join(USER_PATH, 'cache', 'port_maps')
+
+
+def circle_port(diameter: float, center: Tuple[float, float] = (0, 0), segments: int = CIRCLE_SEGMENTS) -> Port:
+    """
+    :param diameter: port diameter, in inches
+    :param center: position of the port's center
+    :param segments: number of polygon edges used to represent the circle
+    """
+    r = diameter / 2
+    x, y = center
+    return (tuple((x + r * cos(2 * pi * i / segments), y + r * sin(2 * pi * i / segments))
+                  for i in range(segments)),)
+
+
+def star_port(points: int, inner_diameter: float, outer_diameter: float) -> Port:
+    """
+    :param points: number of star points
+    :param inner_diameter: diameter of the circle through the valleys between points, in inches
+    :param outer_diameter: diameter of the circle through the tips of the points, in inches
+    """
+    polygon = []
+    for i in range(2 * points):
+        r = (outer_diameter if i % 2 == 0 else inner_diameter) / 2
+        angle = pi * i / points
+        polygon.append((r * cos(angle), r * sin(angle)))
+    return (tuple(polygon),)
+
+
+def finocyl_port(core_diameter: float, fins: int, fin_width: float, fin_length: float) -> Port:
+    """
+    :param core_diameter: diameter of the central core, in inches
+    :param fins: number of fins, evenly spaced around the core
+    :param fin_width: width of each fin, in inches
+    :param fin_length: distance each fin extends past the core, in inches
+    """
+    port = circle_port(core_diameter)
+    tip = core_diameter / 2 + fin_length
+    for i in range(fins):
+        angle = 2 * pi * i / fins
+        c, s = cos(angle), sin(angle)
+        corners = ((0, -fin_width / 2), (tip, -fin_width / 2), (tip, fin_width / 2), (0, fin_width / 2))
+        port += (tuple((x * c - y * s, x * s + y * c) for x, y in corners),)
+    return port
+
+
+def moonburner_port(core_diameter: float, offset: float) -> Port:
+    """
+    :param core_diameter: diameter of the core, in inches
+    :param offset: distance from the grain axis to the center of the core, in inches
+    """
+    return circle_port(core_diameter, center=(offset, 0))
+
+
+def c_slot_port(grain_diameter: float, slot_width: float, slot_depth: float) -> Port:
+    """
+    A rectangular slot cut in from the outside of the grain
+    :param grain_diameter: outer diameter of the grain, in inches
+    :param slot_width: width of the slot, in inches
+    :param slot_depth: distance the slot extends in from the outside of the grain, in inches
+    """
+    outside = grain_diameter  # anywhere safely outside the grain
+    inside = grain_diameter / 2 - slot_depth
+    return (((inside, -slot_width / 2), (outside, -slot_width / 2),
+             (outside, slot_width / 2), (inside, slot_width / 2)),)
+
+
+def make_port(polygons: Sequence[Sequence[Sequence[float]]]) -> Port:
+    """
+    :param polygons: polygons of a port in any sequence type, such as a user-drawn shape or decoded json
+    :return: the port as nested tuples of floats, which are hashable and used as the canonical form
+    """
+    return tuple(tuple((float(x), float(y)) for x, y in polygon) for polygon in polygons)
+
+
+def hash_geometry(port: Port, diameter: float, resolution: int) -> str:
+    """
+    :return: a hex digest identifying the port map of a geometry
+    """
+    key = {
+        'version': PORT_MAP_VERSION,
+        'diameter': round(diameter, 9),
+        'resolution': resolution,
+        'port': [[[round(x, 9), round(y, 9)] for x, y in polygon] for polygon in port],
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def _polygon_edges(polygon: Polygon) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    vertices = np.asarray(polygon, dtype=float)
+    x1, y1 = vertices[:, 0], vertices[:, 1]
+    return x1, y1, np.roll(x1, -1), np.roll(y1, -1)
+
+
+def _in_polygon(x: np.ndarray, y: np.ndarray, polygon: Polygon) -> np.ndarray:
+    """Even-odd rule, casting a ray in +x from every point inside the bounding box across every edge at once"""
+    x1, y1, x2, y2 = _polygon_edges(polygon)
+    result = np.zeros(x.shape, dtype=bool)
+    candidates = (x >= x1.min()) & (x <= x1.max()) & (y >= y1.min()) & (y <= y1.max())
+    xp, yp = x[candidates][:, np.newaxis], y[candidates][:, np.newaxis]
+    crosses = (y1 > yp) != (y2 > yp)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x1 + (yp - y1) * (x2 - x1) / (y2 - y1)
+    result[candidates] = np.count_nonzero(crosses & (xp < x_cross), axis=-1) % 2 == 1
+    return result
+
+
+def _edge_distance(x: np.ndarray, y: np.ndarray, polygon: Polygon) -> np.ndarray:
+    """Distance from every point to the nearest edge of the polygon"""
+    x1, y1, x2, y2 = _polygon_edges(polygon)
+    dx, dy = x2 - x1, y2 - y1
+    length_sq = np.maximum(dx ** 2 + dy ** 2, 1e-300)
+    xp, yp = x[..., np.newaxis], y[..., np.newaxis]
+    t = np.clip(((xp - x1) * dx + (yp - y1) * dy) / length_sq, 0, 1)
+    return np.hypot(xp - x1 - t * dx, yp - y1 - t * dy).min(axis=-1)
+
+
+def rasterize(port: Port, diameter: float, resolution: int, band: int = 2) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    :param port: the port shape
+    :param diameter: outer diameter of the grain, in inches
+    :param resolution: number of cells across the grain diameter
+    :param band: width of the band around the port surface, in cells, where distances are computed exactly
+    :return: tuple of (initial distance field, fraction of each cell inside the grain, cell size in inches).
+        The distance field is the signed distance of each cell center from the port surface, negative inside
+        the port, in the band around the surface. It is -inf deeper inside the port and nan everywhere else
+    """
+    cell = diameter / resolution
+    centers = (np.arange(resolution) + 0.5) * cell - diameter / 2
+    x, y = np.meshgrid(centers, centers)
+
+    inside = [_in_polygon(x, y, polygon) for polygon in port]
+    port_mask = np.logical_or.reduce(inside) if inside else np.zeros(x.shape, dtype=bool)
+
+    # cells within `band` cells of both a port cell and a propellant cell
+    near_port = port_mask.copy()
+    near_propellant = ~port_mask
+    for _ in range(band):
+        near_port = _dilate(near_port)
+        near_propellant = _dilate(near_propellant)
+    in_band = near_port & near_propellant
+
+    field = np.where(port_mask, -np.inf, np.nan)
+    bx, by = x[in_band], y[in_band]
+    outside_distance = np.full(bx.shape, np.inf)
+    inside_distance = np.zeros(bx.shape)
+    for polygon, polygon_mask in zip(port, inside):
+        distance = _edge_distance(bx, by, polygon)
+        in_polygon = polygon_mask[in_band]
+        outside_distance = np.where(in_polygon, outside_distance, np.minimum(outside_distance, distance))
+        # edges of one polygon inside another are not on the surface, so take the deepest containing polygon
+        inside_distance = np.where(in_polygon, np.maximum(inside_distance, distance), inside_distance)
+    field[in_band] = np.where(port_mask[in_band], -inside_distance, outside_distance)
+
+    # approximate coverage of the cells the grain's outer surface passes through
+    radius = np.hypot(x, y)
+    coverage = np.clip((diameter / 2 - radius) / cell + 0.5, 0, 1)
+    return field, coverage, cell
+
+
+def _dilate(mask: np.ndarray) -> np.ndarray:
+    result = mask.copy()
+    result[1:, :] |= mask[:-1, :]
+    result[:-1, :] |= mask[1:, :]
+    result[:, 1:] |= mask[:, :-1]
+    result[:, :-1] |= mask[:, 1:]
+    return result
+
+
+def solve_distance_field(initial: np.ndarray, cell: float, max_iterations: int = None) -> np.ndarray:
+    """
+    Solves the eikonal equation |grad T| = 1 for the distance of every cell from the port.
+    Uses Godunov's upwind discretization with Jacobi iteration, so every sweep updates the whole grid with a
+    few array operations. Iteration stops once the field no longer changes, which takes about as many sweeps
+    as the widest web is in cells.
+    :param initial: known distances, nan for the cells to solve for, see rasterize
+    :param cell: size of a cell, in inches
+    :param max_iterations: optional limit on the number of sweeps, defaults to the grid perimeter
+    :return: distance of each cell center from the port, in inches. inf if it is unreachable
+    """
+    if max_iterations is None:
+        max_iterations = 2 * sum(initial.shape)
+
+    unknown = np.isnan(initial)
+    field = np.where(unknown, np.inf, initial)
+    if unknown.all():
+        return field
+
+    for _ in range(max_iterations):
+        padded = np.pad(field, 1, constant_values=np.inf)
+        a = np.minimum(padded[1:-1, :-2], padded[1:-1, 2:])     # smallest horizontal neighbor
+        b = np.minimum(padded[:-2, 1:-1], padded[2:, 1:-1])     # smallest vertical neighbor
+        with np.errstate(invalid='ignore'):
+            diff = np.abs(a - b)
+            diff[np.isnan(diff)] = np.inf   # both neighbors unreached
+            two_sided = (a + b + np.sqrt(np.maximum(2 * cell ** 2 - diff ** 2, 0))) / 2
+        update = np.where(diff >= cell, np.minimum(a, b) + cell, two_sided)
+        new_field = np.where(unknown, np.minimum(field, update), field)
+        if np.array_equal(new_field, field):
+            break
+        field = new_field
+    return field
+
+
+class PortMap:
+    """Port area and burning perimeter of a port shape against web distance burned"""
+    def __init__(self, web: np.ndarray, port_area: np.ndarray, perimeter: np.ndarray):
+        """
+        :param web: web distances burned, in inches, from 0 to burnout
+        :param port_area: port area at each web distance, in in^2
+        :param perimeter: length of the burning surface of the port at each web distance, in inches
+        """
+        self.web = web
+        self.port_area = port_area
+        self.perimeter = perimeter
+
+    def get_web_thickness(self) -> float:
+        """
+        :return: web distance at which the last of the propellant burns, in inches
+        """
+        return float(self.web[-1])
+
+    def get_port_area(self, web):
+        """
+        :param web: web distance burned, in inches. A float or numpy array
+        :return: port area, in in^2
+        """
+        return np.interp(web, self.web, self.port_area)
+
+    def get_perimeter(self, web):
+        """
+        :param web: web distance burned, in inches. A float or numpy array
+        :return: length of the burning surface, in inches. 0 once the grain is burned out
+        """
+        return np.interp(web, self.web, self.perimeter, right=0)
+
+    @classmethod
+    def from_distance_field(cls, field: np.ndarray, coverage: np.ndarray, cell: float,
+                            points: int = PORT_MAP_POINTS) -> "PortMap":
+        """
+        :param field: distance of each cell from the port, see solve_distance_field
+        :param coverage: fraction of each cell inside the grain
+        :param cell: size of a cell, in inches
+        :param points: number of web distances to sample
+        """
+        in_grain = (coverage > 0) & (field < np.inf)
+        distances = np.maximum(field[in_grain], -cell)  # cells deep in the port are simply burned
+        weights = coverage[in_grain] * cell ** 2
+        web_thickness = float(max(distances.max(initial=0) + cell / 2, 0))
+
+        # Every cell burns through linearly as the front passes its center, which keeps the area curve smooth:
+        # area(w) = sum(weight * clip((w - d) / cell + 1/2, 0, 1)) = (I(w + cell/2) - I(w - cell/2)) / cell,
+        # where I(x) = sum(weight * max(x - d, 0)) is evaluated with cumulative sums over the sorted distances
+        order = np.argsort(distances)
+        sorted_distances = distances[order]
+        cum_weight = np.concatenate(([0], np.cumsum(weights[order])))
+        cum_moment = np.concatenate(([0], np.cumsum((weights * distances)[order])))
+
+        def integral(x: np.ndarray) -> np.ndarray:
+            count = np.searchsorted(sorted_distances, x, side='right')
+            return x * cum_weight[count] - cum_moment[count]
+
+        web = np.linspace(0, web_thickness, points)
+        port_area = (integral(web + cell / 2) - integral(web - cell / 2)) / cell
+        perimeter = np.gradient(port_area, web) if web_thickness > 0 else np.zeros(points)
+        return cls(web, port_area, np.maximum(perimeter, 0))
+
+    def save(self, filename: str) -> None:
+        # write to a temporary file first, so other processes never read a partial file
+        temp = f"{filename}.{os.getpid()}.tmp"
+        with open(temp, 'wb') as f:
+            np.savez(f, web=self.web, port_area=self.port_area, perimeter=self.perimeter)
+        os.replace(temp, filename)
+
+    @classmethod
+    def load(cls, filename: str) -> "PortMap":
+        with np.load(filename) as data:
+            return cls(data['web'], data['port_area'], data['perimeter'])
+
+
+def compute_port_map(port: Port, diameter: float, resolution: int = DEFAULT_RESOLUTION) -> PortMap:
+    """
+    Rasterizes the port and solves for its port area and perimeter curves. This is slow, use get_port_map.
+    :param port: the port shape
+    :param diameter: outer diameter of the grain, in inches
+    :param resolution: number of cells across the grain diameter
+    """
+    initial, coverage, cell = rasterize(port, diameter, resolution)
+    field = solve_distance_field(initial, cell)
+    return PortMap.from_distance_field(field, coverage, cell)
+
+
+@lru_cache(maxsize=PORT_MAP_CACHE_SIZE)
+def get_port_map(port: Port, diameter: float, resolution: int = DEFAULT_RESOLUTION) -> PortMap:
+    """
+    compute_port_map, cached in memory and in port_map_cache_path.
+    The disk cache is keyed by hash_geometry, so a design is only solved once across sessions.
+    :param port: the port shape, see make_port
+    :param diameter: outer diameter of the grain, in inches
+    :param resolution: number of cells across the grain diameter
+    """
+    filename = None
+    if port_map_cache_path is not None:
+        filename = os.path.join(port_map_cache_path, f"{hash_geometry(port, diameter, resolution)}.npz")
+        try:
+            return PortMap.load(filename)
+        except (OSError, ValueError, KeyError):
+            pass    # not cached yet, or the file is unreadable and will be replaced
+
+    port_map = compute_port_map(port, diameter, resolution)
+    if filename is not None:
+        try:
+            os.makedirs(port_map_cache_path, exist_ok=True)
+            port_map.save(filename)
+        except OSError:
+            pass    # the cache is an optimization, a read-only install still works
+    return port_map
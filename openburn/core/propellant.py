@@ -3,6 +3,8 @@ from openburn.object import OpenBurnObject
 
 class OpenBurnPropellant(OpenBurnObject):
     """Base class of all propellants"""
+    __slots__ = ('name',)
+
     def __init__(self, name: str) -> None:
         super(OpenBurnPropellant, self).__init__()
         self.name = name
@@ -10,6 +12,8 @@ class OpenBurnPropellant(OpenBurnObject):
 
 class SimplePropellant(OpenBurnPropellant):
     """Simple propellant using Saint Robert's law (r = aP^n)"""
+    __slots__ = ('a', 'n', 'cstar', 'rho', 'gamma')
+
     def __init__(self, name: str, a: float, n: float, cstar: float, rho: float, gamma: float = 1.25) -> None:
         """
         :param name: The propellant's name
@@ -28,4 +32,5 @@ class SimplePropellant(OpenBurnPropellant):
 
 
 class AdvancedPropellant(SimplePropellant):
+    __slots__ = ()
     NotImplemented
@@ -0,0 +1,179 @@
+"""
+Content addressed cache of simulation results.
+
+A simulation is identified by a hash of its normalized inputs: the motor's state without uuids or derived
+caches, the sim settings, and the versions of the simulation and port geometry code. Results are stored on disk
+keyed by that hash in the format of SimResults.save, so re-running a known design only has to load a file.
+The cache is bounded in size, and the least recently used results are evicted first.
+"""
+import hashlib
+import json
+import os
+import shutil
+from enum import Enum
+from typing import Any
+
+import numpy as np
+
+from openburn import USER_PATH
+from openburn.core.motor import OpenBurnMotor
+from openburn.core.portgeometry import PORT_MAP_VERSION
+from openburn.core.propellant import OpenBurnPropellant
+from openburn.core.simresults import SimResults, RESULTS_EXTENSION, RESULTS_FORMAT_VERSION
+from openburn.object import OpenBurnObject
+
+SIM_VERSION = 1     # bump whenever a change to the simulation changes its results, so stale results are not used
+DEFAULT_CACHE_SIZE = 256 * 2 ** 20  # bytes of results kept on disk
+PRUNE_FRACTION = 0.8    # fraction of the size limit left after evicting, so the cache isn't pruned on every store
+
+# default directory of cached results, see SimCache
+sim_cache_path = os.path.join(USER_PATH, 'cache', 'sim_results')
+
+
+def _normalize(value: Any) -> Any:
+    """
+    :return: value as plain json data that is equal for objects that simulate identically
+    """
+    if isinstance(value, OpenBurnObject):
+        state = value.__getstate__()    # without the uuid and derived caches
+        if isinstance(value, OpenBurnPropellant):
+            state.pop('name', None)     # doesn't affect results, and averaged propellants are named by uuid
+        normalized = {key: _normalize(item) for key, item in state.items()}
+        normalized['type'] = type(value).__name__
+        return normalized
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (bool, str, type(None))):
+        return value
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value) + 0.0     # 2 and 2.0 simulate the same, and + 0.0 makes -0.0 equal to 0.0
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    raise TypeError(f"Can't hash a {type(value).__name__} value")
+
+
+def hash_simulation(motor: OpenBurnMotor, settings: "SimSettings") -> str:
+    """
+    :param motor: the motor to simulate
+    :param settings: the settings it is simulated with
+    :return: a hex digest identifying the results of the simulation
+    """
+    key = {
+        'version': SIM_VERSION,
+        'port_map_version': PORT_MAP_VERSION,
+        'motor': _normalize(motor),
+        'settings': _normalize(vars(settings)),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+class SimCache:
+    """Simulation results stored on disk, keyed by hash_simulation.
+    Results of every SIM_VERSION and results file format are kept in their own sub directory, and the
+    directories of other versions are deleted when the cache is pruned. Several processes may share a cache directory.
+    Snapshots of the regressed motor are not stored."""
+    def __init__(self, path: str = None, max_size: int = DEFAULT_CACHE_SIZE):
+        """
+        :param path: directory to store results in. Defaults to sim_cache_path
+        :param max_size: size limit of the stored results, in bytes
+        """
+        self.root = path if path is not None else sim_cache_path
+        self.path = os.path.join(self.root, f"v{SIM_VERSION}.{RESULTS_FORMAT_VERSION}")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._size: int = None     # estimated bytes stored, found on the first store
+
+    def get_filename(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}{RESULTS_EXTENSION}")
+
+    def get(self, key: str) -> SimResults or None:
+        """
+        :param key: see hash_simulation
+        :return: the stored results, or None if they aren't cached
+        """
+        filename = self.get_filename(key)
+        try:
+            results = SimResults.load(filename, mmap=False)     # not mapped, so evicting never fails
+            os.utime(filename)  # mark as recently used
+        except (OSError, ValueError, KeyError):
+            self.misses += 1    # not cached yet, or the file is unreadable and will be replaced
+            return None
+        self.hits += 1
+        return results
+
+    def put(self, key: str, results: SimResults) -> None:
+        """
+        Store results, evicting the least recently used results if the cache is full
+        :param key: see hash_simulation
+        :param results: the results to store
+        """
+        filename = self.get_filename(key)
+        # write to a temporary file first, so other processes never read a partial file
+        temp = f"{filename}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            results.save(temp)
+            os.replace(temp, filename)
+            if self._size is None:
+                self._size = self.get_size()
+            else:
+                self._size += os.path.getsize(filename)
+        except OSError:
+            return  # the cache is an optimization, a read-only install still works
+        if self._size > self.max_size:
+            self.prune()
+
+    def get_size(self) -> int:
+        """
+        :return: bytes of results stored for this version
+        """
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def prune(self, max_size: int = None) -> None:
+        """
+        Evict the least recently used results until the cache is well under its size limit,
+        and delete the results of other simulation versions
+        :param max_size: size limit to prune to, defaults to max_size
+        """
+        limit = (max_size if max_size is not None else self.max_size) * PRUNE_FRACTION
+        try:
+            for entry in os.scandir(self.root):
+                if entry.is_dir() and entry.name.startswith('v') and entry.name != os.path.basename(self.path):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
+
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue    # evicted by another process
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, filename in entries:
+            if size <= limit:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+            size -= entry_size
+        self._size = size
+
+    def clear(self) -> None:
+        """
+        Delete every stored result of this version
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+        self._size = 0
+
+    def _entries(self):
+        try:
+            return [entry for entry in os.scandir(self.path) if entry.name.endswith(RESULTS_EXTENSION)]
+        except OSError:
+            return []
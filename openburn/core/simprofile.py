@@ -0,0 +1,147 @@
+"""
+Opt-in instrumentation of a simulation run: wall time per phase, call and iteration counters, and optionally
+the peak memory allocated, see InternalBallisticsSim.run_sim.
+
+Nothing is measured unless a SimProfile is passed to the simulation. The engines only check for one at phase
+boundaries, and calls are counted by wrapping the simulator's methods for the profiled run alone, so an
+unprofiled run executes the same code as before.
+"""
+import time
+import tracemalloc
+from collections import defaultdict
+from functools import wraps
+from typing import Any, Dict, Iterable
+
+from openburn.core.isentropic import get_solver_stats
+
+# methods of InternalBallisticsSim whose calls are counted
+COUNTED_SIM_METHODS = ('calc_chamber_pressure', 'calc_steady_state_burn_rate', 'calc_thrust', 'calc_exit_pressure',
+                       'calc_exit_mach', 'calc_mass_flux', 'calc_isp', 'calc_erosive_burn_rate')
+# methods of ArrayBallistics whose calls are counted
+COUNTED_BALLISTICS_METHODS = ('calc_kn', 'calc_chamber_pressure', 'calc_erosive_chamber_pressure', 'calc_burn_rate',
+                              'calc_thrust', 'fill_data_point')
+
+
+class SimProfile:
+    """Timers and counters of a single simulation run.
+    timers are the seconds spent in each phase of the run, excluding time spent by the caller between steps.
+    calls are the number of calls of each counted method, and counters are engine specific event counts,
+    such as 'steps' or the 'rejected_steps' of SimEngine.ADAPTIVE. Solver counters of the exit mach number are
+    process wide totals, so they are only exact if a single simulation runs at a time in the process."""
+    def __init__(self, trace_memory: bool = False):
+        """
+        :param trace_memory: record the peak memory allocated by python during the run with tracemalloc.
+            This slows the simulation down considerably
+        """
+        self.trace_memory = trace_memory
+        self.timers: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.wall_time: float = 0     # total seconds the run was simulating
+        self.peak_memory: int = None    # in bytes, if trace_memory is set
+        self._lap_start: float = None
+        self._started_tracing = False
+        self._solver_stats: Dict[str, int] = None
+        self._running = False
+
+    def start(self) -> None:
+        """
+        Start measuring. Called by the simulation when the run starts
+        """
+        if self._running:
+            return
+        self._running = True
+        self._solver_stats = get_solver_stats()
+        if self.trace_memory:
+            if tracemalloc.is_tracing():
+                if hasattr(tracemalloc, 'reset_peak'):
+                    tracemalloc.reset_peak()
+                else:   # python < 3.9, restarting is the only way to reset the peak. It drops the traces so far
+                    tracemalloc.stop()
+                    tracemalloc.start()
+            else:
+                tracemalloc.start()
+                self._started_tracing = True
+        self._lap_start = time.perf_counter()
+
+    def finish(self) -> None:
+        """
+        Stop measuring. Called by the simulation when the run ends, is stopped or fails
+        """
+        if not self._running:
+            return
+        self.lap('other')
+        self._running = False
+        for name, total in get_solver_stats().items():
+            self.counters[name] += total - self._solver_stats[name]
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def lap(self, phase: str) -> None:
+        """
+        Add the time since the previous lap to a phase
+        """
+        now = time.perf_counter()
+        elapsed = now - self._lap_start
+        self.timers[phase] += elapsed
+        self.wall_time += elapsed
+        self._lap_start = now
+
+    def resume(self) -> None:
+        """
+        Start the next lap now, leaving out the time since the previous lap, such as time spent by the caller
+        """
+        self._lap_start = time.perf_counter()
+
+    def count(self, name: str, number: int = 1) -> None:
+        self.counters[name] += number
+
+    def count_calls(self, target: Any, names: Iterable[str]) -> Any:
+        """
+        Count calls of methods of a class or object
+        :param target: a class, whose classmethods are counted, or an object whose methods are counted
+        :param names: names of the methods to count
+        :return: for a class, a subclass counting the calls, so calls between the methods are counted too.
+            An object is modified in place and returned
+        """
+        def counted(func, name):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                self.calls[name] += 1
+                return func(*args, **kwargs)
+            return wrapper
+
+        if isinstance(target, type):
+            methods = {name: classmethod(counted(getattr(target, name).__func__, name)) for name in names}
+            return type(f"Profiled{target.__name__}", (target,), methods)
+        for name in names:
+            setattr(target, name, counted(getattr(target, name), name))
+        return target
+
+    def get_summary(self) -> Dict[str, Any]:
+        """
+        :return: every measurement as json compatible values
+        """
+        return {
+            'wall_time': self.wall_time,
+            'timers': dict(self.timers),
+            'calls': dict(self.calls),
+            'counters': dict(self.counters),
+            'peak_memory': self.peak_memory,
+        }
+
+    def __str__(self) -> str:
+        lines = [f"wall time {self.wall_time * 1000:.2f} ms"]
+        for phase, seconds in sorted(self.timers.items(), key=lambda item: -item[1]):
+            share = seconds / self.wall_time if self.wall_time else 0
+            lines.append(f"  {phase:36s} {seconds * 1000:10.2f} ms {share:6.1%}")
+        for name, number in sorted(self.calls.items()):
+            lines.append(f"  {name + ' calls':36s} {number:10d}")
+        for name, number in sorted(self.counters.items()):
+            lines.append(f"  {name:36s} {number:10d}")
+        if self.peak_memory is not None:
+            lines.append(f"  {'peak memory':36s} {self.peak_memory / 2 ** 20:10.2f} MiB")
+        return '\n'.join(lines)
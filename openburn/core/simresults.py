@@ -0,0 +1,328 @@
+import json
+import struct
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from openburn.core.motor import OpenBurnMotor
+
+# binary results files, see SimResults.save
+RESULTS_MAGIC = b'OBRESULT'
+RESULTS_FORMAT_VERSION = 1  # bump when the file layout changes
+RESULTS_EXTENSION = '.obr'
+RESULTS_ALIGNMENT = 64  # column data starts at a multiple of this many bytes, so it can be memory mapped
+RESULTS_DTYPE = np.dtype('<f8')
+
+
+def integrate_trapezoid(values: np.ndarray, time: np.ndarray) -> float:
+    """
+    :return: integral of the values over time with the trapezoidal rule, 0 for fewer than two points
+    """
+    return float(np.dot((values[1:] + values[:-1]) / 2, np.diff(time)))
+
+
+class SimDataPoint:
+    """Simulation data at a given discrete time step.
+    Only scalar state is recorded. motor holds a copy of the regressed motor if a snapshot
+    was requested for this step (see SimSettings), otherwise it is None"""
+    __slots__ = ('motor', 'pressure', 'mass_flux', 'thrust', 'isp', 'kn', 'burn_rate', 'time_stamp')
+
+    def __init__(self):
+        self.motor: OpenBurnMotor = None
+        self.pressure: float = 0
+        self.mass_flux: float = 0
+        self.thrust: float = 0
+        self.isp: float = 0
+        self.kn: float = 0
+
+        self.burn_rate: float = 0
+        self.time_stamp: float = 0
+
+
+class SimResults:
+    """The results of running an InternalBallisticsSim.
+    Data is stored column-wise, with one read-only numpy array per quantity, indexed by time step:
+        time:       time stamp of the step, in seconds
+        pressure:   chamber pressure, in psi
+        thrust:     thrust, in lbs
+        isp:        specific impulse, in seconds
+        kn:         ratio of burning area to throat area, dimensionless
+        mass_flux:  mass flux at the aft end of the propellant, in lb/sec/in^2
+        burn_rate:  burn rate of the aft grain, in inches/second
+    Summary statistics are computed once, on first request.
+    """
+    COLUMNS = ('time', 'pressure', 'thrust', 'isp', 'kn', 'mass_flux', 'burn_rate')
+    SUMMARY_METRICS = ('burn_time', 'total_impulse', 'max_pressure', 'max_thrust', 'avg_thrust',
+                       'max_isp', 'avg_isp', 'max_mass_flux', 'min_kn', 'max_kn')
+
+    def __init__(self, columns: Dict[str, np.ndarray], burn_time: float, total_impulse: float,
+                 snapshots: Dict[int, OpenBurnMotor] = None):
+        """
+        :param columns: dict of column name : array of values, see COLUMNS. All arrays must be the same length
+        :param burn_time: total burn time, in seconds
+        :param total_impulse: total impulse, in lb-sec
+        :param snapshots: dict of time step index : copy of the regressed motor at that step
+        """
+        self.time: np.ndarray = None
+        self.pressure: np.ndarray = None
+        self.thrust: np.ndarray = None
+        self.isp: np.ndarray = None
+        self.kn: np.ndarray = None
+        self.mass_flux: np.ndarray = None
+        self.burn_rate: np.ndarray = None
+        for name in self.COLUMNS:
+            column = np.asarray(columns[name], dtype=float)
+            column.flags.writeable = False  # views are shared between results, and statistics are cached
+            setattr(self, name, column)
+
+        self.burn_time = burn_time
+        self.total_impulse = total_impulse
+        self.snapshots: Dict[int, OpenBurnMotor] = snapshots if snapshots is not None else {}
+        self.profile: "SimProfile" = None     # measurements of the run, if it was profiled
+
+        self._stats: Dict[str, float] = {}
+
+    @classmethod
+    def from_data_points(cls, data_points: List[SimDataPoint], burn_time: float,
+                         total_impulse: float) -> "SimResults":
+        """
+        factory method to create results from a list of SimDataPoint
+        """
+        builder = SimResultsBuilder()
+        for point in data_points:
+            builder.append(point)
+        return builder.build(burn_time, total_impulse)
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    @property
+    def data(self) -> List[SimDataPoint]:
+        """
+        Row-wise view of the results, built on every access.
+        Prefer using the column arrays directly.
+        """
+        data = []
+        for i in range(len(self)):
+            point = SimDataPoint()
+            point.time_stamp = float(self.time[i])
+            point.pressure = float(self.pressure[i])
+            point.thrust = float(self.thrust[i])
+            point.isp = float(self.isp[i])
+            point.kn = float(self.kn[i])
+            point.mass_flux = float(self.mass_flux[i])
+            point.burn_rate = float(self.burn_rate[i])
+            point.motor = self.snapshots.get(i)
+            data.append(point)
+        return data
+
+    def _cached(self, key: str, func: Callable[[], float]) -> float:
+        """Memoize a summary statistic. Every statistic of empty results is 0"""
+        if len(self) == 0:
+            return 0.0
+        try:
+            return self._stats[key]
+        except KeyError:
+            value = self._stats[key] = float(func())
+            return value
+
+    def get_burn_time(self):
+        return self.burn_time
+
+    def get_total_impulse(self):
+        return self.total_impulse
+
+    def get_max_presure(self):
+        return self._cached('max_pressure', self.pressure.max)
+
+    def get_max_thrust(self):
+        return self._cached('max_thrust', self.thrust.max)
+
+    def get_max_isp(self):
+        return self._cached('max_isp', self.isp.max)
+
+    def get_max_mass_flux(self):
+        return self._cached('max_mass_flux', self.mass_flux.max)
+
+    def get_avg_thrust(self):
+        return self._cached('avg_thrust', lambda: self._time_average(self.thrust))
+
+    def get_avg_isp(self):
+        return self._cached('avg_isp', lambda: self._time_average(self.isp))
+
+    def get_kn_range(self):
+        """Returns a tuple of the kn range (min, max)"""
+        return self._cached('min_kn', self.kn.min), self._cached('max_kn', self.kn.max)
+
+    def get_summary(self) -> Dict[str, float]:
+        """
+        :return: dict of the summary metrics of the run, see SUMMARY_METRICS
+        """
+        min_kn, max_kn = self.get_kn_range()
+        return {
+            'burn_time': self.get_burn_time(),
+            'total_impulse': self.get_total_impulse(),
+            'max_pressure': self.get_max_presure(),
+            'max_thrust': self.get_max_thrust(),
+            'avg_thrust': self.get_avg_thrust(),
+            'max_isp': self.get_max_isp(),
+            'avg_isp': self.get_avg_isp(),
+            'max_mass_flux': self.get_max_mass_flux(),
+            'min_kn': min_kn,
+            'max_kn': max_kn,
+        }
+
+    def _time_average(self, column: np.ndarray) -> float:
+        """Average of a column, weighted by the length of each time step"""
+        time_steps = self.get_time_steps()
+        if time_steps.sum() <= 0:
+            return column.mean()
+        return np.average(column, weights=time_steps)
+
+    def get_time_steps(self) -> np.ndarray:
+        """
+        :return: length of time each data point covers, in seconds.
+            The last data point covers the rest of the burn time
+        """
+        if len(self) == 0:
+            return np.zeros(0)
+        return np.diff(self.time, append=self.time[0] + self.burn_time)
+
+    def save(self, filename: str) -> None:
+        """
+        Saves the columns to a compact binary file. Snapshots are not saved.
+        The file is a small json header, holding the burn time, total impulse and summary metrics, followed by
+        each column as raw little endian float64. See load and read_header
+        :param filename: file to write
+        """
+        header = {
+            'version': RESULTS_FORMAT_VERSION,
+            'length': len(self),
+            'columns': list(self.COLUMNS),
+            'burn_time': float(self.burn_time),
+            'total_impulse': float(self.total_impulse),
+            'summary': self.get_summary() if len(self) else {},
+        }
+        header = json.dumps(header).encode()
+        prefix = len(RESULTS_MAGIC) + 4
+        header += b' ' * (-(prefix + len(header)) % RESULTS_ALIGNMENT)
+
+        with open(filename, 'wb') as f:
+            f.write(RESULTS_MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for name in self.COLUMNS:
+                f.write(np.ascontiguousarray(getattr(self, name), dtype=RESULTS_DTYPE).tobytes())
+
+    @classmethod
+    def read_header(cls, filename: str) -> Dict:
+        """
+        Reads only the header of a results file, so scanning many files is cheap
+        :param filename: a file written by save
+        :return: dict of 'version', 'length', 'columns', 'burn_time', 'total_impulse' and 'summary',
+            a dict of summary metrics, see SUMMARY_METRICS. Also 'offset', where the column data starts
+        :raises ValueError: if the file is not a results file, or has an unsupported version
+        """
+        with open(filename, 'rb') as f:
+            magic = f.read(len(RESULTS_MAGIC))
+            size = f.read(4)
+            if magic != RESULTS_MAGIC or len(size) != 4:
+                raise ValueError(f"{filename} is not an OpenBurn results file")
+            size, = struct.unpack('<I', size)
+            header = json.loads(f.read(size))
+        if header.get('version') != RESULTS_FORMAT_VERSION:
+            raise ValueError(f"{filename} has unsupported results format version {header.get('version')}")
+        header['offset'] = len(RESULTS_MAGIC) + 4 + size
+        return header
+
+    @classmethod
+    def load(cls, filename: str, mmap: bool = True) -> "SimResults":
+        """
+        Loads results written by save
+        :param filename: file to read
+        :param mmap: if true, the columns are memory mapped and only read from disk when they are used.
+            Summary metrics come from the header, so they never read the columns
+        :raises ValueError: if the file is not a results file, or is truncated
+        """
+        header = cls.read_header(filename)
+        length = header['length']
+        names = header['columns']
+        shape = (len(names), length)
+        if length == 0:
+            data = np.zeros(shape)
+        elif mmap:
+            data = np.memmap(filename, dtype=RESULTS_DTYPE, mode='r', offset=header['offset'], shape=shape)
+        else:
+            with open(filename, 'rb') as f:
+                f.seek(header['offset'])
+                data = np.fromfile(f, dtype=RESULTS_DTYPE, count=shape[0] * shape[1])
+            if data.size != shape[0] * shape[1]:
+                raise ValueError(f"{filename} is truncated")
+            data = data.reshape(shape)
+
+        results = cls(dict(zip(names, data)), header['burn_time'], header['total_impulse'])
+        results._stats.update(header['summary'])
+        return results
+
+    def slice_time(self, start: float, end: float) -> "SimResults":
+        """
+        Get the results within a time window, without copying any data.
+        :param start: start of the window, in seconds
+        :param end: end of the window, in seconds
+        :return: SimResults whose columns are views into this object's columns.
+            burn time and total impulse cover only the window, up to the first data point after it.
+            Impulse is integrated with the trapezoidal rule, like the adaptive and web engines do, so windows
+            that tile the whole burn add up to the total impulse of those engines
+        """
+        first, last = np.searchsorted(self.time, [start, end], side='left')
+        window = slice(first, last)
+
+        columns = {name: getattr(self, name)[window] for name in self.COLUMNS}
+        snapshots = {i - first: motor for i, motor in self.snapshots.items() if first <= i < last}
+        burn_time = total_impulse = 0.0
+        if last > first:
+            # the window ends at the next data point, or at the end of the burn
+            time = self.time[first:last + 1]
+            thrust = self.thrust[first:last + 1]
+            if last == len(self):
+                time = np.append(time, self.time[0] + self.burn_time)
+                thrust = np.append(thrust, thrust[-1])
+            burn_time = float(time[-1] - time[0])
+            total_impulse = integrate_trapezoid(thrust, time)
+        return SimResults(columns, burn_time=burn_time, total_impulse=total_impulse, snapshots=snapshots)
+
+
+class SimResultsBuilder:
+    """Accumulates data points from a running simulation, then packs them into a columnar SimResults"""
+    def __init__(self):
+        self.columns: Dict[str, List[float]] = {name: [] for name in SimResults.COLUMNS}
+        self.snapshots: Dict[int, OpenBurnMotor] = {}
+
+    def __len__(self) -> int:
+        return len(self.columns['time'])
+
+    def append(self, point: SimDataPoint) -> None:
+        """
+        Add a time step's data. The point's scalars are copied out, so it may be reused by the caller
+        :param point: data for the next time step
+        """
+        if point.motor is not None:
+            self.snapshots[len(self)] = point.motor
+
+        columns = self.columns
+        columns['time'].append(point.time_stamp)
+        columns['pressure'].append(point.pressure)
+        columns['thrust'].append(point.thrust)
+        columns['isp'].append(point.isp)
+        columns['kn'].append(point.kn)
+        columns['mass_flux'].append(point.mass_flux)
+        columns['burn_rate'].append(point.burn_rate)
+
+    def build(self, burn_time: float, total_impulse: float) -> SimResults:
+        """
+        :param burn_time: total burn time, in seconds
+        :param total_impulse: total impulse, in lb-sec
+        :return: the packed results
+        """
+        columns = {name: np.array(values, dtype=float) for name, values in self.columns.items()}
+        return SimResults(columns, burn_time=burn_time, total_impulse=total_impulse, snapshots=self.snapshots)
@@ -1,50 +1,115 @@
 import uuid
-import jsonpickle
 from copy import deepcopy
+from typing import Tuple
 
-from qtpy.QtCore import QObject
+# values that are never copied, since they can't be modified
+_IMMUTABLE_TYPES = (int, float, bool, str, type(None), uuid.UUID)
 
 
-class OpenBurnObject(QObject):
+class OpenBurnObject:
     """Base class of all OpenBurn motor objects.
-    Handles json serialization and deserialization as well as uuid creation"""
+    Handles json serialization and deserialization as well as uuid creation.
+
+    Motor objects are plain python objects that do not depend on Qt. Every subclass declares its
+    attributes in __slots__, which keeps objects small and makes copying cheap.
+    Slots starting with an underscore hold derived, cached data. They are not serialized, and copies
+    share the cached values instead of copying them.
+    An object that is part of another, such as a motor's grain, notifies its parent whenever one of its
+    attributes is set, so the parent can drop data derived from it, see set_parent. Copies have no parent.
+    See openburn.application.motor_model for the Qt adapter used by the UI."""
+    __slots__ = ('uuid', '_parent')
+
     def __init__(self):
-        super(OpenBurnObject, self).__init__()
         self.uuid = uuid.uuid4()
 
+    @classmethod
+    def get_slots(cls) -> Tuple[str, ...]:
+        """
+        :return: names of every attribute declared in __slots__ by this class and its bases
+        """
+        slots = cls.__dict__.get('_all_slots')
+        if slots is None:
+            slots = tuple(name for klass in reversed(cls.__mro__)
+                          for name in klass.__dict__.get('__slots__', ()))
+            cls._all_slots = slots
+        return slots
+
+    def __setattr__(self, key: str, value) -> None:
+        object.__setattr__(self, key, value)
+        if key[0] != '_':   # setting derived data doesn't change the object
+            parent = getattr(self, '_parent', None)
+            if parent is not None:
+                parent._child_changed(self)
+
+    def set_parent(self, parent: 'OpenBurnObject' or None) -> None:
+        """
+        :param parent: the object this one is part of. Its _child_changed is called whenever an attribute of
+            this object is set. An object has a single parent, the last one set
+        """
+        object.__setattr__(self, '_parent', parent)  # set for every part of every copy, so skip the check
+
+    def _child_changed(self, child: 'OpenBurnObject') -> None:
+        """
+        Called after an attribute of a child object is set, see set_parent
+        """
+
+    def copy(self) -> 'OpenBurnObject':
+        """
+        :return: a deep copy of this object
+        """
+        return deepcopy(self)
+
     def __deepcopy__(self, memo):
         cls = self.__class__
         result = cls.__new__(cls)
         memo[id(self)] = result
-        for key, value in self.__dict__.items():
-            setattr(result, key, deepcopy(value, memo))
+        for key in self.get_slots():
+            try:
+                value = getattr(self, key)
+            except AttributeError:
+                continue    # slot was never set
+            if type(value) not in _IMMUTABLE_TYPES and not key.startswith('_'):
+                value = deepcopy(value, memo)
+            object.__setattr__(result, key, value)  # the copy has no parent to notify yet
+        # a copy isn't part of the original's parent. A parent being copied adopts the copies of its parts
+        object.__setattr__(result, '_parent', None)
         return result
 
     # we don't want UUID to be saved across sessions, so we implement pickle's __getstate__ and __setstate__
     # and remove 'uuid' from the dict
     def __getstate__(self):
-        state = self.__dict__.copy()
-        del state['uuid']   # ignore uuid
+        state = {}
+        for key in self.get_slots():
+            if key != 'uuid' and not key.startswith('_') and hasattr(self, key):
+                state[key] = getattr(self, key)
         return state
 
     def __setstate__(self, state):
-        self.__dict__.update(state)
+        slots = self.get_slots()
+        for key, value in state.items():
+            if key in slots:    # ignore attributes that no longer exist
+                setattr(self, key, value)
+        self.uuid = uuid.uuid4()    # generate a new uuid
 
     @classmethod
-    def from_json(cls, data: str) -> 'cls':
+    def from_json(cls, data: str or bytes) -> 'cls':
         """
         factory method to create an object from json data
-        :param data: JSON string, encoded with jsonpickle
+        :param data: a document made by to_json or openburn.schema.dumps_binary, or json encoded with jsonpickle
+            by earlier versions
         :returns: cls()
         """
-        obj = jsonpickle.decode(data)
-        obj.uuid = uuid.uuid4()     # generate a new uuid
+        from openburn import schema
+        obj = schema.loads(data)
+        if not isinstance(obj, cls):
+            raise TypeError(f"Expected a {cls.__name__}, got a {type(obj).__name__}")
         return obj
 
-    def to_json(self) -> str:
+    def to_json(self, indent: int = None) -> str:
         """
-        recursively dumps the entire class structure into json
-        :returns JSON string, encoded with jsonpickle
+        dumps the object's params into json, see openburn.schema
+        :param indent: indent the json to make it readable. The default is compact
+        :returns JSON string
         """
-        jsonpickle.set_encoder_options('json', sort_keys=True, indent=4)
-        return jsonpickle.encode(self)
+        from openburn import schema
+        return schema.dumps(self, indent=indent)
@@ -0,0 +1,322 @@
+"""
+Versioned serialization of motor designs.
+
+Every serializable class is registered with a type name and an explicit list of fields, so files don't depend on
+module layout and only the design's params are saved. A document looks like:
+    {"format": "openburn", "version": 1, "propellants": [...], "object": {"type": "motor", ...}}
+Propellants are stored once in the "propellants" table and referenced by index, so grains that share a propellant
+still share it after loading. Derived values, such as the motor's average propellant, are recalculated on load.
+
+Documents saved by older versions of the schema are upgraded by the registered migrations, see register_migration.
+The binary form is the same document, deflate compressed. Files written by jsonpickle, as earlier versions of
+OpenBurn did, are still read, see decode_legacy.
+"""
+import json
+import uuid
+import zlib
+from typing import Any, Callable, Dict, List, Tuple
+
+from openburn.core.grain import CylindricalCoreGrain, PortGeometryGrain
+from openburn.core.motor import OpenBurnMotor
+from openburn.core.nozzle import ConicalNozzle
+from openburn.core.portgeometry import make_port
+from openburn.core.propellant import OpenBurnPropellant, SimplePropellant, AdvancedPropellant
+from openburn.object import OpenBurnObject
+
+SCHEMA_VERSION = 1  # bump when the document layout changes, and register a migration from the previous version
+SCHEMA_FORMAT = 'openburn'
+BINARY_MAGIC = b'OBZ\x01'
+BINARY_COMPRESSION = 6  # zlib level, a good balance of size and speed for small documents
+
+# kinds of field
+VALUE = 'value'     # a json value
+OBJECT = 'object'   # a registered object, stored inline
+OBJECTS = 'objects'     # a list of registered objects
+PROPELLANT = 'propellant'   # a propellant, stored in the propellants table
+PORT = 'port'   # a port shape, see openburn.core.portgeometry
+
+Field = Tuple[str, str]     # (attribute name, kind)
+
+
+class SchemaType:
+    """How a class is serialized"""
+    def __init__(self, name: str, cls: type, fields: Tuple[Field, ...], defaults: Dict[str, Any] = None,
+                 after_decode: Callable[[Any], None] = None):
+        """
+        :param name: the type name saved in documents
+        :param cls: the class
+        :param fields: (attribute name, kind) of every saved attribute
+        :param defaults: values of attributes that are not saved, or missing from the document
+        :param after_decode: optional function called with each decoded object, to recalculate derived values
+        """
+        self.name = name
+        self.cls = cls
+        self.fields = fields
+        self.defaults = defaults or {}
+        self.after_decode = after_decode
+
+
+_types_by_name: Dict[str, SchemaType] = {}
+_types_by_class: Dict[type, SchemaType] = {}
+_migrations: Dict[int, Callable[[Dict], Dict]] = {}
+
+
+def register_type(schema_type: SchemaType) -> None:
+    _types_by_name[schema_type.name] = schema_type
+    _types_by_class[schema_type.cls] = schema_type
+
+
+def register_migration(from_version: int) -> Callable:
+    """
+    Decorator registering a function that upgrades a document from a schema version to the next one.
+    The function takes and returns the document dict
+    """
+    def decorator(func: Callable[[Dict], Dict]) -> Callable[[Dict], Dict]:
+        _migrations[from_version] = func
+        return func
+    return decorator
+
+
+def _get_type(cls: type) -> SchemaType:
+    try:
+        return _types_by_class[cls]
+    except KeyError:
+        raise TypeError(f"{cls.__name__} can't be serialized, it has no registered schema type")
+
+
+class _Encoder:
+    def __init__(self):
+        self.propellants: List[Dict] = []
+        self.propellant_index: Dict[int, int] = {}  # id of propellant : index in propellants
+
+    def encode_object(self, obj: OpenBurnObject) -> Dict or None:
+        if obj is None:
+            return None
+        schema_type = _get_type(type(obj))
+        data = {'type': schema_type.name}
+        for name, kind in schema_type.fields:
+            value = getattr(obj, name, None)
+            if kind == VALUE:
+                data[name] = value
+            elif kind == OBJECT:
+                data[name] = self.encode_object(value)
+            elif kind == OBJECTS:
+                data[name] = [self.encode_object(item) for item in value]
+            elif kind == PROPELLANT:
+                data[name] = self.encode_propellant(value)
+            elif kind == PORT:
+                data[name] = [[list(point) for point in polygon] for polygon in value]
+        return data
+
+    def encode_propellant(self, propellant: OpenBurnPropellant) -> int or None:
+        if propellant is None:
+            return None
+        index = self.propellant_index.get(id(propellant))
+        if index is None:
+            index = self.propellant_index[id(propellant)] = len(self.propellants)
+            self.propellants.append(self.encode_object(propellant))
+        return index
+
+
+class _Decoder:
+    def __init__(self, propellants: List[Dict]):
+        self.propellant_data = propellants
+        self.propellants: Dict[int, OpenBurnPropellant] = {}
+
+    def decode_object(self, data: Dict) -> OpenBurnObject or None:
+        if data is None:
+            return None
+        try:
+            schema_type = _types_by_name[data['type']]
+        except KeyError:
+            raise ValueError(f"Unknown object type {data.get('type')!r}")
+
+        # the object is new, so its attributes are set without notifying a parent, see OpenBurnObject.set_parent
+        obj = schema_type.cls.__new__(schema_type.cls)
+        object.__setattr__(obj, 'uuid', uuid.uuid4())
+        for name, value in schema_type.defaults.items():
+            object.__setattr__(obj, name, value)
+        for name, kind in schema_type.fields:
+            if name not in data:
+                if name in schema_type.defaults:
+                    continue
+                raise ValueError(f"{schema_type.name} is missing '{name}'")
+            value = data[name]
+            if kind == OBJECT:
+                value = self.decode_object(value)
+            elif kind == OBJECTS:
+                value = [self.decode_object(item) for item in value]
+            elif kind == PROPELLANT:
+                value = self.decode_propellant(value)
+            elif kind == PORT:
+                value = make_port(value)
+            object.__setattr__(obj, name, value)
+
+        if schema_type.after_decode is not None:
+            schema_type.after_decode(obj)
+        return obj
+
+    def decode_propellant(self, index: int) -> OpenBurnPropellant or None:
+        if index is None:
+            return None
+        propellant = self.propellants.get(index)
+        if propellant is None:
+            try:
+                data = self.propellant_data[index]
+            except (IndexError, TypeError):
+                raise ValueError(f"Propellant {index!r} is not in the propellant table")
+            propellant = self.propellants[index] = self.decode_object(data)
+        return propellant
+
+
+def encode(obj: OpenBurnObject) -> Dict:
+    """
+    :param obj: a motor, grain, nozzle or propellant
+    :return: the document, a dict of json values
+    """
+    encoder = _Encoder()
+    data = encoder.encode_object(obj)
+    return {'format': SCHEMA_FORMAT, 'version': SCHEMA_VERSION, 'propellants': encoder.propellants, 'object': data}
+
+
+def decode(document: Dict) -> OpenBurnObject:
+    """
+    :param document: a document made by encode, by any version of the schema
+    :return: the decoded object. Objects get new uuids
+    :raises ValueError: if the document is not valid, or was made by a newer version of OpenBurn
+    """
+    if not isinstance(document, dict) or document.get('format') != SCHEMA_FORMAT:
+        raise ValueError("Not an OpenBurn document")
+    version = document.get('version')
+    if not isinstance(version, int) or version > SCHEMA_VERSION:
+        raise ValueError(f"Document version {version!r} is not supported by this version of OpenBurn")
+    while version < SCHEMA_VERSION:
+        if version not in _migrations:
+            raise ValueError(f"No migration from document version {version}")
+        document = _migrations[version](document)
+        version += 1
+    return _Decoder(document.get('propellants', [])).decode_object(document['object'])
+
+
+def dumps(obj: OpenBurnObject, indent: int = None) -> str:
+    """
+    :param obj: a motor, grain, nozzle or propellant
+    :param indent: indent json to make it readable. The default is compact
+    :return: the json document
+    """
+    separators = (',', ':') if indent is None else (',', ': ')
+    return json.dumps(encode(obj), indent=indent, separators=separators)
+
+
+def dumps_binary(obj: OpenBurnObject) -> bytes:
+    """
+    :param obj: a motor, grain, nozzle or propellant
+    :return: the compact binary document
+    """
+    return BINARY_MAGIC + zlib.compress(dumps(obj).encode(), BINARY_COMPRESSION)
+
+
+def loads(data: str or bytes) -> OpenBurnObject:
+    """
+    Loads a document made by dumps or dumps_binary, or a design saved with jsonpickle by earlier versions
+    :param data: the document
+    :raises ValueError: if the data is not a valid document
+    """
+    if isinstance(data, bytes):
+        if data.startswith(BINARY_MAGIC):
+            try:
+                data = zlib.decompress(data[len(BINARY_MAGIC):])
+            except zlib.error as e:
+                raise ValueError(f"Corrupt binary document: {e}")
+        data = data.decode()
+    document = json.loads(data)
+    if isinstance(document, dict) and 'py/object' in document:
+        return decode_legacy(document)
+    return decode(document)
+
+
+def decode_legacy(data: Any) -> Any:
+    """
+    Decodes json data written by jsonpickle. Only registered classes are created, no modules are imported.
+    jsonpickle numbers the objects it has seen in the order it encodes them, which is the order of each
+    object's slots, and refers back to them with 'py/id'. The keys of the file are sorted, so objects are
+    visited in slot order here to resolve the references the way they were written.
+    :param data: the parsed json
+    :return: the decoded data, with objects created from their schema types
+    """
+    types_by_class_name = {schema_type.cls.__name__: schema_type for schema_type in _types_by_name.values()}
+    seen: List[Any] = []
+    decoded: List[OpenBurnObject] = []
+
+    def restore(value: Any) -> Any:
+        if isinstance(value, list):
+            seen.append(value)
+            return [restore(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+        if 'py/id' in value:
+            try:
+                return seen[value['py/id']]
+            except (IndexError, TypeError):
+                raise ValueError(f"Invalid reference {value['py/id']!r}")
+        if 'py/tuple' in value:
+            return tuple(restore(item) for item in value['py/tuple'])
+        if 'py/object' not in value:
+            seen.append(value)
+            return {key: restore(item) for key, item in value.items()}
+
+        class_name = value['py/object'].rpartition('.')[2]
+        schema_type = types_by_class_name.get(class_name)
+        if schema_type is None:
+            raise ValueError(f"Unknown object type {value['py/object']!r}")
+        obj = schema_type.cls.__new__(schema_type.cls)
+        obj.uuid = uuid.uuid4()
+        seen.append(obj)
+        if 'py/state' in value:
+            state = value['py/state']
+            seen.append(state)
+        else:
+            state = {key: item for key, item in value.items() if not key.startswith('py/')}
+
+        for name, item in schema_type.defaults.items():
+            setattr(obj, name, item)
+        slots = obj.get_slots()
+        for key in sorted(state, key=lambda key: slots.index(key) if key in slots else len(slots)):
+            item = restore(state[key])
+            if key in slots and not key.startswith('_') and key != 'uuid':
+                setattr(obj, key, item)
+        decoded.append(obj)
+        return obj
+
+    result = restore(data)
+    for obj in decoded:
+        schema_type = _types_by_class[type(obj)]
+        for name, kind in schema_type.fields:
+            if kind == PORT and hasattr(obj, name):
+                setattr(obj, name, make_port(getattr(obj, name)))
+        if schema_type.after_decode is not None:
+            schema_type.after_decode(obj)
+    return result
+
+
+def _update_motor(motor: OpenBurnMotor) -> None:
+    if motor.grains:
+        motor.set_grains(motor.grains)  # recalculates the average propellant
+    motor.set_nozzle(motor.nozzle)  # makes the motor the parent of its parts
+
+
+register_type(SchemaType('motor', OpenBurnMotor, (('grains', OBJECTS), ('nozzle', OBJECT)),
+                         defaults={'avg_propellant': None, '_properties': None}, after_decode=_update_motor))
+register_type(SchemaType('cylindrical_core_grain', CylindricalCoreGrain,
+                         (('diameter', VALUE), ('length', VALUE), ('burning_faces', VALUE),
+                          ('core_diameter', VALUE), ('propellant', PROPELLANT)),
+                         defaults={'burn_rate': 0}))
+register_type(SchemaType('port_geometry_grain', PortGeometryGrain,
+                         (('diameter', VALUE), ('length', VALUE), ('burning_faces', VALUE), ('port', PORT),
+                          ('resolution', VALUE), ('web_burned', VALUE), ('propellant', PROPELLANT)),
+                         defaults={'burn_rate': 0, 'web_burned': 0}))
+register_type(SchemaType('conical_nozzle', ConicalNozzle,
+                         (('throat_dia', VALUE), ('exit_dia', VALUE), ('half_angle', VALUE), ('throat_len', VALUE))))
+for _name, _cls in (('simple_propellant', SimplePropellant), ('advanced_propellant', AdvancedPropellant)):
+    register_type(SchemaType(_name, _cls, (('name', VALUE), ('a', VALUE), ('n', VALUE), ('cstar', VALUE),
+                                           ('rho', VALUE), ('gamma', VALUE))))
@@ -2,7 +2,7 @@ from qtpy.QtWidgets import (QDialog, QGroupBox, QGridLayout, QHBoxLayout, QVBoxL
                             QComboBox, QLabel, QPushButton)
 from qtpy.QtGui import QIcon
 
-from openburn.application import app_context
+from openburn.application import get_app_context
 from openburn import RESOURCE_PATH
 
 
@@ -29,7 +29,7 @@ class NewGrainDialog(QDialog):
         controls.addWidget(self.cb_grain_type, 0, 1)
 
         self.cb_propellant_type = QComboBox()
-        self.cb_propellant_type.addItems(app_context.propellant_db.propellant_names())
+        self.cb_propellant_type.addItems(get_app_context().propellant_db.propellant_names())
         controls.addWidget(QLabel(self.tr("Propellant Type")), 1, 0)
         controls.addWidget(self.cb_propellant_type, 1, 1)
 
@@ -6,6 +6,7 @@ from qtpy.QtGui import QIcon
 from openburn import RESOURCE_PATH
 from openburn.ui.dialogs.about import AboutDialog
 from openburn.ui.designtab import DesignTab
+from openburn.ui.simtab import SimulationTab
 
 
 class MainWindow(QMainWindow):
@@ -82,7 +83,7 @@ class MainWindow(QMainWindow):
         """setup the tab widget UI"""
         self.tab_widget = QTabWidget()
         self.tab_widget.addTab(DesignTab(), "Design")
-        self.tab_widget.addTab(QWidget(), "Simulation")
+        self.tab_widget.addTab(SimulationTab(), "Simulation")
         self.tab_widget.addTab(QWidget(), "Propellants")
 
         self.layout = QVBoxLayout()
@@ -0,0 +1,112 @@
+from qtpy.QtWidgets import (QVBoxLayout, QHBoxLayout, QFormLayout,
+                            QWidget, QGroupBox, QLabel, QPushButton, QProgressBar)
+
+from qtpy.QtCore import Slot
+
+from openburn.application import get_app_context
+
+
+class SimulationTab(QWidget):
+    """Runs simulations of the current design in the background and shows their results.
+    Partial results are shown while a simulation runs"""
+    # SimResults.SUMMARY_METRICS, in order : label, format. Listed here so importing the UI doesn't load the simulator
+    METRIC_LABELS = {
+        'burn_time': ("Burn Time:", "{:.3f} s"),
+        'total_impulse': ("Total Impulse:", "{:.1f} lb-s"),
+        'max_pressure': ("Max Pressure:", "{:.1f} psi"),
+        'max_thrust': ("Max Thrust:", "{:.1f} lbf"),
+        'avg_thrust': ("Average Thrust:", "{:.1f} lbf"),
+        'max_isp': ("Max Isp:", "{:.1f} s"),
+        'avg_isp': ("Average Isp:", "{:.1f} s"),
+        'max_mass_flux': ("Max Mass Flux:", "{:.3f} lb/s/in^2"),
+        'min_kn': ("Min Kn:", "{:.1f}"),
+        'max_kn': ("Max Kn:", "{:.1f}"),
+    }
+
+    def __init__(self):
+        super(SimulationTab, self).__init__()
+        self.setup_ui()
+
+        self.app = get_app_context()
+        runner = self.app.sim_runner
+        runner.started.connect(self.on_started)
+        runner.progress.connect(self.on_progress)
+        runner.finished.connect(self.on_finished)
+        runner.failed.connect(self.on_failed)
+        runner.cancelled.connect(self.on_cancelled)
+        self.btn_run.clicked.connect(self.app.simulate)
+        self.btn_cancel.clicked.connect(runner.cancel)
+
+    def setup_ui(self):
+        def setup_controls():
+            controls = QHBoxLayout()
+            self.btn_run = QPushButton(self.tr("Simulate"))
+            self.btn_run.setMinimumHeight(50)
+            controls.addWidget(self.btn_run)
+            self.btn_cancel = QPushButton(self.tr("Cancel"))
+            self.btn_cancel.setMinimumHeight(50)
+            self.btn_cancel.setEnabled(False)
+            controls.addWidget(self.btn_cancel)
+
+            # the burn time isn't known until the simulation ends, so the bar only shows that it is busy
+            self.progress_bar = QProgressBar()
+            self.progress_bar.setRange(0, 1)
+            controls.addWidget(self.progress_bar)
+            self.lbl_status = QLabel(self.tr("Ready"))
+            controls.addWidget(self.lbl_status)
+            controls.addStretch()
+            return controls
+
+        def setup_results():
+            fl_results = QFormLayout()
+            self.gb_results = QGroupBox(self.tr("Simulation Results"))
+            self.gb_results.setLayout(fl_results)
+
+            self.metric_labels = {}
+            for metric, (name, _) in self.METRIC_LABELS.items():
+                label = QLabel()
+                fl_results.addRow(QLabel(self.tr(name)), label)
+                self.metric_labels[metric] = label
+
+        setup_results()
+        layout = QVBoxLayout()
+        layout.addLayout(setup_controls())
+        layout.addWidget(self.gb_results)
+        layout.addStretch()
+        self.setLayout(layout)
+
+    def set_running(self, running: bool):
+        self.btn_cancel.setEnabled(running)
+        self.progress_bar.setRange(0, 0 if running else 1)
+
+    def show_results(self, results: "SimResults" or None):
+        summary = results.get_summary() if results is not None and len(results.time) > 0 else {}
+        for metric, label in self.metric_labels.items():
+            value = summary.get(metric)
+            label.setText("" if value is None else self.METRIC_LABELS[metric][1].format(value))
+
+    @Slot(int)
+    def on_started(self, run_id: int):
+        self.set_running(True)
+        self.lbl_status.setText(self.tr("Simulating..."))
+
+    @Slot(int, object)
+    def on_progress(self, run_id: int, results: "SimResults"):
+        self.show_results(results)
+        self.lbl_status.setText(self.tr("Simulating... {:.2f} s").format(results.get_burn_time()))
+
+    @Slot(int, object)
+    def on_finished(self, run_id: int, results: "SimResults"):
+        self.set_running(False)
+        self.show_results(results)
+        self.lbl_status.setText(self.tr("Done"))
+
+    @Slot(int, str)
+    def on_failed(self, run_id: int, message: str):
+        self.set_running(False)
+        self.lbl_status.setText(self.tr("Failed: {}").format(message))
+
+    @Slot(int)
+    def on_cancelled(self, run_id: int):
+        self.set_running(False)
+        self.lbl_status.setText(self.tr("Cancelled"))
@@ -1,4 +0,0 @@
-from openburn.util.units import ureg
-from pint import set_application_registry
-
-set_application_registry(ureg)
\ No newline at end of file
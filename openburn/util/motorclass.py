@@ -31,3 +31,20 @@ def get_motor_class(nsec: float):
         percent = 100 * (nsec - min_ns) / min_ns
 
     return des, percent
+
+
+def get_class_impulse(des: str, percent: float) -> float:
+    """Inverse of get_motor_class
+    Returns the total newton-seconds of a motor given the class letter and percent"""
+    des = des.upper()
+    if des == 'C':
+        return 10 * percent / 100
+    if des == 'B':
+        return 5 * percent / 100
+    if des == 'A':
+        return 2.5 * percent / 100
+    if len(des) != 1 or not 'D' <= des <= 'Z':
+        raise ValueError(f"Unknown motor class '{des}'")
+
+    min_ns = 10 * 2 ** (ord(des) - ord('D'))
+    return min_ns * (1 + percent / 100)
@@ -0,0 +1,157 @@
+"""
+Thrust curve export to the RASP (.eng) and RockSim (.rse) formats read by flight simulators.
+Exporters write one line at a time to an open text file, and resample the curve to a point budget first,
+keeping the points that best preserve its shape.
+"""
+from typing import TextIO, Tuple
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+
+from openburn.core.motor import OpenBurnMotor
+from openburn.core.simresults import SimResults
+from openburn.util.motorclass import get_motor_class
+from openburn.util.units import convert_magnitude
+
+DEFAULT_MAX_POINTS = 32     # the data point limit of many RASP based simulators
+DEFAULT_MANUFACTURER = 'OpenBurn'
+
+
+def resample_thrust_curve(time: np.ndarray, thrust: np.ndarray, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Picks at most max_points samples of a curve. Starting from the end points, the sample furthest from the
+    linear interpolation of the samples picked so far is added until the budget is used up
+    :param time: time stamps, in increasing order
+    :param thrust: thrust at each time stamp
+    :param max_points: the point budget, at least 2
+    :return: tuple of the picked (time, thrust) samples, in time order
+    """
+    time = np.asarray(time, dtype=float)
+    thrust = np.asarray(thrust, dtype=float)
+    if len(time) <= max_points:
+        return time, thrust
+
+    picked = np.zeros(len(time), dtype=bool)
+    picked[[0, -1]] = True
+    for _ in range(max_points - 2):
+        indices = np.flatnonzero(picked)
+        error = np.abs(thrust - np.interp(time, time[indices], thrust[indices]))
+        furthest = int(error.argmax())
+        if error[furthest] <= 0:
+            break   # the picked samples already reproduce the curve
+        picked[furthest] = True
+    return time[picked], thrust[picked]
+
+
+def get_designation(results: SimResults) -> str:
+    """
+    :return: the motor's designation, the impulse class followed by the average thrust in newtons, e.g. 'K550'
+    """
+    impulse_class, _ = get_motor_class(convert_magnitude(results.get_total_impulse(), 'lbf', 'newton'))
+    return f"{impulse_class}{round(convert_magnitude(results.get_avg_thrust(), 'lbf', 'newton'))}"
+
+
+def _get_curve(results: SimResults, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :return: tuple of (time in seconds, thrust in newtons), resampled, starting after ignition and ending
+        with zero thrust at burnout, as both formats expect
+    """
+    during_burn = (results.time > 0) & (results.time < results.burn_time)
+    time, thrust = resample_thrust_curve(results.time[during_burn], results.thrust[during_burn], max_points - 1)
+    return (np.append(time, results.burn_time),
+            np.append(convert_magnitude(thrust, 'lbf', 'newton'), 0.0))
+
+
+def write_eng(f: TextIO, results: SimResults, motor: OpenBurnMotor, designation: str = None,
+              delays: str = 'P', hardware_mass: float = 0.0, manufacturer: str = DEFAULT_MANUFACTURER,
+              max_points: int = DEFAULT_MAX_POINTS) -> None:
+    """
+    Writes a RASP .eng thrust curve
+    :param f: text file to write to
+    :param results: the simulation results of the motor
+    :param motor: the simulated motor, for its dimensions and propellant mass
+    :param designation: the motor's name, defaults to get_designation
+    :param delays: available ejection delays in seconds, separated by dashes, or 'P' for plugged
+    :param hardware_mass: mass of the motor without propellant, in lbs
+    :param manufacturer: manufacturer name
+    :param max_points: the data point budget
+    """
+    designation = designation or get_designation(results)
+    propellant_mass = motor.get_propellant_mass()
+    f.write(f"; {designation} exported by OpenBurn\n")
+    f.write(' '.join([
+        designation.replace(' ', '_'),
+        f"{convert_magnitude(motor.get_diameter(), 'inch', 'mm'):.1f}",
+        f"{convert_magnitude(motor.get_length(), 'inch', 'mm'):.1f}",
+        delays.replace(' ', ''),
+        f"{convert_magnitude(propellant_mass, 'lb', 'kg'):.4f}",
+        f"{convert_magnitude(propellant_mass + hardware_mass, 'lb', 'kg'):.4f}",
+        manufacturer.replace(' ', '_'),
+    ]) + '\n')
+    for t, thrust in zip(*_get_curve(results, max_points)):
+        f.write(f"{t:.4f} {thrust:.3f}\n")
+    f.write(';\n')
+
+
+def write_rse(f: TextIO, results: SimResults, motor: OpenBurnMotor, designation: str = None,
+              delays: str = 'P', hardware_mass: float = 0.0, manufacturer: str = DEFAULT_MANUFACTURER,
+              max_points: int = DEFAULT_MAX_POINTS) -> None:
+    """
+    Writes a RockSim .rse engine file. The propellant mass at each data point is estimated from the fraction
+    of the total impulse delivered by then
+    :param f: text file to write to
+    :param results: the simulation results of the motor
+    :param motor: the simulated motor, for its dimensions, propellant mass and nozzle
+    :param designation: the motor's name, defaults to get_designation
+    :param delays: available ejection delays in seconds, separated by dashes, or 'P' for plugged
+    :param hardware_mass: mass of the motor without propellant, in lbs
+    :param manufacturer: manufacturer name
+    :param max_points: the data point budget
+    """
+    total_impulse = convert_magnitude(results.get_total_impulse(), 'lbf', 'newton')
+    propellant_grams = convert_magnitude(motor.get_propellant_mass(), 'lb', 'kg') * 1000
+    total_grams = propellant_grams + convert_magnitude(hardware_mass, 'lb', 'kg') * 1000
+    length = convert_magnitude(motor.get_length(), 'inch', 'mm')
+
+    def mm(inches: float) -> str:
+        return f"{convert_magnitude(inches, 'inch', 'mm'):.2f}"
+
+    attributes = {
+        'mfg': manufacturer,
+        'code': designation or get_designation(results),
+        'Type': 'reload',
+        'dia': mm(motor.get_diameter()),
+        'len': f"{length:.2f}",
+        'initWt': f"{total_grams:.2f}",
+        'propWt': f"{propellant_grams:.2f}",
+        'delays': delays,
+        'auto-calc-mass': '0',
+        'auto-calc-cg': '0',
+        'avgThrust': f"{convert_magnitude(results.get_avg_thrust(), 'lbf', 'newton'):.3f}",
+        'peakThrust': f"{convert_magnitude(results.get_max_thrust(), 'lbf', 'newton'):.3f}",
+        'throatDia': mm(motor.nozzle.throat_dia),
+        'exitDia': mm(motor.nozzle.exit_dia),
+        'Itot': f"{total_impulse:.3f}",
+        'burn-time': f"{results.get_burn_time():.4f}",
+        'massFrac': f"{100 * propellant_grams / total_grams:.2f}",
+        'Isp': f"{results.get_avg_isp():.2f}",
+    }
+    f.write('<engine-database>\n')
+    f.write(' <engine-list>\n')
+    f.write('  <engine ' + ' '.join(f"{key}={quoteattr(value)}" for key, value in attributes.items()) + '>\n')
+    f.write('   <data>\n')
+
+    # impulse delivered by each time stamp, from the full resolution curve
+    delivered = np.cumsum(results.thrust * results.get_time_steps())
+    time, thrust = _get_curve(results, max_points - 1)
+    time, thrust = np.insert(time, 0, 0.0), np.insert(thrust, 0, 0.0)
+    fraction = np.interp(time, results.time + results.get_time_steps(), delivered,
+                         left=0) / max(results.get_total_impulse(), 1e-12)
+    for t, force, burned in zip(time, thrust, np.clip(fraction, 0, 1)):
+        f.write(f'    <eng-data t="{t:.4f}" f="{force:.3f}" m="{propellant_grams * (1 - burned):.2f}" '
+                f'cg="{length / 2:.2f}"/>\n')
+
+    f.write('   </data>\n')
+    f.write('  </engine>\n')
+    f.write(' </engine-list>\n')
+    f.write('</engine-database>\n')
@@ -1,37 +1,103 @@
-from pint import UnitRegistry
+from functools import lru_cache
+from typing import Tuple
 
-# Pint's unit registry has many units, but we need to define a few ourselves.
-ureg = UnitRegistry()
+import numpy as np
 
-# for some reason slugs are not a default unit (probably because slugs are ridicules and awful )
-ureg.define('slug = lbf * s**2 / foot = slug')
+# Pint is slow to import and to build a registry, so the registry is only created when a conversion
+# that is not in PRECOMPILED_CONVERSIONS is first requested, see get_registry()
+_ureg = None
 
-# density units
-ureg.define('lb_per_cubic_inch = pounds / (inch**3) = lb_per_in3')
-ureg.define('slug_per_cubic_inch = slug / (inch**3) = slug_per_in3')
-ureg.define('kg_per_cubic_meter = kilogram / (meter**3) = kg_per_m3')
+# (from unit, to unit) : (factor, offset) of conversions used by the simulation core, so that simulating
+# never needs pint. These must match what pint calculates, see tests/test_units.py
+PRECOMPILED_CONVERSIONS = {
+    ('lb_per_in3', 'slug_per_in3'): (0.03108095017156725, 0.0),
+    ('lbf', 'newton'): (4.4482216152605, 0.0),
+    ('newton', 'lbf'): (0.22480894309971053, 0.0),
+    ('inch', 'mm'): (25.4, 0.0),
+    ('lb', 'kg'): (0.45359237, 0.0),
+    ('psi', 'MPa'): (0.0068947572931683625, 0.0),
+    ('inch', 'meter'): (0.0254, 0.0),
+    ('lb_per_sec_per_sq_in', 'kg_per_sec_per_sq_m'): (703.0695796391595, 0.0),
+}
 
-# velocity units
-ureg.define('feet_per_second = feet / second = fps')
-ureg.define('meters_per_second = meters / second = mps')
 
-# burn rate units
-ureg.define('inch_per_second = inch / second = ips')
-ureg.define('mm_per_second = mm / second = mmps')
+def get_registry() -> "pint.UnitRegistry":
+    """
+    :return: the pint unit registry, with OpenBurn's custom units defined.
+        It is created on first use and set as pint's application registry
+    """
+    global _ureg
+    if _ureg is not None:
+        return _ureg
+
+    from pint import UnitRegistry, set_application_registry
+
+    # Pint's unit registry has many units, but we need to define a few ourselves.
+    ureg = UnitRegistry()
+
+    # for some reason slugs are not a default unit (probably because slugs are ridicules and awful )
+    ureg.define('slug = lbf * s**2 / foot = slug')
+
+    # density units
+    ureg.define('lb_per_cubic_inch = pounds / (inch**3) = lb_per_in3')
+    ureg.define('slug_per_cubic_inch = slug / (inch**3) = slug_per_in3')
+    ureg.define('kg_per_cubic_meter = kilogram / (meter**3) = kg_per_m3')
+
+    # velocity units
+    ureg.define('feet_per_second = feet / second = fps')
+    ureg.define('meters_per_second = meters / second = mps')
+
+    # burn rate units
+    ureg.define('inch_per_second = inch / second = ips')
+    ureg.define('mm_per_second = mm / second = mmps')
+
+    # mass flux units
+    ureg.define('lb_per_sec_per_sq_in = lb / second / inch**2')
+    ureg.define('kg_per_sec_per_sq_m = kg / second / meter**2')
 
-# mass flux units
-ureg.define('lb_per_sec_per_sq_in = lb / second / inch**2')
-ureg.define('kg_per_sec_per_sq_m = kg / second / meter**2')
+    set_application_registry(ureg)
+    _ureg = ureg
+    return ureg
+
+
+@lru_cache(maxsize=None)
+def get_conversion(from_: str, to_: str) -> Tuple[float, float]:
+    """
+    Compiles a unit conversion into a scale factor and offset, so pint only parses the units once.
+    Every supported conversion is affine, to = from * factor + offset (the offset is 0 unless temperatures
+    are involved)
+    :param from_: the unit to convert from, a str defined in the pint unit registry, see get_registry
+    :param to_: the unit to convert to, a str defined in the pint unit registry, see get_registry
+    :return: tuple of (factor, offset)
+    """
+    if (from_, to_) in PRECOMPILED_CONVERSIONS:
+        return PRECOMPILED_CONVERSIONS[from_, to_]
+
+    ureg = get_registry()
+    offset = ureg.Quantity(0.0, from_).to(to_).magnitude
+    factor = ureg.Quantity(1.0, from_).to(to_).magnitude - offset
+    return factor, offset
 
 
 def convert_magnitude(val: float, from_: str, to_: str) -> float:
     """
     Convert a magnitude to a new unit
     :param val: the magnitude to convert
-    :param from_: the unit to convert from, a str defined in the pint unit registry @ureg
-    :param to_:the unit to convert to, a str defined in the pint unit registry @ureg
+    :param from_: the unit to convert from, a str defined in the pint unit registry, see get_registry
+    :param to_:the unit to convert to, a str defined in the pint unit registry, see get_registry
     :return: the new magnitude, in terms of unit @to_
     """
-    old = ureg.Quantity(val, from_)
-    new = old.to(to_)
-    return new.magnitude
+    factor, offset = get_conversion(from_, to_)
+    return val * factor + offset
+
+
+def convert_array(values, from_: str, to_: str) -> np.ndarray:
+    """
+    Convert many magnitudes to a new unit in one call
+    :param values: array-like of magnitudes to convert
+    :param from_: the unit to convert from, a str defined in the pint unit registry, see get_registry
+    :param to_:the unit to convert to, a str defined in the pint unit registry, see get_registry
+    :return: numpy array of the new magnitudes, in terms of unit @to_
+    """
+    factor, offset = get_conversion(from_, to_)
+    return np.asarray(values, dtype=float) * factor + offset
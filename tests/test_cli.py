@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+
+from openburn import ROOT_PATH, schema
+from openburn.cli import main, parse_settings, iter_designs, iter_chunks, simulate_designs
+from openburn.core.internalballistics import SimEngine
+from openburn.core.propellant import SimplePropellant
+from openburn.core.grain import CylindricalCoreGrain
+from openburn.core.nozzle import ConicalNozzle
+from openburn.core.motor import OpenBurnMotor
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        """Set up the test data"""
+        propellant = SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filenames = []
+        for i, core in enumerate((0.75, 1.0, 1.25)):
+            motor = OpenBurnMotor()
+            motor.set_grains([CylindricalCoreGrain(diameter=2, length=4, core_diameter=core, burning_faces=2,
+                                                   propellant=propellant)
+                              for _ in range(0, 4)])
+            motor.set_nozzle(ConicalNozzle(throat=0.5, exit=2, half_angle=15, throat_len=0.25))
+            filename = os.path.join(self.tempdir.name, f"design{i}.json")
+            with open(filename, 'w') as f:
+                f.write(motor.to_json())
+            self.filenames.append(filename)
+        with open(os.path.join(self.tempdir.name, 'design3.obz'), 'wb') as f:
+            f.write(schema.dumps_binary(motor))
+        self.filenames.append(f.name)
+        with open(os.path.join(self.tempdir.name, 'notes.txt'), 'w') as f:
+            f.write('not a design')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def run_main(self, *args: str) -> (int, str):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            status = main(list(args))
+        return status, out.getvalue()
+
+    def test_settings(self):
+        settings = parse_settings(['timestep=0.005', 'engine=NumPy', 'snapshot_burnout=true', 'web_steps=50'])
+        self.assertEqual(settings.time_step, 0.005)
+        self.assertEqual(settings.engine, SimEngine.NUMPY)
+        self.assertTrue(settings.snapshot_burnout)
+        self.assertEqual(settings.web_steps, 50)
+        for override in ('time_step=0.005', 'timestep', 'engine=fast', 'timestep=fast'):
+            with self.assertRaises(ValueError):
+                parse_settings([override])
+
+    def test_inputs(self):
+        self.assertEqual([name for name, _ in iter_designs([self.tempdir.name])], self.filenames)
+        self.assertEqual([name for name, _ in iter_designs([os.path.join(self.tempdir.name, '*.obz')])],
+                         self.filenames[-1:])
+        stdin = io.StringIO(f"{OpenBurnMotor().to_json()}\n\n{OpenBurnMotor().to_json()}\n")
+        self.assertEqual([name for name, _ in iter_designs(['-'], stdin)], ['-:1', '-:3'])
+        with self.assertRaises(ValueError):
+            list(iter_designs([os.path.join(self.tempdir.name, '*.eng')]))
+        # found before any design is simulated
+        out = io.StringIO()
+        with self.assertRaises(SystemExit) as context, redirect_stdout(out), redirect_stderr(io.StringIO()):
+            main([self.filenames[0], os.path.join(self.tempdir.name, '*.eng'), '--workers', '1'])
+        self.assertEqual(context.exception.code, 2)
+        self.assertEqual(out.getvalue(), '')
+
+    def test_streaming(self):
+        self.assertEqual([len(chunk) for chunk in iter_chunks(range(40), max_size=8)], [1, 2, 4, 8, 8, 8, 8, 1])
+
+        read = []
+
+        def designs():
+            for i in range(40):
+                read.append(i)
+                yield self.filenames[i % 3], None
+
+        results = simulate_designs(designs(), parse_settings(['engine=numpy']), workers=2)
+        self.assertEqual(next(results)[0], self.filenames[0])
+        self.assertLess(len(read), 40)  # results are written before every design is read
+        self.assertEqual(len(list(results)), 39)
+
+    def test_jsonl(self):
+        status, out = self.run_main(self.tempdir.name, '--workers', '1', '--set', 'engine=numpy')
+        self.assertEqual(status, 0)
+        rows = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual([row['design'] for row in rows], self.filenames)
+        self.assertTrue(all(row['error'] is None and row['total_impulse'] > 0 for row in rows))
+        # a larger core burns out sooner
+        self.assertGreater(rows[0]['burn_time'], rows[2]['burn_time'])
+
+        # the same results from a pool of workers, in input order
+        status, pooled = self.run_main(self.tempdir.name, '--workers', '2', '--set', 'engine=numpy')
+        self.assertEqual(pooled, out)
+
+    def test_csv_errors(self):
+        bad = os.path.join(self.tempdir.name, 'bad.json')
+        with open(bad, 'w') as f:
+            f.write('{}')
+        status, out = self.run_main(self.filenames[0], bad, '--workers', '1', '--format', 'csv',
+                                    '--max-pressure', '10')
+        self.assertEqual(status, 1)
+        rows = list(csv.DictReader(io.StringIO(out)))
+        self.assertEqual([row['design'] for row in rows], [self.filenames[0], bad])
+        self.assertTrue(rows[0]['error'].startswith('SimulationStopped'))
+        self.assertTrue(rows[1]['error'].startswith('ValueError'))
+
+    def test_profile(self):
+        status, out = self.run_main(self.tempdir.name, '--workers', '1', '--profile', '1')
+        rows = [json.loads(line) for line in out.splitlines()]
+        self.assertTrue(all(row['profile']['counters']['steps'] > 0 for row in rows))
+
+        status, out = self.run_main(self.tempdir.name, '--workers', '1', '--format', 'csv', '--profile', '0')
+        self.assertNotIn('profile', next(csv.DictReader(io.StringIO(out))))
+
+    def test_module(self):
+        """Runs as python -m openburn, reading json lines from stdin, without loading Qt or jsonpickle"""
+        with open(self.filenames[0], 'r') as f:
+            line = f.read()
+        script = ("import runpy, sys\n"
+                  "sys.argv = ['openburn', '-']\n"
+                  "try:\n"
+                  "    runpy.run_module('openburn', run_name='__main__')\n"
+                  "except SystemExit as e:\n"
+                  "    print(e.code, ' '.join(x for x in ('qtpy', 'jsonpickle') if x in sys.modules))\n")
+        out = subprocess.run([sys.executable, '-c', script], cwd=ROOT_PATH, check=True, input=line + '\n',
+                             stdout=subprocess.PIPE, universal_newlines=True).stdout.splitlines()
+        self.assertEqual(json.loads(out[0])['design'], '-:1')
+        self.assertEqual(out[1].strip(), '0')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+from math import pi
+from unittest import mock
+
+import numpy as np
+
+from openburn.core import portgeometry
+from openburn.core.propellant import SimplePropellant
+from openburn.core.grain import CylindricalCoreGrain, PortGeometryGrain
+
+
+class GrainGeometryTest(unittest.TestCase):
+    def setUp(self):
+        """Set up the test data"""
+        self.propellant = SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
+        self.grain = CylindricalCoreGrain(diameter=2, length=4, core_diameter=1, burning_faces=2,
+                                          propellant=self.propellant)
+
+    def test_geometry_at_web(self):
+        # the closed form geometry matches regressing the grain
+        burned = self.grain.copy()
+        burned.burn(0.2, 1.0)
+        burning_area, port_area, volume = self.grain.get_geometry_at_web(0.2)
+        self.assertAlmostEqual(burning_area, burned.get_burning_area())
+        self.assertAlmostEqual(port_area, burned.get_port_area())
+        self.assertAlmostEqual(volume, burned.get_volume())
+        self.assertAlmostEqual(self.grain.get_web_thickness(), 0.5)
+
+    def test_geometry_table(self):
+        table = self.grain.get_geometry_table()
+        self.assertAlmostEqual(table.get_web_thickness(), 0.5)
+        burning_area, port_area, volume = table.interpolate(0.2)
+        self.assertAlmostEqual(burning_area, self.grain.get_geometry_at_web(0.2)[0], places=3)
+        self.assertAlmostEqual(volume, self.grain.get_geometry_at_web(0.2)[2], places=3)
+        self.assertAlmostEqual(table.interpolate(0.5)[2], 0)
+
+        # cached until the geometry changes, and never serialized
+        self.assertIs(self.grain.get_geometry_table(), table)
+        self.assertIs(self.grain.copy().get_geometry_table(), table)
+        self.assertNotIn('_geometry_table', self.grain.__getstate__())
+        self.grain.core_diameter = 1.5
+        self.assertIsNot(self.grain.get_geometry_table(), table)
+        self.assertAlmostEqual(self.grain.get_geometry_table().get_web_thickness(), 0.25)
+
+
+class PortGeometryGrainTest(unittest.TestCase):
+    def setUp(self):
+        """Set up the test data"""
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        patcher = mock.patch.object(portgeometry, 'port_map_cache_path', self.cache_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        portgeometry.get_port_map.cache_clear()
+
+        self.propellant = SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
+        self.bates = CylindricalCoreGrain(diameter=2, length=4, core_diameter=1, burning_faces=2,
+                                          propellant=self.propellant)
+        self.grain = PortGeometryGrain(diameter=2, length=4, port=portgeometry.circle_port(1), burning_faces=2,
+                                       propellant=self.propellant, resolution=128)
+
+    def test_circular_port(self):
+        # a circular port regresses like a BATES grain
+        self.assertAlmostEqual(self.grain.get_web_thickness(), self.bates.get_web_thickness(), places=1)
+        for web in (0, 0.1, 0.25, 0.4):
+            expected = self.bates.get_geometry_at_web(web)
+            burning_area, port_area, volume = self.grain.get_geometry_at_web(web)
+            self.assertAlmostEqual(burning_area / expected[0], 1, delta=0.03)
+            self.assertAlmostEqual(port_area / expected[1], 1, delta=0.01)
+            self.assertAlmostEqual(volume, expected[2], delta=0.01 * self.bates.get_volume())
+
+        self.grain.burn(0.1, 1)
+        self.assertAlmostEqual(self.grain.get_port_area() / (pi * 0.6 ** 2), 1, delta=0.01)
+        self.grain.burn(1, 1)
+        self.assertTrue(self.grain.is_burned_out())
+
+    def test_port_shapes(self):
+        # a star burns progressively at first, the fins of a finocyl add burning area to the core
+        star = portgeometry.compute_port_map(portgeometry.star_port(5, 0.6, 1.2), 2, 128)
+        self.assertGreater(star.perimeter[40], star.perimeter[0])
+        core = portgeometry.compute_port_map(portgeometry.circle_port(0.6), 2, 128)
+        finocyl = portgeometry.compute_port_map(portgeometry.finocyl_port(0.6, 6, 0.1, 0.3), 2, 128)
+        self.assertGreater(finocyl.perimeter[0], core.perimeter[0])
+        self.assertAlmostEqual(finocyl.port_area[-1], pi, delta=0.05)
+
+    def test_disk_cache(self):
+        port_map = self.grain.get_port_map()
+        key = portgeometry.hash_geometry(self.grain.port, self.grain.diameter, self.grain.resolution)
+        self.assertTrue(os.path.exists(os.path.join(self.cache_dir.name, f"{key}.npz")))
+
+        # a new session loads the map instead of solving it again
+        portgeometry.get_port_map.cache_clear()
+        with mock.patch.object(portgeometry, 'compute_port_map', side_effect=AssertionError):
+            cached = self.grain.copy().get_port_map()
+        np.testing.assert_array_equal(cached.port_area, port_map.port_area)
+
+        # the port is part of the key
+        other = PortGeometryGrain(diameter=2, length=4, port=portgeometry.circle_port(1.2), burning_faces=2,
+                                  resolution=128)
+        self.assertNotEqual(portgeometry.hash_geometry(other.port, 2, 128), key)
@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+
+from openburn.core.isentropic import (calc_area_ratio, solve_exit_mach, solve_exit_mach_array,
+                                     _solve_exit_mach_cached)
+
+
+class IsentropicFlowTest(unittest.TestCase):
+    def test_exit_mach(self):
+        self.assertAlmostEqual(solve_exit_mach(16, 1.226), 3.7029, places=4)
+        self.assertEqual(solve_exit_mach(1, 1.226), 1.0)
+        # large expansion ratios converge too
+        self.assertAlmostEqual(calc_area_ratio(solve_exit_mach(400, 1.226), 1.226), 400)
+
+    def test_cache(self):
+        solve_exit_mach(8.5, 1.2)
+        before = _solve_exit_mach_cached.cache_info().hits
+        solve_exit_mach(8.5, 1.2)
+        self.assertEqual(_solve_exit_mach_cached.cache_info().hits, before + 1)
+
+    def test_array(self):
+        ratios = np.array([0.5, 1.0, 1.5, 4.0, 16.0, 100.0])
+        mach = solve_exit_mach_array(ratios, 1.226)
+        expected = [solve_exit_mach(ratio, 1.226) for ratio in ratios]
+        np.testing.assert_allclose(mach, expected)
+
+        # warm start from a previous solution
+        warm = solve_exit_mach_array(ratios * 1.01, 1.226, guess=mach)
+        np.testing.assert_allclose(calc_area_ratio(warm[2:], 1.226), ratios[2:] * 1.01)
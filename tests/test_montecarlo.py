@@ -0,0 +1,75 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from openburn.analysis.montecarlo import MonteCarloAnalysis, RunningHistogram, Tolerance
+from openburn.core.internalballistics import SimSettings, SimEngine
+from openburn.core.propellant import SimplePropellant
+from openburn.core.grain import CylindricalCoreGrain, PortGeometryGrain
+from openburn.core import portgeometry
+from openburn.core.nozzle import ConicalNozzle
+from openburn.core.motor import OpenBurnMotor
+
+
+class MonteCarloTest(unittest.TestCase):
+    def setUp(self):
+        """Set up the test data"""
+        self.settings = SimSettings(engine=SimEngine.ADAPTIVE)
+        self.propellant = SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
+        self.grains = [CylindricalCoreGrain(diameter=2, length=4, core_diameter=1, burning_faces=2,
+                                            propellant=self.propellant)
+                       for _ in range(0, 4)]
+        self.nozzle = ConicalNozzle(throat=0.5, exit=2, half_angle=15, throat_len=0.25)
+        self.motor = OpenBurnMotor()
+        self.motor.set_grains(self.grains)
+        self.motor.set_nozzle(self.nozzle)
+        self.tolerances = {
+            'propellant.a': Tolerance(0.03, relative=True),
+            'propellant.cstar': Tolerance(50, distribution='uniform'),
+            'grain.core_diameter': Tolerance(0.01),
+            'nozzle.throat_dia': Tolerance(0.005, distribution='triangular'),
+        }
+
+    def test_histogram(self):
+        values = np.random.default_rng(0).normal(10, 2, 1000)
+        first, second = RunningHistogram(0, 20, 40), RunningHistogram(0, 20, 40)
+        for value in values[:300]:
+            first.add(value)
+        for value in values[300:]:
+            second.add(value)
+        first.merge(second)
+        self.assertAlmostEqual(first.mean, values.mean())
+        self.assertAlmostEqual(first.get_std(), values.std(ddof=1))
+        self.assertAlmostEqual(first.get_percentile(50), np.median(values), places=0)
+
+    def test_reproducible(self):
+        serial = MonteCarloAnalysis(self.motor, self.settings, self.tolerances, seed=42, workers=1)
+        parallel = MonteCarloAnalysis(self.motor, self.settings, self.tolerances, seed=42, workers=2)
+        first = serial.run(40, chunk_size=10)
+        second = parallel.run(40, chunk_size=10)
+
+        self.assertEqual(first.samples, 40)
+        self.assertEqual(first.failures, 0)
+        np.testing.assert_array_equal(first.thrust.counts, second.thrust.counts)
+        np.testing.assert_array_equal(first.total_impulse.counts, second.total_impulse.counts)
+        self.assertEqual(first.max_pressure.mean, second.max_pressure.mean)   # chunks are merged in order
+        self.assertGreater(first.max_pressure.get_std(), 0)
+
+        bands = first.get_percentile_bands('thrust', (5, 50, 95))
+        self.assertEqual(len(bands[50]), len(first.get_time_grid()))
+        self.assertTrue(np.all(bands[5] <= bands[95]))
+
+    @mock.patch.object(portgeometry, 'port_map_cache_path', None)
+    def test_port_geometry_grains(self):
+        # grains without a core are dispersed by the params they have
+        self.motor.set_grains(self.grains[:3] + [PortGeometryGrain(diameter=2, length=4, port=portgeometry.circle_port(1),
+                                                                   burning_faces=2, propellant=self.propellant)])
+        settings = SimSettings(engine=SimEngine.WEB)
+        results = MonteCarloAnalysis(self.motor, settings, self.tolerances, seed=42, workers=1).run(4)
+        self.assertEqual(results.samples, 4)
+        self.assertEqual(results.failures, 0)
+
+    def test_unknown_param(self):
+        with self.assertRaises(ValueError):
+            MonteCarloAnalysis(self.motor, self.settings, {'grain.color': Tolerance(1)})
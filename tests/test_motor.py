@@ -0,0 +1,143 @@
+import pickle
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from openburn.core.propellant import SimplePropellant
+from openburn.core.grain import CylindricalCoreGrain
+from openburn.core.nozzle import ConicalNozzle
+from openburn.core.motor import OpenBurnMotor
+
+
+class AxialIndexTest(unittest.TestCase):
+    def setUp(self):
+        """Set up the test data"""
+        self.propellant = SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
+        # short grains of different lengths, so positions are not whole inches
+        self.grains = [CylindricalCoreGrain(diameter=2, length=length, core_diameter=1, burning_faces=2,
+                                            propellant=self.propellant)
+                       for length in (1.5, 2.25, 0.75, 3)]
+        for grain in self.grains:
+            grain.burn_rate = 0.3
+        self.motor = OpenBurnMotor()
+        self.motor.set_grains(self.grains)
+        self.motor.set_nozzle(ConicalNozzle(throat=0.5, exit=2, half_angle=15, throat_len=0.25))
+
+    def grain_flow(self, grain: CylindricalCoreGrain, area: float) -> float:
+        return area * grain.propellant.rho * grain.burn_rate
+
+    def test_grain_at_x(self):
+        self.assertIs(self.motor.get_grain_at_x(0), self.grains[0])
+        self.assertIs(self.motor.get_grain_at_x(1.5), self.grains[0])
+        self.assertIs(self.motor.get_grain_at_x(1.6), self.grains[1])
+        self.assertIs(self.motor.get_grain_at_x(self.motor.get_length()), self.grains[-1])
+        self.assertIsNone(self.motor.get_grain_at_x(self.motor.get_length() + 0.1))
+
+    def test_upstream_mass_flow(self):
+        first, second = self.grains[:2]
+        # half way through the second grain: all of the first grain, plus the upstream half of the second
+        expected = self.grain_flow(first, first.get_burning_area()) + \
+            self.grain_flow(second, second.get_upstream_burning_area(second.length / 2))
+        self.assertAlmostEqual(self.motor.get_upstream_mass_flow(1.5 + second.length / 2), expected)
+
+        # the aft face of the last grain is downstream of the end of the propellant
+        last = self.grains[-1]
+        expected = self.motor.get_mass_flow() - self.grain_flow(last, last.get_face_area())
+        self.assertAlmostEqual(self.motor.get_upstream_mass_flow(self.motor.get_length()), expected)
+
+    def test_mass_flux_profile(self):
+        stations = np.linspace(0, self.motor.get_length() + 1, 50)
+        profile = self.motor.get_mass_flux_profile(stations)
+        for x, flux in zip(stations, profile):
+            grain = self.motor.get_grain_at_x(x)
+            if grain is None:
+                self.assertTrue(np.isnan(flux))
+            else:
+                self.assertAlmostEqual(flux, self.motor.get_upstream_mass_flow(x) / grain.get_port_area())
+        # mass flux builds up along the motor
+        inside = profile[~np.isnan(profile)]
+        self.assertTrue(np.all(np.diff(inside) > 0))
+
+    def test_update(self):
+        before = self.motor.get_upstream_mass_flow(2)
+        for grain in self.grains:
+            grain.burn(0.5, 0.1)
+        # burning the grains rebuilds the index
+        self.assertGreater(self.motor.get_upstream_mass_flow(2), before)
+
+        self.motor.add_grain(CylindricalCoreGrain(diameter=2, length=1, core_diameter=1, burning_faces=2,
+                                                  propellant=self.propellant))
+        self.assertEqual(len(self.motor.get_axial_index()), 5)
+
+
+class MotorPropertiesTest(unittest.TestCase):
+    PROPERTIES = ('get_kn', 'get_burning_area', 'get_length', 'get_diameter', 'get_propellant_mass',
+                  'get_volume_loading', 'get_port_throat_ratio', 'get_mass_flow')
+
+    def setUp(self):
+        """Set up the test data"""
+        self.propellant = SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
+        self.motor = OpenBurnMotor()
+        self.motor.set_grains([CylindricalCoreGrain(diameter=2, length=4, core_diameter=1, burning_faces=2,
+                                                    propellant=self.propellant)
+                               for _ in range(0, 4)])
+        self.motor.set_nozzle(ConicalNozzle(throat=0.5, exit=2, half_angle=15, throat_len=0.25))
+        for grain in self.motor.grains:
+            grain.burn_rate = 0.3
+
+    def assertProperties(self, motor: OpenBurnMotor):
+        """The cached properties of a motor match those of a new motor in the same state"""
+        fresh = pickle.loads(pickle.dumps(motor))
+        for name in self.PROPERTIES:
+            self.assertEqual(getattr(motor, name)(), getattr(fresh, name)(), name)
+
+    def test_cached(self):
+        kn = self.motor.get_kn()
+        with mock.patch.object(CylindricalCoreGrain, 'get_burning_area') as get_burning_area:
+            self.assertEqual(self.motor.get_kn(), kn)
+            get_burning_area.assert_not_called()
+
+    def test_invalidated(self):
+        for name in self.PROPERTIES:
+            getattr(self.motor, name)()
+        self.motor.grains[0].burn(0.3, 0.1)
+        self.assertProperties(self.motor)
+
+        self.motor.grains[-1].core_diameter = 1.5
+        self.assertProperties(self.motor)
+        self.motor.nozzle.throat_dia = 0.6
+        self.assertProperties(self.motor)
+        self.motor.set_nozzle(ConicalNozzle(throat=0.4, exit=2, half_angle=15, throat_len=0.25))
+        self.assertProperties(self.motor)
+        self.motor.add_grain(CylindricalCoreGrain(diameter=3, length=2, core_diameter=1, burning_faces=2,
+                                                  propellant=self.propellant))
+        self.assertProperties(self.motor)
+        self.motor.grains.pop()
+        self.motor.invalidate()     # editing the list in place isn't noticed
+        self.assertProperties(self.motor)
+
+    def test_copies(self):
+        """Copies share cached properties until either one changes"""
+        self.motor.get_kn()
+        copy = self.motor.copy()
+        copy.grains[0].burn(0.3, 0.1)
+        self.assertProperties(copy)
+        self.assertProperties(self.motor)
+        self.assertGreater(copy.get_kn(), self.motor.get_kn())
+
+        # a copy of a grain on its own isn't part of the motor
+        kn = self.motor.get_kn()
+        grain = self.motor.grains[0].copy()
+        with mock.patch.object(CylindricalCoreGrain, 'get_burning_area') as get_burning_area:
+            grain.burn(0.3, 0.1)
+            self.assertEqual(self.motor.get_kn(), kn)
+            get_burning_area.assert_not_called()
+
+        # a grain notifies the motor it was last added to
+        other = OpenBurnMotor()
+        other.set_grains(self.motor.grains[:1])
+        other.set_nozzle(self.motor.nozzle)
+        other.get_kn()
+        self.motor.grains[0].length = 3
+        self.assertProperties(other)
@@ -1,6 +1,6 @@
 import unittest
 
-from openburn.util.motorclass import get_motor_class
+from openburn.util.motorclass import get_motor_class, get_class_impulse
 
 
 class MotorClassTest(unittest.TestCase):
@@ -43,3 +43,8 @@ class MotorClassTest(unittest.TestCase):
         self.assertEqual(des, 'B')
         self.assertAlmostEqual(percent, 71)
 
+    def test_class_impulse(self):
+        for nsec in (2, 3.55, 9.23, 350, 1279, 1281, 2500):
+            self.assertAlmostEqual(get_class_impulse(*get_motor_class(nsec)), nsec)
+        with self.assertRaises(ValueError):
+            get_class_impulse('AA', 50)
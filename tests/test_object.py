@@ -0,0 +1,50 @@
+import pickle
+import subprocess
+import sys
+import unittest
+
+from openburn import ROOT_PATH
+from openburn.core.propellant import SimplePropellant
+from openburn.core.grain import CylindricalCoreGrain
+from openburn.core.nozzle import ConicalNozzle
+from openburn.core.motor import OpenBurnMotor
+
+
+class OpenBurnObjectTest(unittest.TestCase):
+    def setUp(self):
+        """Set up the test data"""
+        self.propellant = SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
+        self.grains = [CylindricalCoreGrain(diameter=2, length=4, core_diameter=1, burning_faces=2,
+                                            propellant=self.propellant)
+                       for _ in range(0, 4)]
+        self.nozzle = ConicalNozzle(throat=0.5, exit=2, half_angle=15, throat_len=0.25)
+        self.motor = OpenBurnMotor()
+        self.motor.set_grains(self.grains)
+        self.motor.set_nozzle(self.nozzle)
+
+    def test_slots(self):
+        self.assertFalse(hasattr(self.grains[0], '__dict__'))
+        self.assertIn('core_diameter', CylindricalCoreGrain.get_slots())
+        self.assertIn('propellant', CylindricalCoreGrain.get_slots())
+
+    def test_copy(self):
+        copy = self.motor.copy()
+        copy.grains[0].core_diameter = 1.5
+        self.assertEqual(self.motor.grains[0].core_diameter, 1)
+        # grains that shared a propellant still share their copied propellant
+        self.assertIs(copy.grains[0].propellant, copy.grains[1].propellant)
+        self.assertIsNot(copy.grains[0].propellant, self.propellant)
+
+    def test_state(self):
+        state = self.grains[0].__getstate__()
+        self.assertNotIn('uuid', state)
+        loaded = pickle.loads(pickle.dumps(self.motor))
+        self.assertEqual(loaded.grains[0].core_diameter, 1)
+        self.assertNotEqual(loaded.uuid, self.motor.uuid)
+
+    def test_headless_import(self):
+        """The core must import and simulate without Qt"""
+        script = ("import sys; sys.modules['qtpy'] = None\n"
+                  "from openburn.core.internalballistics import InternalBallisticsSim\n"
+                  "from openburn.analysis.sweep import ParameterSweep\n")
+        subprocess.run([sys.executable, '-c', script], cwd=ROOT_PATH, check=True)
@@ -0,0 +1,84 @@
+import io
+import unittest
+
+import numpy as np
+
+from openburn.analysis.optimize import DesignOptimizer, Bound, Objective, Constraint, pareto_ranks
+from openburn.core.internalballistics import SimSettings, SimEngine
+from openburn.core.propellant import SimplePropellant
+from openburn.core.grain import CylindricalCoreGrain
+from openburn.core.nozzle import ConicalNozzle
+from openburn.core.motor import OpenBurnMotor
+from openburn.util.motorclass import get_motor_class
+from openburn.util.units import convert_magnitude
+
+
+class DesignOptimizerTest(unittest.TestCase):
+    def setUp(self):
+        """Set up the test data"""
+        self.settings = SimSettings(engine=SimEngine.ADAPTIVE)
+        self.propellant = SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
+        self.grains = [CylindricalCoreGrain(diameter=2, length=4, core_diameter=1, burning_faces=2,
+                                            propellant=self.propellant)
+                       for _ in range(0, 4)]
+        self.nozzle = ConicalNozzle(throat=0.5, exit=2, half_angle=15, throat_len=0.25)
+        self.motor = OpenBurnMotor()
+        self.motor.set_grains(self.grains)
+        self.motor.set_nozzle(self.nozzle)
+
+        self.bounds = {'grain_count': Bound(1, 6), 'core_diameter': Bound(0.5, 1.25),
+                       'grain_length': Bound(2, 6), 'throat_diameter': Bound(0.3, 0.8)}
+        self.objectives = [Objective.target_class('K', 30), Objective.maximize('avg_isp')]
+        self.constraints = [Constraint('max_pressure', maximum=800)]
+
+    def test_pareto_ranks(self):
+        scores = np.array([[1, 3], [2, 2], [3, 1], [2, 3], [3, 3]])
+        np.testing.assert_array_equal(pareto_ranks(scores), [0, 0, 0, 1, 2])
+
+    def test_optimize(self):
+        optimizer = DesignOptimizer(self.motor, self.settings, self.bounds, self.objectives, self.constraints,
+                                    workers=1, seed=1)
+        results = optimizer.run(time_budget=60, max_evaluations=120)
+        self.assertEqual(len(results), 120)
+
+        front = results.get_pareto_front()
+        self.assertGreater(len(front), 0)
+        scores = np.array([c.scores for c in front])
+        np.testing.assert_array_equal(pareto_ranks(scores), np.zeros(len(front)))
+        for candidate in front:
+            self.assertLessEqual(candidate.summary['max_pressure'], 800)
+            self.assertEqual(candidate.params['grain_count'], int(candidate.params['grain_count']))
+
+        # the front kept while searching is the front of every design simulated
+        self.assertEqual({id(c) for c in optimizer._get_elite()}, {id(c) for c in front})
+
+        best = results.get_best()
+        self.assertIs(best, front[0])
+        des, _ = get_motor_class(convert_magnitude(best.summary['total_impulse'], 'lbf', 'newton'))
+        self.assertEqual(des, 'K')
+
+        f = io.StringIO()
+        results.write_csv(f)
+        self.assertEqual(len(f.getvalue().splitlines()), 121)
+
+    def test_duplicates(self):
+        # only three distinct designs exist, each is simulated once
+        optimizer = DesignOptimizer(self.motor, self.settings, {'grain_count': Bound(2, 4)},
+                                    [Objective.maximize('total_impulse')], workers=1, seed=1)
+        results = optimizer.run(time_budget=60, max_evaluations=20)
+        self.assertEqual(len(results), 3)
+        self.assertGreater(results.cache_hits, 0)
+        self.assertEqual(results.get_best().params, {'grain_count': 4})
+
+    def test_parallel(self):
+        optimizer = DesignOptimizer(self.motor, self.settings, self.bounds, self.objectives, self.constraints,
+                                    workers=2, seed=1)
+        results = optimizer.run(time_budget=60, max_evaluations=16)
+        self.assertEqual(len(results), 16)
+        self.assertGreater(len(results.get_pareto_front()), 0)
+
+    def test_bounds(self):
+        with self.assertRaises(ValueError):
+            DesignOptimizer(self.motor, self.settings, {'propellant': Bound(0, 1)}, self.objectives)
+        with self.assertRaises(ValueError):
+            Bound(2, 1)
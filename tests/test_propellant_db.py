@@ -1,5 +1,9 @@
+import os
+import tempfile
 import unittest
 
+import jsonpickle
+
 from openburn.core.propellant import SimplePropellant
 from openburn.application.propellant_db import PropellantDatabase
 
@@ -23,3 +27,55 @@ class PropellantDatabaseTest(unittest.TestCase):
         to_edit = SimplePropellant("70/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
         self.db.update_propellant("68/10", to_edit)
         self.assertIn(to_edit, self.db.propellants.values())
+
+    def test_names(self):
+        self.assertEqual(self.db.propellant_names(), ["68/10", "72/10"])
+        self.assertEqual(list(self.db.propellants), ["68/10", "72/10"])
+
+    def test_find(self):
+        self.db.add_propellant(SimplePropellant("Blue", 0.05, 0.5, 4500, 0.06, 1.2))
+        self.assertEqual([prop.name for prop in self.db.find_propellants(n=(None, 0.305))], ["72/10"])
+        self.assertEqual([prop.name for prop in self.db.find_propellants(cstar=(4800, 4900), n=(0.3, None))],
+                         ["68/10", "72/10"])
+        with self.assertRaises(ValueError):
+            self.db.find_propellants(name=("a", "b"))
+
+
+class PropellantStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tempdir.name, 'propellants.db')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_persistence(self):
+        db = PropellantDatabase(self.filename)
+        db.add_propellant(SimplePropellant("72/10", 0.03, 0.3, 4800, 0.06, 1.25))
+        db.add_propellant(SimplePropellant("68/10", 0.03, 0.31, 4900, 0.061, 1.244))
+        db.update_propellant("68/10", SimplePropellant("70/10", 0.0341, 0.2249, 4706, 0.058, 1.226))
+        db.store.close()
+
+        # edits are saved as they are made, and propellants are only decoded when used
+        db = PropellantDatabase(self.filename)
+        self.assertEqual(db.propellant_names(), ["70/10", "72/10"])
+        self.assertEqual(db.propellants.loaded, {})
+        propellant = db.propellants["70/10"]
+        self.assertIsInstance(propellant, SimplePropellant)
+        self.assertEqual((propellant.a, propellant.cstar), (0.0341, 4706))
+        self.assertEqual(list(db.propellants.loaded), ["70/10"])
+        db.store.close()
+
+    def test_legacy_json(self):
+        # the shipped library is a list, the database used to save a dict
+        legacy = [SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)]
+        for data in (legacy, {prop.name: prop for prop in legacy}):
+            with open(os.path.join(self.tempdir.name, 'propellants.json'), 'w') as f:
+                f.write(jsonpickle.encode(data))
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+
+            db = PropellantDatabase(self.filename)
+            self.assertEqual(db.propellant_names(), ["68/10"])
+            self.assertEqual(db.propellants["68/10"].n, 0.2249)
+            db.store.close()
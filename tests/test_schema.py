@@ -0,0 +1,96 @@
+import json
+import unittest
+
+import jsonpickle
+
+from openburn import schema
+from openburn.core.propellant import SimplePropellant
+from openburn.core.grain import CylindricalCoreGrain, PortGeometryGrain
+from openburn.core.nozzle import ConicalNozzle
+from openburn.core.motor import OpenBurnMotor
+from openburn.core.portgeometry import star_port
+
+
+class SchemaTest(unittest.TestCase):
+    def setUp(self):
+        """Set up the test data"""
+        self.propellant = SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
+        self.other = SimplePropellant("other", 0.03, 0.3, 4800, 0.06, 1.2)
+        self.motor = OpenBurnMotor()
+        self.motor.set_grains([CylindricalCoreGrain(diameter=2, length=4, core_diameter=1, burning_faces=2,
+                                                    propellant=propellant)
+                               for propellant in (self.propellant, self.other, self.propellant)] +
+                              [PortGeometryGrain(diameter=2, length=4, port=star_port(5, 0.3, 0.8), burning_faces=2,
+                                                 propellant=self.other)])
+        self.motor.set_nozzle(ConicalNozzle(throat=0.5, exit=2, half_angle=15, throat_len=0.25))
+
+    def assertMotorsEqual(self, motor: OpenBurnMotor, expected: OpenBurnMotor):
+        self.assertIsInstance(motor, OpenBurnMotor)
+        self.assertNotEqual(motor.uuid, expected.uuid)
+        self.assertEqual(motor.__getstate__().keys(), expected.__getstate__().keys())
+        for grain, expected_grain in zip(motor.grains, expected.grains):
+            self.assertIs(type(grain), type(expected_grain))
+            self.assertEqual(grain.__getstate__().keys(), expected_grain.__getstate__().keys())
+            for key, value in expected_grain.__getstate__().items():
+                if key != 'propellant':
+                    self.assertEqual(getattr(grain, key), value)
+            self.assertEqual(grain.propellant.__getstate__(), expected_grain.propellant.__getstate__())
+        self.assertEqual(motor.nozzle.__getstate__(), expected.nozzle.__getstate__())
+        self.assertAlmostEqual(motor.avg_propellant.a, expected.avg_propellant.a)
+        # grains that shared a propellant still share it
+        self.assertIs(motor.grains[0].propellant, motor.grains[2].propellant)
+        self.assertIs(motor.grains[1].propellant, motor.grains[3].propellant)
+        self.assertIsNot(motor.grains[0].propellant, motor.grains[1].propellant)
+
+    def test_round_trip(self):
+        data = schema.dumps(self.motor)
+        self.assertEqual(len(json.loads(data)['propellants']), 2)
+        self.assertMotorsEqual(schema.loads(data), self.motor)
+        self.assertMotorsEqual(OpenBurnMotor.from_json(self.motor.to_json(indent=4)), self.motor)
+
+    def test_binary(self):
+        data = schema.dumps_binary(self.motor)
+        self.assertTrue(data.startswith(schema.BINARY_MAGIC))
+        self.assertLess(len(data), len(schema.dumps(self.motor)))
+        self.assertMotorsEqual(schema.loads(data), self.motor)
+
+    def test_legacy(self):
+        jsonpickle.set_encoder_options('json', sort_keys=True, indent=4)
+        data = jsonpickle.encode(self.motor)
+        self.assertMotorsEqual(OpenBurnMotor.from_json(data), self.motor)
+
+        propellants = schema.decode_legacy(json.loads(jsonpickle.encode([self.propellant, self.other,
+                                                                         self.propellant])))
+        self.assertEqual([prop.name for prop in propellants], ["68/10", "other", "68/10"])
+        self.assertIs(propellants[0], propellants[2])
+
+    def test_versions(self):
+        document = schema.encode(self.motor)
+        with self.assertRaises(ValueError):
+            schema.decode(dict(document, version=schema.SCHEMA_VERSION + 1))
+        with self.assertRaises(ValueError):
+            schema.decode(dict(document, format='other'))
+
+        # an old document that named the nozzle's throat diameter 'throat'
+        old = json.loads(json.dumps(document))
+        old['version'] = 0
+        old['object']['nozzle']['throat'] = old['object']['nozzle'].pop('throat_dia')
+
+        @schema.register_migration(0)
+        def rename_throat(doc):
+            doc['object']['nozzle']['throat_dia'] = doc['object']['nozzle'].pop('throat')
+            return doc
+
+        try:
+            self.assertEqual(schema.decode(old).nozzle.throat_dia, 0.5)
+        finally:
+            del schema._migrations[0]
+
+    def test_type_check(self):
+        with self.assertRaises(TypeError):
+            OpenBurnMotor.from_json(self.propellant.to_json())
+        self.assertEqual(SimplePropellant.from_json(self.propellant.to_json()).name, "68/10")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,15 @@
+import tracemalloc
 import unittest
+from unittest import mock
 
-from openburn.core.internalballistics import SimSettings, InternalBallisticsSim as sim
+import numpy as np
+
+from openburn.core import portgeometry
+from openburn.core.internalballistics import SimSettings, SimEngine, SimulationException, SimulationStopped, \
+    PressureLimit, InternalBallisticsSim as sim
 from openburn.core.propellant import SimplePropellant
-from openburn.core.grain import CylindricalCoreGrain
+from openburn.core.simprofile import SimProfile
+from openburn.core.grain import CylindricalCoreGrain, PortGeometryGrain
 from openburn.core.nozzle import ConicalNozzle
 from openburn.core.motor import OpenBurnMotor
 
@@ -49,3 +56,221 @@ class InternalBallisticsTest(unittest.TestCase):
         kn_low, kn_high = self.results.get_kn_range()
         self.assertAlmostEqual(kn_low, 350, places=-1)
         self.assertAlmostEqual(kn_high, 390, places=-1)
+
+    def test_numpy_engine(self):
+        settings = SimSettings(twophase=0.85, timestep=0.01, engine=SimEngine.NUMPY)
+        results = sim.run_sim(self.motor, settings)
+
+        self.assertAlmostEqual(results.get_burn_time(), self.results.get_burn_time(), places=2)
+        self.assertAlmostEqual(results.get_total_impulse(), self.results.get_total_impulse(), places=1)
+        self.assertAlmostEqual(results.get_max_presure(), self.results.get_max_presure(), places=1)
+        self.assertAlmostEqual(results.get_max_mass_flux(), self.results.get_max_mass_flux(), places=2)
+        self.assertAlmostEqual(results.get_avg_isp(), self.results.get_avg_isp(), places=1)
+
+    def test_snapshots(self):
+        # by default no motor copies are kept, and the input motor is left untouched
+        self.assertTrue(all(x.motor is None for x in self.results.data))
+        self.assertEqual(self.motor.grains[0].core_diameter, 1)
+
+        for engine in (SimEngine.PYTHON, SimEngine.NUMPY):
+            settings = SimSettings(timestep=0.01, engine=engine, snapshot_interval=100, snapshot_burnout=True)
+            results = sim.run_sim(self.motor, settings)
+            snapshots = [x for x in results.data if x.motor is not None]
+            # every 100th step, plus the final burnout step
+            self.assertEqual(len(snapshots), len(range(0, len(results.data), 100)) + 1)
+            self.assertTrue(snapshots[-1].motor.grains[-1].is_burned_out())
+
+    def test_adaptive_engine(self):
+        settings = SimSettings(twophase=0.85, engine=SimEngine.ADAPTIVE, snapshot_burnout=True)
+        results = sim.run_sim(self.motor, settings)
+        reference = sim.run_sim(self.motor, SimSettings(twophase=0.85, timestep=0.001, engine=SimEngine.NUMPY))
+
+        self.assertLess(len(results), len(self.results) / 4)
+        self.assertAlmostEqual(results.get_burn_time(), reference.get_burn_time(), places=2)
+        self.assertAlmostEqual(results.get_total_impulse(), reference.get_total_impulse(), places=0)
+        self.assertAlmostEqual(results.get_max_presure(), reference.get_max_presure(), places=0)
+
+        # the run ends exactly on burnout
+        burnout_motor = results.snapshots[len(results) - 1]
+        for grain in burnout_motor.grains:
+            self.assertAlmostEqual(grain.core_diameter, grain.diameter, places=6)
+
+    def test_web_engine(self):
+        settings = SimSettings(twophase=0.85, engine=SimEngine.WEB, snapshot_burnout=True)
+        results = sim.run_sim(self.motor, settings)
+        reference = sim.run_sim(self.motor, SimSettings(twophase=0.85, timestep=0.001, engine=SimEngine.NUMPY))
+
+        self.assertEqual(len(results), settings.web_steps + 1)
+        self.assertAlmostEqual(results.get_burn_time(), reference.get_burn_time(), places=2)
+        self.assertAlmostEqual(results.get_total_impulse(), reference.get_total_impulse(), places=0)
+        self.assertAlmostEqual(results.get_max_presure(), reference.get_max_presure(), places=0)
+        self.assertAlmostEqual(results.get_max_mass_flux(), reference.get_max_mass_flux(), places=2)
+
+        burnout_motor = results.snapshots[len(results) - 1]
+        self.assertTrue(all(grain.is_burned_out() for grain in burnout_motor.grains))
+        self.assertEqual(self.motor.grains[0].core_diameter, 1)
+
+    @mock.patch.object(portgeometry, 'port_map_cache_path', None)
+    def test_port_geometry_grains(self):
+        motor = OpenBurnMotor()
+        motor.set_grains([PortGeometryGrain(diameter=2, length=4, port=portgeometry.finocyl_port(0.6, 6, 0.1, 0.3),
+                                            burning_faces=2, propellant=self.propellant, resolution=128)
+                          for _ in range(0, 4)])
+        motor.set_nozzle(self.nozzle)
+
+        results = sim.run_sim(motor, SimSettings(twophase=0.85, engine=SimEngine.WEB))
+        reference = sim.run_sim(motor, SimSettings(twophase=0.85, timestep=0.005))
+        # the fixed step reference is only first order accurate
+        self.assertAlmostEqual(results.get_burn_time(), reference.get_burn_time(), delta=0.02)
+        self.assertAlmostEqual(results.get_total_impulse() / reference.get_total_impulse(), 1, places=2)
+        # the fins burn out early, so the finocyl peaks higher than the BATES motor
+        self.assertGreater(results.get_max_presure(), self.results.get_max_presure())
+
+        with self.assertRaises(SimulationException):
+            sim.run_sim(motor, SimSettings(engine=SimEngine.NUMPY))
+
+    def test_iter_sim(self):
+        for engine in (SimEngine.PYTHON, SimEngine.ADAPTIVE):
+            settings = SimSettings(twophase=0.85, timestep=0.01, engine=engine)
+            results = sim.run_sim(self.motor, settings)
+            run = sim.iter_sim(self.motor, settings)
+            pressure = [point.pressure for point in run]
+            self.assertTrue(run.finished)
+            np.testing.assert_array_equal(pressure, results.pressure)
+            self.assertEqual(run.burn_time, results.get_burn_time())
+            self.assertEqual(run.total_impulse, results.get_total_impulse())
+
+        # stopping early leaves the totals of the steps taken so far
+        run = sim.iter_sim(self.motor, self.settings)
+        for _ in range(10):
+            next(run)
+        run.close()
+        self.assertFalse(run.finished)
+        self.assertAlmostEqual(run.burn_time, 0.1)
+
+    def test_stop_condition(self):
+        limit = PressureLimit(self.results.get_max_presure() * 0.9)
+        with self.assertRaises(SimulationStopped) as context:
+            sim.run_sim(self.motor, self.settings, stop=limit)
+        partial = context.exception.results
+        self.assertLess(len(partial), len(self.results))
+        self.assertGreater(partial.pressure[-1], limit.max_pressure)
+        self.assertTrue(np.all(partial.pressure[:-1] <= limit.max_pressure))
+        np.testing.assert_array_equal(partial.pressure, self.results.pressure[:len(partial)])
+
+        # a limit that isn't reached changes nothing
+        results = sim.run_sim(self.motor, self.settings, stop=PressureLimit(self.results.get_max_presure()))
+        self.assertEqual(len(results), len(self.results))
+
+    def test_slice_impulse(self):
+        for engine in (SimEngine.ADAPTIVE, SimEngine.WEB):
+            results = sim.run_sim(self.motor, SimSettings(twophase=0.85, engine=engine))
+            whole = results.slice_time(0, np.inf)
+            self.assertAlmostEqual(whole.get_total_impulse(), results.get_total_impulse(), places=9)
+            self.assertAlmostEqual(whole.get_burn_time(), results.get_burn_time(), places=9)
+            # windows that tile the burn add up to the total
+            halves = [results.slice_time(0, 1.5), results.slice_time(1.5, np.inf)]
+            self.assertAlmostEqual(sum(half.get_total_impulse() for half in halves), results.get_total_impulse(),
+                                   places=9)
+
+    def test_progress(self):
+        partials = []
+        results = sim.run_sim(self.motor, self.settings, progress=partials.append, progress_interval=0)
+        self.assertEqual([len(partial) for partial in partials], list(range(1, len(results) + 1)))
+        np.testing.assert_array_equal(partials[-1].thrust, results.thrust)
+
+    def test_profile(self):
+        profiles = {}
+        for engine in (SimEngine.PYTHON, SimEngine.NUMPY, SimEngine.ADAPTIVE):
+            profile = profiles[engine] = SimProfile(trace_memory=engine is SimEngine.NUMPY)
+            settings = SimSettings(twophase=0.85, timestep=0.01, engine=engine)
+            results = sim.run_sim(self.motor, settings, profile=profile)
+            self.assertIs(results.profile, profile)
+            np.testing.assert_array_equal(results.thrust, sim.run_sim(self.motor, settings).thrust)
+
+            self.assertEqual(profile.counters['steps'], len(results))
+            self.assertGreater(profile.calls['calc_chamber_pressure'], 0)
+            self.assertIn('regress', profile.timers)
+            self.assertAlmostEqual(sum(profile.timers.values()), profile.wall_time)
+            self.assertEqual(profile.peak_memory is not None, engine is SimEngine.NUMPY)
+        # every step of the python engine recalculates the chamber pressure for each grain, and once more
+        python = profiles[SimEngine.PYTHON]
+        self.assertGreater(python.calls['calc_chamber_pressure'], python.counters['steps'] * (len(self.grains) + 1))
+
+        # runs that are stopped are measured up to the stop
+        profile = SimProfile()
+        run = sim.iter_sim(self.motor, self.settings, profile)
+        for _ in zip(range(10), run):
+            pass
+        run.close()
+        self.assertEqual(profile.counters['steps'], 10)
+        self.assertEqual(profile.get_summary()['counters']['steps'], 10)
+
+    def test_profile_memory_while_tracing(self):
+        class OldTracemalloc:
+            """tracemalloc of python < 3.9, without reset_peak"""
+            def __getattr__(self, name):
+                if name == 'reset_peak':
+                    raise AttributeError(name)
+                return getattr(tracemalloc, name)
+
+        settings = SimSettings(twophase=0.85, timestep=0.01, engine=SimEngine.NUMPY)
+        tracemalloc.start()
+        try:
+            for module in (tracemalloc, OldTracemalloc()):
+                block = bytearray(50000000)
+                del block
+                profile = SimProfile(trace_memory=True)
+                with mock.patch('openburn.core.simprofile.tracemalloc', module):
+                    sim.run_sim(self.motor, settings, profile=profile)
+                # the peak is of the run, and tracing started elsewhere carries on
+                self.assertLess(profile.peak_memory, 50000000)
+                self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+
+    def test_partial_results(self):
+        # burns far longer than MAX_SIM_TIME
+        slow = SimplePropellant("slow", 0.0005, 0.2249, 4706, 0.058, 1.226)
+        motor = self.motor.copy()
+        for grain in motor.grains:
+            grain.propellant = slow
+        motor.set_grains(motor.grains)
+        with self.assertRaises(SimulationException) as context:
+            sim.run_sim(motor, SimSettings(timestep=0.05, engine=SimEngine.NUMPY))
+        partial = context.exception.results
+        self.assertGreater(partial.get_burn_time(), 50)
+        self.assertEqual(len(partial), round(partial.get_burn_time() / 0.05))
+
+        with self.assertRaisesRegex(SimulationException, "no grains"):
+            sim.run_sim(OpenBurnMotor(), self.settings)
+
+    def test_erosive_burning(self):
+        # without erosion the cell model matches the other engines
+        settings = SimSettings(twophase=0.85, timestep=0.01, erosive_cells=10, erosive_alpha=0)
+        results = sim.run_sim(self.motor, settings)
+        self.assertAlmostEqual(results.get_burn_time(), self.results.get_burn_time(), places=2)
+        self.assertAlmostEqual(results.get_total_impulse() / self.results.get_total_impulse(), 1, places=2)
+        self.assertAlmostEqual(results.get_max_presure(), self.results.get_max_presure(), places=0)
+
+        # erosion raises the initial pressure peak, and the result converges as the cells get smaller
+        coarse = sim.run_sim(self.motor, SimSettings(twophase=0.85, erosive_cells=5, erosive_alpha=3e-5))
+        fine = sim.run_sim(self.motor, SimSettings(twophase=0.85, erosive_cells=40, erosive_alpha=3e-5))
+        self.assertGreater(fine.get_max_presure(), results.get_max_presure() * 1.2)
+        self.assertAlmostEqual(coarse.get_max_presure() / fine.get_max_presure(), 1, places=2)
+        self.assertEqual(fine.pressure.argmax(), 0)
+
+    def test_erosive_burn_rate(self):
+        settings = SimSettings()
+        base = np.full(3, 0.3)
+        flux = np.array([0, 1, 3])
+        rate = sim.calc_erosive_burn_rate(base, flux, np.full(3, 1.0), 0.058, settings)
+        self.assertEqual(rate[0], base[0])
+        self.assertTrue(np.all(np.diff(rate) > 0))
+
+        # the solution satisfies the implicit Lenoir-Robillard equation
+        g_si = flux[1:] * convert_magnitude(1, 'lb_per_sec_per_sq_in', 'kg_per_sec_per_sq_m')
+        meters_per_inch = convert_magnitude(1.0, 'inch', 'meter')
+        erosive = settings.erosive_alpha * g_si ** 0.8 * meters_per_inch ** -0.2 / meters_per_inch * \
+            np.exp(-settings.erosive_beta * rate[1:] * 0.058 / flux[1:])
+        np.testing.assert_allclose(rate[1:], base[1:] + erosive, rtol=1e-9)
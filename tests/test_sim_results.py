@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from openburn.core.simresults import SimDataPoint, SimResults, SimResultsBuilder
+
+
+class SimResultsTest(unittest.TestCase):
+    def setUp(self):
+        """Set up the test data"""
+        points = []
+        for i in range(10):
+            point = SimDataPoint()
+            point.time_stamp = i * 0.1
+            point.pressure = 100 + i
+            point.thrust = 10 * i
+            point.isp = 150
+            point.kn = 300 + i
+            points.append(point)
+        self.results = SimResults.from_data_points(points, burn_time=1.0, total_impulse=4.5)
+
+    def test_columns(self):
+        self.assertEqual(len(self.results), 10)
+        self.assertEqual(self.results.pressure.dtype, np.float64)
+        self.assertAlmostEqual(self.results.get_max_presure(), 109)
+        self.assertAlmostEqual(self.results.get_avg_thrust(), 45)
+        self.assertEqual(self.results.get_kn_range(), (300, 309))
+        self.assertAlmostEqual(self.results.data[3].thrust, 30)
+
+    def test_empty(self):
+        # e.g. the partial results of a run stopped before its first step
+        results = SimResultsBuilder().build(0, 0)
+        self.assertEqual(len(results.get_time_steps()), 0)
+        self.assertEqual(results.get_summary(), {metric: 0 for metric in SimResults.SUMMARY_METRICS})
+        self.assertEqual(len(results.slice_time(0, 1)), 0)
+
+    def test_read_only(self):
+        with self.assertRaises(ValueError):
+            self.results.thrust[0] = 1000
+
+    def test_slice_time(self):
+        window = self.results.slice_time(0.25, 0.55)
+        np.testing.assert_allclose(window.time, [0.3, 0.4, 0.5])
+        self.assertTrue(np.shares_memory(window.thrust, self.results.thrust))
+        self.assertAlmostEqual(window.get_burn_time(), 0.3)
+        self.assertAlmostEqual(window.get_total_impulse(), 13.5)    # trapezoids up to the point at 0.6 s
+        self.assertAlmostEqual(window.get_max_thrust(), 50)
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            filename = os.path.join(tempdir, 'results.obr')
+            self.results.save(filename)
+
+            header = SimResults.read_header(filename)
+            self.assertEqual(header['length'], 10)
+            self.assertEqual(header['summary'], self.results.get_summary())
+            self.assertEqual(header['offset'] % 64, 0)
+
+            for mmap in (True, False):
+                loaded = SimResults.load(filename, mmap=mmap)
+                self.assertEqual(loaded.get_summary(), self.results.get_summary())
+                for name in SimResults.COLUMNS:
+                    np.testing.assert_array_equal(getattr(loaded, name), getattr(self.results, name))
+                with self.assertRaises(ValueError):
+                    loaded.thrust[0] = 1000
+                del loaded  # release the memory map before the file is deleted
+
+            with open(filename, 'r+b') as f:
+                f.write(b'NOTRESULTS')
+            with self.assertRaises(ValueError):
+                SimResults.load(filename)
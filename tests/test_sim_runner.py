@@ -0,0 +1,128 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from qtpy.QtCore import QCoreApplication, QThreadPool
+
+from openburn.application.application import OpenBurnApplication
+from openburn.application.sim_runner import SimRunner
+from openburn.core.internalballistics import SimSettings, InternalBallisticsSim as sim
+from openburn.core.propellant import SimplePropellant
+from openburn.core.grain import CylindricalCoreGrain
+from openburn.core.nozzle import ConicalNozzle
+from openburn.core.motor import OpenBurnMotor
+
+TIMEOUT = 60    # seconds to wait for a simulation
+
+
+class SimRunnerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # queued signals from the workers are delivered by the event loop
+        cls.qt_app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        """Set up the test data"""
+        self.settings = SimSettings(twophase=0.85, timestep=0.01)
+        propellant = SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
+        self.motor = OpenBurnMotor()
+        self.motor.set_grains([CylindricalCoreGrain(diameter=2, length=4, core_diameter=1, burning_faces=2,
+                                                    propellant=propellant)
+                               for _ in range(0, 4)])
+        self.motor.set_nozzle(ConicalNozzle(throat=0.5, exit=2, half_angle=15, throat_len=0.25))
+
+        self.thread_pool = QThreadPool()
+        self.runner = SimRunner(self.settings, thread_pool=self.thread_pool, progress_interval=0)
+        self.signals = []
+        for name in ('started', 'progress', 'finished', 'failed', 'cancelled'):
+            getattr(self.runner, name).connect(lambda *args, name=name: self.signals.append((name,) + args))
+
+    def tearDown(self):
+        self.thread_pool.waitForDone()
+
+    def wait(self, runner: SimRunner = None):
+        """Run the event loop until the runner is idle"""
+        runner = runner if runner is not None else self.runner
+        deadline = time.monotonic() + TIMEOUT
+        while runner.is_running() or runner._workers:
+            self.assertLess(time.monotonic(), deadline, "timed out waiting for the simulation")
+            QCoreApplication.processEvents()
+            time.sleep(0.001)
+
+    def get_signals(self, name: str) -> list:
+        return [args[1:] for args in self.signals if args[0] == name]
+
+    def test_finished(self):
+        expected = sim.run_sim(self.motor, self.settings)
+        run_id = self.runner.simulate(self.motor)
+        self.assertTrue(self.runner.is_running())
+        # editing the design doesn't change the running simulation
+        self.motor.set_nozzle(ConicalNozzle(throat=1, exit=2, half_angle=15, throat_len=0.25))
+        self.wait()
+
+        (finished_id, results), = self.get_signals('finished')
+        self.assertEqual(finished_id, run_id)
+        self.assertIs(self.runner.results, results)
+        self.assertAlmostEqual(results.get_total_impulse(), expected.get_total_impulse())
+        self.assertEqual(len(results.time), len(expected.time))
+
+        progress = self.get_signals('progress')
+        self.assertGreater(len(progress), 0)
+        self.assertTrue(all(len(partial.time) <= len(results.time) for _, partial in progress))
+        self.assertEqual(self.get_signals('started'), [(run_id,)])
+
+    def test_superseded(self):
+        first = self.runner.simulate(self.motor)
+        self.motor.set_nozzle(ConicalNozzle(throat=0.6, exit=2, half_angle=15, throat_len=0.25))
+        second = self.runner.simulate(self.motor)
+        self.wait()
+
+        # nothing from the first run is reported once the second starts
+        self.assertEqual(self.get_signals('started'), [(first,), (second,)])
+        started = self.signals.index(('started', second))
+        self.assertTrue(all(args[1] == second for args in self.signals[started:]))
+        (finished_id, results), = self.get_signals('finished')
+        self.assertEqual(finished_id, second)
+        expected = sim.run_sim(self.motor, self.settings)
+        self.assertAlmostEqual(results.get_total_impulse(), expected.get_total_impulse())
+
+    def test_cancel(self):
+        self.settings.time_step = 0.0001
+        run_id = self.runner.simulate(self.motor)
+        self.runner.cancel()
+        self.wait()
+        self.assertEqual(self.get_signals('cancelled'), [(run_id,)])
+        self.assertEqual(self.get_signals('finished'), [])
+        self.assertIsNone(self.runner.results)
+
+    def test_failed(self):
+        with mock.patch.object(sim, 'iter_sim', side_effect=ValueError("bad motor")):
+            run_id = self.runner.simulate(self.motor)
+            self.wait()
+        self.assertEqual(self.get_signals('failed'), [(run_id, "ValueError: bad motor")])
+
+    def test_redraw_on_changes(self):
+        with tempfile.TemporaryDirectory() as user_path:
+            open(os.path.join(user_path, 'settings.json'), 'w').close()   # default settings
+            app = OpenBurnApplication(user_path)
+            app.sim_runner.thread_pool = self.thread_pool
+            finished = []
+            app.sim_runner.finished.connect(lambda run_id, results: finished.append(run_id))
+
+            app.motor_model.set_nozzle(self.motor.nozzle)   # incomplete designs aren't simulated
+            self.assertFalse(app.sim_runner.is_running())
+            for grain in self.motor.grains:
+                app.motor_model.add_grain(grain)
+            self.wait(app.sim_runner)
+            self.assertEqual(finished, [app.sim_runner._last_run_id])  # only the last edit is reported
+            self.assertEqual(len(app.sim_runner.results.time), len(sim.run_sim(self.motor, SimSettings()).time))
+
+            app.settings.settings.redraw_on_changes = False
+            app.motor_model.remove_grain(0)
+            self.assertFalse(app.sim_runner.is_running())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+from openburn.core.internalballistics import SimSettings, SimEngine, SimulationStopped, PressureLimit, \
+    InternalBallisticsSim as sim
+from openburn.core.propellant import SimplePropellant
+from openburn.core.grain import CylindricalCoreGrain
+from openburn.core.nozzle import ConicalNozzle
+from openburn.core.motor import OpenBurnMotor
+from openburn.core.simcache import SimCache, hash_simulation
+
+
+class SimCacheTest(unittest.TestCase):
+    def setUp(self):
+        """Set up the test data"""
+        self.settings = SimSettings(twophase=0.85, timestep=0.01, engine=SimEngine.NUMPY)
+        propellant = SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
+        self.motor = OpenBurnMotor()
+        self.motor.set_grains([CylindricalCoreGrain(diameter=2, length=4, core_diameter=1, burning_faces=2,
+                                                    propellant=propellant)
+                               for _ in range(0, 4)])
+        self.motor.set_nozzle(ConicalNozzle(throat=0.5, exit=2, half_angle=15, throat_len=0.25))
+
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.cache = SimCache(self.tempdir.name)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_hash(self):
+        key = hash_simulation(self.motor, self.settings)
+        # copies and reloaded motors get new uuids, but simulate the same
+        self.assertEqual(hash_simulation(self.motor.copy(), self.settings), key)
+        self.assertEqual(hash_simulation(pickle.loads(pickle.dumps(self.motor)), self.settings), key)
+
+        changed = self.motor.copy()
+        changed.grains[0].core_diameter = 1.1
+        self.assertNotEqual(hash_simulation(changed, self.settings), key)
+        self.assertNotEqual(hash_simulation(self.motor, SimSettings(timestep=0.005, engine=SimEngine.NUMPY)), key)
+
+    def test_cached_results(self):
+        results = sim.run_sim(self.motor, self.settings, self.cache)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+        cached = sim.run_sim(self.motor.copy(), self.settings, self.cache)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(cached.get_burn_time(), results.get_burn_time())
+        self.assertEqual(cached.get_total_impulse(), results.get_total_impulse())
+        for name in results.COLUMNS:
+            np.testing.assert_array_equal(getattr(cached, name), getattr(results, name))
+
+        # runs with snapshots are never cached
+        sim.run_sim(self.motor, SimSettings(engine=SimEngine.NUMPY, snapshot_interval=10), self.cache)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_cached_stop_condition(self):
+        # stop conditions apply to cached results as they would to a new run
+        limit = PressureLimit(sim.run_sim(self.motor, self.settings, self.cache).get_max_presure() * 0.9)
+        with self.assertRaises(SimulationStopped) as cached:
+            sim.run_sim(self.motor, self.settings, self.cache, stop=limit)
+        with self.assertRaises(SimulationStopped) as simulated:
+            sim.run_sim(self.motor, self.settings, stop=limit)
+        self.assertEqual(self.cache.hits, 1)
+        np.testing.assert_array_equal(cached.exception.results.pressure, simulated.exception.results.pressure)
+        self.assertAlmostEqual(cached.exception.results.get_total_impulse(),
+                               simulated.exception.results.get_total_impulse())
+
+        # the adaptive engine's data points end their time steps, and it integrates with the trapezoidal rule
+        settings = SimSettings(twophase=0.85, engine=SimEngine.ADAPTIVE)
+        sim.run_sim(self.motor, settings, self.cache)
+        with self.assertRaises(SimulationStopped) as cached:
+            sim.run_sim(self.motor, settings, self.cache, stop=limit)
+        with self.assertRaises(SimulationStopped) as simulated:
+            sim.run_sim(self.motor, settings, stop=limit)
+        for total in ('get_burn_time', 'get_total_impulse'):
+            self.assertAlmostEqual(getattr(cached.exception.results, total)(),
+                                   getattr(simulated.exception.results, total)(), places=9)
+
+    def test_eviction(self):
+        results = sim.run_sim(self.motor, self.settings)
+        self.cache.put('a', results)
+        size = self.cache.get_size()
+        self.cache.put('b', results)
+        os.utime(self.cache.get_filename('a'), (0, 0))   # 'a' is least recently used
+        self.cache.get('b')
+
+        self.cache.max_size = int(2.5 * size)
+        self.cache.put('c', results)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('c'))
+        self.assertLessEqual(self.cache.get_size(), self.cache.max_size)
+
+    def test_stale_versions(self):
+        stale = os.path.join(self.tempdir.name, 'v0')
+        os.makedirs(stale)
+        self.cache.put('a', sim.run_sim(self.motor, self.settings))
+        self.cache.prune()
+        self.assertFalse(os.path.exists(stale))
+        self.assertIsNotNone(self.cache.get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import subprocess
+import sys
+import unittest
+
+from openburn import ROOT_PATH
+
+
+class StartupTest(unittest.TestCase):
+    def run_script(self, script: str) -> str:
+        return subprocess.run([sys.executable, '-c', script], cwd=ROOT_PATH, check=True,
+                              stdout=subprocess.PIPE, universal_newlines=True).stdout
+
+    def test_core_import(self):
+        """Simulating does not load Qt, pint or jsonpickle"""
+        script = ("import sys\n"
+                  "from openburn.core.internalballistics import InternalBallisticsSim, SimSettings\n"
+                  "from openburn.core.propellant import SimplePropellant\n"
+                  "from openburn.core.grain import CylindricalCoreGrain\n"
+                  "from openburn.core.nozzle import ConicalNozzle\n"
+                  "from openburn.core.motor import OpenBurnMotor\n"
+                  "prop = SimplePropellant('68/10', 0.0341, 0.2249, 4706, 0.058, 1.226)\n"
+                  "motor = OpenBurnMotor()\n"
+                  "motor.set_grains([CylindricalCoreGrain(2, 4, 2, 1, prop)])\n"
+                  "motor.set_nozzle(ConicalNozzle(0.25, 1, 15, 0.25))\n"
+                  "InternalBallisticsSim.run_sim(motor, SimSettings())\n"
+                  "print(' '.join(x for x in ('qtpy', 'pint', 'jsonpickle') if x in sys.modules))\n")
+        self.assertEqual(self.run_script(script).strip(), '')
+
+    def test_lazy_app_context(self):
+        script = ("import sys\n"
+                  "import openburn.application\n"
+                  "print('qtpy' in sys.modules)\n")
+        self.assertEqual(self.run_script(script).strip(), 'False')
+
+    def test_ui_import(self):
+        """The main window does not load the simulator until a simulation runs"""
+        script = ("import sys\n"
+                  "import main\n"
+                  "print(' '.join(x for x in ('numpy', 'openburn.core.internalballistics') if x in sys.modules))\n")
+        self.assertEqual(self.run_script(script).strip(), '')
+
+    def test_metric_labels(self):
+        from openburn.core.simresults import SimResults
+        from openburn.ui.simtab import SimulationTab
+        self.assertEqual(tuple(SimulationTab.METRIC_LABELS), SimResults.SUMMARY_METRICS)
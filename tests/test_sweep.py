@@ -0,0 +1,86 @@
+import io
+import unittest
+
+from openburn.analysis.design import apply_design_params
+from openburn.analysis.sweep import ParameterSweep, make_grid
+from openburn.core.internalballistics import SimSettings, SimEngine, PressureLimit
+from openburn.core.propellant import SimplePropellant
+from openburn.core.grain import CylindricalCoreGrain, PortGeometryGrain
+from openburn.core.portgeometry import circle_port
+from openburn.core.nozzle import ConicalNozzle
+from openburn.core.motor import OpenBurnMotor
+
+
+class ParameterSweepTest(unittest.TestCase):
+    def setUp(self):
+        """Set up the test data"""
+        self.settings = SimSettings(engine=SimEngine.ADAPTIVE)
+        self.propellant = SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
+        self.grains = [CylindricalCoreGrain(diameter=2, length=4, core_diameter=1, burning_faces=2,
+                                            propellant=self.propellant)
+                       for _ in range(0, 4)]
+        self.nozzle = ConicalNozzle(throat=0.5, exit=2, half_angle=15, throat_len=0.25)
+        self.motor = OpenBurnMotor()
+        self.motor.set_grains(self.grains)
+        self.motor.set_nozzle(self.nozzle)
+
+    def test_grid(self):
+        grid = make_grid({'grain_count': [2, 3], 'throat_diameter': [0.4, 0.5, 0.6]})
+        self.assertEqual(len(grid), 6)
+        self.assertEqual(grid[1], {'grain_count': 2, 'throat_diameter': 0.5})
+
+    def test_apply_params(self):
+        variant = apply_design_params(self.motor, {'grain_count': 6, 'core_diameter': 0.75})
+        self.assertEqual(variant.get_num_grains(), 6)
+        self.assertTrue(all(grain.core_diameter == 0.75 for grain in variant.grains))
+        self.assertEqual(self.motor.get_num_grains(), 4)
+        with self.assertRaises(ValueError):
+            apply_design_params(self.motor, {'not_a_param': 1})
+        port_motor = OpenBurnMotor()
+        port_motor.set_grains([PortGeometryGrain(diameter=2, length=4, port=circle_port(1), burning_faces=2,
+                                                 propellant=self.propellant)])
+        with self.assertRaises(ValueError):
+            apply_design_params(port_motor, {'core_diameter': 0.75})
+
+    def test_sweep(self):
+        variants = make_grid({'grain_count': [2, 4], 'throat_diameter': [0.4, 0.5]})
+        calls = []
+        results = ParameterSweep(self.motor, self.settings, workers=2).run(
+            variants, progress=lambda done, total: calls.append((done, total)))
+
+        self.assertEqual(calls[-1], (4, 4))
+        self.assertEqual(results.variants, variants)
+        impulse = results.get_column('total_impulse')
+        # more grains: more impulse. smaller throat: more pressure
+        self.assertGreater(impulse[2], impulse[0])
+        pressure = results.get_column('max_pressure')
+        self.assertGreater(pressure[0], pressure[1])
+
+        serial = ParameterSweep(self.motor, self.settings, workers=1).run(variants)
+        self.assertEqual(serial.get_column('total_impulse'), impulse)
+
+        out = io.StringIO()
+        results.write_csv(out)
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
+
+    def test_bad_variants(self):
+        # a variant that can't be simulated is reported, and doesn't abort the sweep
+        variants = [{'throat_diameter': 0.5}, {'throat_diameter': 'wide'}]
+        for workers in (1, 2):
+            results = ParameterSweep(self.motor, self.settings, workers=workers).run(variants)
+            errors = results.get_column('error')
+            self.assertIsNone(errors[0])
+            self.assertIn('TypeError', errors[1])
+            self.assertGreater(results.get_column('total_impulse')[0], 0)
+
+    def test_stop_condition(self):
+        variants = make_grid({'throat_diameter': [0.4, 0.6]})
+        unlimited = ParameterSweep(self.motor, self.settings, workers=1).run(variants)
+        limit = sum(unlimited.get_column('max_pressure')) / 2
+        results = ParameterSweep(self.motor, self.settings, workers=2, stop=PressureLimit(limit)).run(variants)
+
+        # the small throat variant is abandoned, the other is unaffected
+        errors = results.get_column('error')
+        self.assertIn('SimulationStopped', errors[0])
+        self.assertIsNone(errors[1])
+        self.assertEqual(results.get_column('total_impulse')[1], unlimited.get_column('total_impulse')[1])
@@ -0,0 +1,70 @@
+import io
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+import numpy as np
+
+from openburn.core.internalballistics import SimSettings, SimEngine, InternalBallisticsSim as sim
+from openburn.core.propellant import SimplePropellant
+from openburn.core.grain import CylindricalCoreGrain
+from openburn.core.nozzle import ConicalNozzle
+from openburn.core.motor import OpenBurnMotor
+from openburn.util.thrustcurve import resample_thrust_curve, write_eng, write_rse
+from openburn.util.units import convert_magnitude
+
+
+class ThrustCurveTest(unittest.TestCase):
+    def setUp(self):
+        """Set up the test data"""
+        propellant = SimplePropellant("68/10", 0.0341, 0.2249, 4706, 0.058, 1.226)
+        self.motor = OpenBurnMotor()
+        self.motor.set_grains([CylindricalCoreGrain(diameter=2, length=4, core_diameter=1, burning_faces=2,
+                                                    propellant=propellant)
+                               for _ in range(0, 4)])
+        self.motor.set_nozzle(ConicalNozzle(throat=0.5, exit=2, half_angle=15, throat_len=0.25))
+        self.results = sim.run_sim(self.motor, SimSettings(engine=SimEngine.NUMPY))
+
+    def test_resample(self):
+        time = np.linspace(0, 1, 1001)
+        thrust = np.where(time < 0.5, time, 1 - time)
+        picked_time, picked_thrust = resample_thrust_curve(time, thrust, 10)
+        # a triangle only needs its corners
+        np.testing.assert_array_equal(picked_time, [0, 0.5, 1])
+
+        picked_time, picked_thrust = resample_thrust_curve(time, np.sin(time * 3), 10)
+        self.assertEqual(len(picked_time), 10)
+        self.assertLess(np.abs(np.interp(time, picked_time, picked_thrust) - np.sin(time * 3)).max(), 0.02)
+
+    def test_eng(self):
+        out = io.StringIO()
+        write_eng(out, self.results, self.motor, delays='6-10', hardware_mass=1.0, max_points=20)
+        lines = out.getvalue().splitlines()
+        name, diameter, length, delays, propellant_mass, total_mass, manufacturer = lines[1].split()
+        self.assertEqual(name[0], 'K')
+        self.assertEqual(float(diameter), 50.8)
+        self.assertEqual(delays, '6-10')
+        self.assertAlmostEqual(float(total_mass) - float(propellant_mass), 0.4536, places=3)
+
+        curve = np.array([[float(x) for x in line.split()] for line in lines[2:-1]])
+        self.assertEqual(len(curve), 20)
+        self.assertGreater(curve[0, 0], 0)
+        self.assertEqual(tuple(curve[-1]), (round(self.results.get_burn_time(), 4), 0))
+        impulse = np.sum(np.diff(curve[:, 0]) * (curve[1:, 1] + curve[:-1, 1]) / 2)
+        expected = convert_magnitude(self.results.get_total_impulse(), 'lbf', 'newton')
+        self.assertAlmostEqual(impulse / expected, 1, places=2)
+
+    def test_rse(self):
+        out = io.StringIO()
+        write_rse(out, self.results, self.motor, max_points=20)
+        engine = ElementTree.fromstring(out.getvalue()).find('engine-list/engine')
+        self.assertEqual(float(engine.get('dia')), 50.8)
+        points = engine.findall('data/eng-data')
+        self.assertEqual(len(points), 20)
+        masses = [float(point.get('m')) for point in points]
+        self.assertAlmostEqual(masses[0], float(engine.get('propWt')))
+        self.assertAlmostEqual(masses[-1], 0)
+        self.assertTrue(np.all(np.diff(masses) <= 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+
+import numpy as np
+
+from openburn.util.units import PRECOMPILED_CONVERSIONS, convert_array, convert_magnitude, get_conversion, \
+    get_registry
+
+
+class UnitsTest(unittest.TestCase):
+    def test_factor(self):
+        self.assertAlmostEqual(convert_magnitude(1, 'lbf', 'newton'), 4.448222, places=6)
+        self.assertAlmostEqual(convert_magnitude(0.058, 'lb_per_in3', 'slug_per_in3'),
+                               get_registry().Quantity(0.058, 'lb_per_in3').to('slug_per_in3').magnitude)
+
+    def test_offset(self):
+        factor, offset = get_conversion('degF', 'degC')
+        self.assertAlmostEqual(factor, 5 / 9)
+        self.assertAlmostEqual(convert_magnitude(212, 'degF', 'degC'), 100)
+
+    def test_array(self):
+        values = convert_array([32, 212], 'degF', 'degC')
+        np.testing.assert_allclose(values, [0, 100], atol=1e-9)
+
+    def test_precompiled(self):
+        for (from_, to_), (factor, offset) in PRECOMPILED_CONVERSIONS.items():
+            self.assertAlmostEqual(factor, get_registry().Quantity(1.0, from_).to(to_).magnitude, places=12)
+            self.assertEqual(offset, 0)